@@ -0,0 +1,14 @@
+"""
+Benchmarks for the embedding and packing algorithms, and for the partitioning backends of the embedding.
+
+Every algorithm is run on virtual networks of increasing size against the shipped physical
+instances (Grid5000 sites for the embedding, the EC2 catalog for the packing). For each run the
+wall time, the peak memory and the quality of the solution are stored in a JSON file, so that
+results obtained at two different commits can be compared::
+
+    python -m benchmarks run -o before.json
+    python -m benchmarks run -o after.json
+    python -m benchmarks compare before.json after.json
+"""
+from .cases import Case, embedding_cases, packing_cases, partitioning_cases
+from .runner import compare, load, run, save
@@ -0,0 +1,122 @@
+"""
+Command line interface of the benchmarks.
+
+    python -m benchmarks run [-o results.json] [-k filter] [--ilp] [--partitioning] [--repeat n] [--no-memory]
+                             [--solver name] [--timelimit seconds] [--no-symmetry]
+    python -m benchmarks compare old.json new.json [--threshold 0.1] [--min-delta 0.005]
+"""
+import argparse
+import sys
+
+from .cases import embedding_cases, packing_cases, partitioning_cases
+from .runner import compare, load, run, save
+
+
+def _format_time(value):
+    return "-" if value is None else f"{value:.4f}"
+
+
+def _print_result(result):
+    quality = (
+        result["n_machines_used"] if result["suite"] == "embedding" else result["cost"]
+    )
+    peak_memory = (
+        "-" if result["peak_memory"] is None else f"{result['peak_memory'] / 2**20:.1f}"
+    )
+    print(
+        f"{result['name']:<70} {result['status']:<11} {_format_time(result['time']):>9}s "
+        f"{peak_memory:>8}MiB {quality if quality is not None else '-':>8}",
+        flush=True,
+    )
+
+
+def _run(args):
+    cases = embedding_cases(ilp=args.ilp) + packing_cases(ilp=args.ilp)
+    if args.partitioning:
+        cases += partitioning_cases()
+    if args.filter:
+        cases = [case for case in cases if args.filter in case.name]
+    results = run(
+        cases,
+        repeat=args.repeat,
+        memory=args.memory,
+        solver=args.solver,
+        timelimit=args.timelimit,
+        symmetry=args.symmetry,
+        callback=_print_result,
+    )
+    save(results, args.output)
+    print(f"results stored in {args.output}")
+    return 0
+
+
+def _compare(args):
+    rows = compare(
+        load(args.old),
+        load(args.new),
+        threshold=args.threshold,
+        min_delta=args.min_delta,
+    )
+    for row in rows:
+        ratio = "-" if row["ratio"] is None else f"{row['ratio']:.2f}x"
+        print(
+            f"{row['name']:<70} {_format_time(row['old_time']):>9}s "
+            f"{_format_time(row['new_time']):>9}s {ratio:>7} "
+            f"{row['old_quality']!s:>8} {row['new_quality']!s:>8}"
+            f"{'  REGRESSION' if row['regression'] else ''}"
+        )
+    n_regressions = sum(row["regression"] for row in rows)
+    print(f"{len(rows)} cases compared, {n_regressions} regressions")
+    return 1 if n_regressions else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks")
+    subparsers = parser.add_subparsers(dest="command")
+    subparsers.required = True
+
+    run_parser = subparsers.add_parser("run", help="run the benchmarks")
+    run_parser.add_argument("-o", "--output", default="benchmark_results.json")
+    run_parser.add_argument(
+        "-k", "--filter", help="only run the cases whose name contains this string"
+    )
+    run_parser.add_argument("--repeat", type=int, default=1)
+    run_parser.add_argument(
+        "--no-memory",
+        dest="memory",
+        action="store_false",
+        help="do not measure the peak memory",
+    )
+    run_parser.add_argument(
+        "--ilp", action="store_true", help="also run the ILP models"
+    )
+    run_parser.add_argument(
+        "--partitioning",
+        action="store_true",
+        help="also compare the partitioning backends on large virtual networks",
+    )
+    run_parser.add_argument("--solver", default="cbc")
+    run_parser.add_argument("--timelimit", type=int, default=60)
+    run_parser.add_argument(
+        "--no-symmetry",
+        dest="symmetry",
+        action="store_false",
+        help="do not break the symmetries of the identical hosts in EmbedILP",
+    )
+    run_parser.set_defaults(func=_run)
+
+    compare_parser = subparsers.add_parser(
+        "compare", help="compare the results of two runs"
+    )
+    compare_parser.add_argument("old")
+    compare_parser.add_argument("new")
+    compare_parser.add_argument("--threshold", type=float, default=0.1)
+    compare_parser.add_argument("--min-delta", type=float, default=0.005)
+    compare_parser.set_defaults(func=_compare)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,122 @@
+"""
+Definition of the benchmark sweep.
+"""
+import itertools
+from collections import namedtuple
+
+from distriopt import VirtualNetwork
+
+# Grid5000 sites shipped in distriopt/embedding/instances
+SITES = ("grisou", "grele", "grimoire", "graoully", "graphique")
+
+# EC2 catalogs shipped in distriopt/packing/instances/ec2
+CATALOGS = ("general_purpose",)
+
+# (generator, parameters) of the virtual networks, from the smallest to the largest
+VIRTUAL_NETWORKS = (
+    ("fat_tree", {"k": 4}),
+    ("fat_tree", {"k": 8}),
+    ("fat_tree", {"k": 12}),
+    ("random_nw", {"n_nodes": 50, "p": 0.1}),
+    ("random_nw", {"n_nodes": 100, "p": 0.05}),
+    ("random_nw", {"n_nodes": 200, "p": 0.02}),
+    ("random_EC2", {"n_nodes": 50}),
+    ("random_EC2", {"n_nodes": 100}),
+    ("random_EC2", {"n_nodes": 200}),
+)
+
+# the ILP models grow quickly, they are only solved on the smallest instances
+ILP_VIRTUAL_NETWORKS = (
+    ("fat_tree", {"k": 2}),
+    ("random_nw", {"n_nodes": 10, "p": 0.2}),
+    ("random_EC2", {"n_nodes": 10}),
+)
+
+EMBEDDING_ALGORITHMS = ("EmbedGreedy", "EmbedBalanced", "EmbedPartition")
+
+# large virtual networks, only partitioned (see benchmarks.partitioning)
+PARTITIONING_VIRTUAL_NETWORKS = (
+    ("fat_tree", {"k": 16}),
+    ("fat_tree", {"k": 32}),
+    ("random_nw", {"n_nodes": 2000, "p": 0.002}),
+)
+
+PARTITIONING_ALGORITHMS = ("kernighan_lin", "swap", "multilevel")
+
+N_PARTITIONS = (8, 32)
+
+PACKING_ALGORITHMS = (
+    "PackGreedy",
+    "BestFitDopProduct",
+    "FirstFitDecreasingPriority",
+    "FirstFitOrderedDeviation",
+)
+
+
+class Case(namedtuple("Case", "suite algorithm generator params physical")):
+    """A single run: an algorithm solving a virtual network on a physical instance.
+
+    For the partitioning suite, the physical instance is the number of partitions.
+    """
+
+    __slots__ = ()
+
+    @property
+    def virtual(self):
+        """Printable description of the virtual network."""
+        params = ", ".join(f"{name}={value}" for name, value in self.params.items())
+        return f"{self.generator}({params})"
+
+    @property
+    def name(self):
+        return f"{self.suite}/{self.algorithm}/{self.virtual}/{self.physical}"
+
+    def create_virtual(self):
+        """Return a new instance of the virtual network."""
+        return getattr(VirtualNetwork, f"create_{self.generator}")(**self.params)
+
+
+def embedding_cases(ilp=False):
+    """Return the cases of the embedding benchmark."""
+    cases = [
+        Case("embedding", algorithm, generator, params, site)
+        for site, (generator, params), algorithm in itertools.product(
+            SITES, VIRTUAL_NETWORKS, EMBEDDING_ALGORITHMS
+        )
+    ]
+    if ilp:
+        cases.extend(
+            Case("embedding", "EmbedILP", generator, params, site)
+            for site, (generator, params) in itertools.product(
+                SITES, ILP_VIRTUAL_NETWORKS
+            )
+        )
+    return cases
+
+
+def packing_cases(ilp=False):
+    """Return the cases of the packing benchmark."""
+    cases = [
+        Case("packing", algorithm, generator, params, catalog)
+        for catalog, (generator, params), algorithm in itertools.product(
+            CATALOGS, VIRTUAL_NETWORKS, PACKING_ALGORITHMS
+        )
+    ]
+    if ilp:
+        cases.extend(
+            Case("packing", "PackILP", generator, params, catalog)
+            for catalog, (generator, params) in itertools.product(
+                CATALOGS, ILP_VIRTUAL_NETWORKS
+            )
+        )
+    return cases
+
+
+def partitioning_cases():
+    """Return the cases of the partitioning benchmark."""
+    return [
+        Case("partitioning", algorithm, generator, params, str(n_partitions))
+        for (generator, params), n_partitions, algorithm in itertools.product(
+            PARTITIONING_VIRTUAL_NETWORKS, N_PARTITIONS, PARTITIONING_ALGORITHMS
+        )
+    ]
@@ -0,0 +1,51 @@
+"""
+Run the partitioning backends of the embedding algorithms as solvers, to compare them directly.
+"""
+import random
+from collections import namedtuple
+
+from distriopt.constants import Solved
+from distriopt.decorators import timeit
+from distriopt.embedding.algorithms.kbalanced import GetPartitions
+from distriopt.embedding.algorithms.multilevel import multilevel_partition
+from distriopt.embedding.algorithms.partition import get_partitions
+from distriopt.stats import SolveStats
+
+# backend -> function returning the partitions of a virtual network
+BACKENDS = {
+    # recursive Kernighan-Lin bisection, used by EmbedBalanced
+    "kernighan_lin": lambda virtual, k: GetPartitions()(virtual.g, k),
+    # random partitions improved by moving or swapping nodes, used by EmbedPartition
+    "swap": lambda virtual, k: get_partitions(virtual, k),
+    "multilevel": lambda virtual, k: multilevel_partition(virtual.g, k, seed=0),
+}
+
+PartitionSolution = namedtuple("PartitionSolution", "partitions cost n_machines_used")
+
+
+class Partitioning(object):
+    """Partition a virtual network in n_partitions with a backend, the cost of the solution is the cut rate."""
+
+    def __init__(self, backend, virtual, n_partitions):
+        self.backend = backend
+        self.virtual = virtual
+        self.n_partitions = n_partitions
+        self.solution = None
+        self.status = None
+        self.stats = SolveStats()
+
+    @timeit
+    def solve(self, **kwargs):
+        # the backends using the random module are repeatable
+        random.seed(0)
+        with self.stats.phase("partitioning"):
+            partitions = BACKENDS[self.backend](self.virtual, self.n_partitions)
+        partition_of = {u: i for i, part in enumerate(partitions) for u in part}
+        cost = sum(
+            self.virtual.req_rate(u, v)
+            for (u, v) in self.virtual.edges()
+            if partition_of[u] != partition_of[v]
+        )
+        self.solution = PartitionSolution(partitions, cost, None)
+        self.status = Solved
+        return Solved
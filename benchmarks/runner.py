@@ -0,0 +1,236 @@
+"""
+Run the benchmark cases and compare their results.
+"""
+import datetime
+import functools
+import gc
+import json
+import logging
+import platform
+import subprocess
+import time
+import tracemalloc
+
+from distriopt.constants import SolutionStatus
+from distriopt.embedding import PhysicalNetwork
+from distriopt.packing import CloudInstance
+
+from .partitioning import Partitioning
+
+_log = logging.getLogger(__name__)
+
+
+def _load_physical(case, physical_cache):
+    """Return the physical instance of a case, each instance is read only once."""
+    key = (case.suite, case.physical)
+    if key not in physical_cache:
+        if case.suite == "partitioning":
+            physical = int(case.physical)
+        elif case.suite == "embedding":
+            physical = PhysicalNetwork.from_files(case.physical)
+            # compiled before the measures, so that it is not charged to the first run
+            physical.compile()
+        else:
+            physical = CloudInstance.read_ec2_instances(vm_type=case.physical)
+        physical_cache[key] = physical
+    return physical_cache[key]
+
+
+def _get_algorithm(case):
+    if case.suite == "partitioning":
+        return functools.partial(Partitioning, case.algorithm)
+    elif case.suite == "embedding":
+        from distriopt.embedding import algorithms
+    else:
+        from distriopt.packing import algorithms
+    return getattr(algorithms, case.algorithm)
+
+
+def _solve_kwargs(case, solver, timelimit, symmetry):
+    if case.algorithm == "EmbedILP":
+        return {"_get_solver": solver, "timelimit": timelimit, "symmetry": symmetry}
+    elif case.algorithm == "PackILP":
+        return {"solver": solver, "timelimit": timelimit}
+    elif case.algorithm in ("EmbedGreedy", "EmbedBalanced"):
+        # the partitions are computed at each run, otherwise only the first one would be measured
+        return {"cache": False}
+    return {}
+
+
+def _solve(case, physical, kwargs, trace_memory):
+    """Solve a case on a new virtual network and return (solver, wall time, peak memory)."""
+    algorithm = _get_algorithm(case)
+    virtual = case.create_virtual()
+    gc.collect()
+    if trace_memory:
+        tracemalloc.start()
+    try:
+        start = time.perf_counter()
+        prob = algorithm(virtual, physical)
+        prob.solve(**kwargs)
+        elapsed = time.perf_counter() - start
+        peak_memory = tracemalloc.get_traced_memory()[1] if trace_memory else None
+    finally:
+        if trace_memory:
+            tracemalloc.stop()
+    return prob, elapsed, peak_memory
+
+
+def run_case(
+    case, physical, repeat=1, memory=True, solver="cbc", timelimit=60, symmetry=True
+):
+    """Run a single case and return its result as a dict.
+
+    The wall time is the best over repeat runs, the peak memory is measured on a separate run
+    since tracing the allocations slows down the execution.
+    symmetry is passed to EmbedILP, so that the time to optimal can be compared with and without it.
+    """
+    result = {
+        "name": case.name,
+        "suite": case.suite,
+        "algorithm": case.algorithm,
+        "virtual": case.virtual,
+        "physical": case.physical,
+        "status": None,
+        "time": None,
+        "peak_memory": None,
+        "n_machines_used": None,
+        "cost": None,
+        "current_val": None,
+    }
+    kwargs = _solve_kwargs(case, solver, timelimit, symmetry)
+    try:
+        times = []
+        for _ in range(repeat):
+            prob, elapsed, _ = _solve(case, physical, kwargs, trace_memory=False)
+            times.append(elapsed)
+        if memory:
+            _, _, result["peak_memory"] = _solve(
+                case, physical, kwargs, trace_memory=True
+            )
+    except Exception as e:
+        _log.warning(f"{case.name} failed: {e!r}")
+        result["status"] = "Error"
+        result["error"] = repr(e)
+        return result
+
+    result["status"] = SolutionStatus[prob.status]
+    result["time"] = min(times)
+    result["current_val"] = getattr(prob, "current_val", None)
+    result["stats"] = prob.stats.as_dict()
+    if prob.solution is not None:
+        result["n_machines_used"] = getattr(prob.solution, "n_machines_used", None)
+        result["cost"] = getattr(prob.solution, "cost", None)
+    return result
+
+
+def run(
+    cases,
+    repeat=1,
+    memory=True,
+    solver="cbc",
+    timelimit=60,
+    symmetry=True,
+    callback=None,
+):
+    """Run the benchmark cases and return the list of their results.
+
+    If given, callback is called with each result as soon as it is available.
+    """
+    physical_cache = {}
+    results = []
+    for case in cases:
+        physical = _load_physical(case, physical_cache)
+        result = run_case(
+            case,
+            physical,
+            repeat=repeat,
+            memory=memory,
+            solver=solver,
+            timelimit=timelimit,
+            symmetry=symmetry,
+        )
+        results.append(result)
+        if callback is not None:
+            callback(result)
+    return results
+
+
+def _git_revision():
+    try:
+        return (
+            subprocess.check_output(
+                ["git", "rev-parse", "HEAD"], stderr=subprocess.DEVNULL
+            )
+            .decode()
+            .strip()
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def save(results, filename):
+    """Store the results in a JSON file together with the commit they refer to."""
+    with open(filename, "w") as f:
+        json.dump(
+            {
+                "commit": _git_revision(),
+                "date": datetime.datetime.now().isoformat(timespec="seconds"),
+                "python": platform.python_version(),
+                "results": results,
+            },
+            f,
+            indent=2,
+        )
+
+
+def load(filename):
+    """Return the results stored in a JSON file."""
+    with open(filename) as f:
+        return json.load(f)["results"]
+
+
+def _quality(result):
+    """Value of the solution found, the lower the better (the cut rate for the partitioning)."""
+    if result["suite"] == "embedding":
+        return result["n_machines_used"]
+    return result["cost"]
+
+
+def compare(old_results, new_results, threshold=0.1, min_delta=0.005):
+    """Compare two lists of results of the same cases.
+
+    Return a list of dicts, one for each case present in both lists, with the ratio between
+    the new and the old wall time and whether the case regressed, either because it became
+    slower by more than threshold (and by more than min_delta seconds, to ignore the noise on the
+    smallest cases) or because its solution got worse.
+    """
+    old_by_name = {result["name"]: result for result in old_results}
+    rows = []
+    for new in new_results:
+        old = old_by_name.get(new["name"])
+        if old is None:
+            continue
+        if old["time"] and new["time"] is not None:
+            ratio = new["time"] / old["time"]
+            slower = ratio > 1 + threshold and new["time"] - old["time"] > min_delta
+        else:
+            ratio, slower = None, False
+        old_quality, new_quality = _quality(old), _quality(new)
+        worse_solution = (old["status"] == "Solved" and new["status"] != "Solved") or (
+            old_quality is not None
+            and new_quality is not None
+            and new_quality > old_quality
+        )
+        rows.append(
+            {
+                "name": new["name"],
+                "old_time": old["time"],
+                "new_time": new["time"],
+                "ratio": ratio,
+                "old_quality": old_quality,
+                "new_quality": new_quality,
+                "regression": worse_solution or slower,
+            }
+        )
+    return rows
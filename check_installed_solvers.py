@@ -19,17 +19,17 @@ class TestSolver(object):
     def test_glpk(self, ilp):
         """Test method for GLPK."""
         try:
-            ilp.solve(pulp.GLPK())
+            ilp.solve(pulp.GLPK_CMD())
             assert round(pulp.value(ilp.objective), 0) == 5
-        except pulp.solvers.PulpSolverError:
+        except pulp.PulpSolverError:
             pytest.fail(f"Solver not installed")
 
     def test_cbc(self, ilp):
         """Test method for CBC."""
         try:
-            ilp.solve(pulp.COIN())
+            ilp.solve(pulp.PULP_CBC_CMD())
             assert round(pulp.value(ilp.objective), 0) == 5
-        except pulp.solvers.PulpSolverError:
+        except pulp.PulpSolverError:
             pytest.fail(f"Solver not installed")
 
     def test_cplex(self, ilp):
@@ -37,7 +37,7 @@ class TestSolver(object):
         try:
             ilp.solve(pulp.CPLEX_PY())
             assert round(pulp.value(ilp.objective), 0) == 5
-        except pulp.solvers.PulpSolverError:
+        except pulp.PulpSolverError:
             pytest.fail(f"Solver not installed")
 
     def test_gurobi(self, ilp):
@@ -45,13 +45,27 @@ class TestSolver(object):
         try:
             ilp.solve(pulp.GUROBI())
             assert round(pulp.value(ilp.objective), 0) == 5
-        except pulp.solvers.PulpSolverError:
+        except pulp.PulpSolverError:
             pytest.fail(f"Solver not installed")
 
     def test_scip(self, ilp):
         """Test method for SCIP."""
         try:
-            ilp.solve(pulp.SCIP())
+            ilp.solve(pulp.SCIP_CMD())
             assert round(pulp.value(ilp.objective), 0) == 5
-        except pulp.solvers.PulpSolverError:
+        except pulp.PulpSolverError:
             pytest.fail(f"Solver not installed")
+
+    def test_highs(self):
+        """Test method for HiGHS, through scipy."""
+        try:
+            from scipy.optimize import Bounds, LinearConstraint, milp
+        except ImportError:
+            pytest.fail(f"Solver not installed")
+        result = milp(
+            [1, 1],
+            integrality=[1, 1],
+            bounds=Bounds([0, 5], [10, 10]),
+            constraints=LinearConstraint([[1, 1]], -float("inf"), 6),
+        )
+        assert round(result.fun) == 5
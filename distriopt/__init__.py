@@ -2,6 +2,7 @@ import logging
 from logging import NullHandler
 
 from .constants import SolutionStatus
+from .stats import SolveStats
 from .virtual import VirtualNetwork
 
 logging.getLogger(__name__).addHandler(NullHandler())
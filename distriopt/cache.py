@@ -0,0 +1,105 @@
+"""
+Caches of the objects expensive to compute, e.g., compiled networks and partitions.
+
+Files are stored only in the directory given by the DISTRIOPT_CACHE_DIR environment variable: if it is not
+set, nothing is read from or written to disk and the caches are kept in memory only.
+"""
+import hashlib
+import logging
+import os
+import pickle
+import tempfile
+from collections import OrderedDict
+
+_log = logging.getLogger(__name__)
+
+
+def cache_dir():
+    """Return the directory of the cache, None if not configured."""
+    return os.environ.get("DISTRIOPT_CACHE_DIR") or None
+
+
+def cache_path(kind, key):
+    """Return the path of the cached object of the given kind for a key (a string), None without a cache directory."""
+    directory = cache_dir()
+    if directory is None:
+        return None
+    digest = hashlib.sha256(key.encode()).hexdigest()
+    return os.path.join(directory, f"{kind}-{digest}.pickle")
+
+
+def load_cached(cache_file):
+    """Return the object stored in cache_file, None if missing, unreadable or if cache_file is None."""
+    if cache_file is None:
+        return None
+    try:
+        with open(cache_file, "rb") as f:
+            return pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as err:
+        _log.warning(f"ignoring invalid cached file {cache_file}: {err}")
+        return None
+
+
+def dump_cached(cache_file, obj):
+    """Store the object in cache_file, the cache is skipped if it cannot be written or if cache_file is None."""
+    if cache_file is None:
+        return
+    try:
+        os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+        # write to a temporary file first, so that concurrent readers never see a partial file
+        fd, tmp_file = tempfile.mkstemp(dir=os.path.dirname(cache_file))
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump(obj, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_file, cache_file)
+    except OSError as err:
+        _log.warning(f"cannot write the cached file {cache_file}: {err}")
+
+
+class Cache(object):
+    """Objects of a kind, kept in memory (at most maxsize, the least recently used is evicted first)
+    and, if persistent, also on disk to be shared between processes.
+
+    Keys are strings, values must be picklable and are not copied: callers should not modify them.
+    """
+
+    def __init__(self, kind, maxsize=32, persistent=True):
+        self.kind = kind
+        self.maxsize = maxsize
+        self.persistent = persistent
+        self._values = OrderedDict()
+
+    def get(self, key):
+        """Return the value stored for key, None if missing."""
+        try:
+            self._values.move_to_end(key)
+            return self._values[key]
+        except KeyError:
+            pass
+        if not self.persistent:
+            return None
+        value = load_cached(cache_path(self.kind, key))
+        if value is not None:
+            self._store(key, value)
+        return value
+
+    def put(self, key, value):
+        """Store value for key."""
+        self._store(key, value)
+        if self.persistent:
+            dump_cached(cache_path(self.kind, key), value)
+
+    def clear(self):
+        """Drop the values kept in memory, the ones on disk are kept."""
+        self._values.clear()
+
+    def _store(self, key, value):
+        self._values[key] = value
+        self._values.move_to_end(key)
+        while len(self._values) > self.maxsize:
+            self._values.popitem(last=False)
+
+
+# partitions of the virtual networks, keyed by their fingerprint (see VirtualNetwork.fingerprint)
+partitions_cache = Cache("partitions")
@@ -3,51 +3,132 @@ Contains decorators used in the module.
 """
 import functools
 import time
+import weakref
+from collections import OrderedDict, namedtuple
+
+from distriopt.stats import SolveStats
 
 
 def timeit(func):
-    """Decorator to measure the time spent by a function."""
+    """Decorator to measure the time spent by a function, return the tuple (seconds, result).
+
+    If the function is a method of an object with a SolveStats stats attribute (e.g., a solver),
+    the stats are reset before the call and the registered stats hooks are called after it.
+    """
 
     @functools.wraps(func)
     def timed(*args, **kwargs):
-        start = time.time()
+        stats = getattr(args[0], "stats", None) if args else None
+        if not isinstance(stats, SolveStats):
+            stats = None
+        if stats is not None:
+            stats.reset()
+            stats.algorithm = type(args[0]).__name__
+        start = time.perf_counter()
         result = func(*args, **kwargs)
-        end = time.time()
+        end = time.perf_counter()
+        if stats is not None:
+            stats.time = end - start
+            stats.status = result
+            stats.notify(args[0])
         return end - start, result
 
     return timed
 
 
-def cached(func):
-    """Decorator to cache the result of a function call."""
+CacheInfo = namedtuple("CacheInfo", ["hits", "misses", "maxsize", "currsize"])
+
+
+class _InstanceCache(object):
+    """Results of a method, kept separately for each instance.
+
+    Results are stored in a WeakKeyDictionary keyed by the instance, so they are dropped together with it.
+    Each instance keeps at most maxsize results (None for no limit), the least recently used is evicted first.
+    """
+
+    def __init__(self, func, maxsize):
+        self._func = func
+        self._values = weakref.WeakKeyDictionary()
+        self.maxsize = maxsize
+        self.hits = self.misses = 0
+
+    def get(self, instance, key, *args, **kwargs):
+        """Return the cached result for key, compute it with func(instance, *args, **kwargs) if missing."""
+        values = self._values.get(instance)
+        if values is None:
+            values = self._values[instance] = OrderedDict()
+        elif key in values:
+            self.hits += 1
+            values.move_to_end(key)
+            return values[key]
+
+        self.misses += 1
+        value = values[key] = self._func(instance, *args, **kwargs)
+        if self.maxsize is not None and len(values) > self.maxsize:
+            values.popitem(last=False)
+        return value
+
+    def clear(self, instance=None):
+        """Drop the results of an instance, or of all instances if not given."""
+        if instance is None:
+            self._values.clear()
+        else:
+            self._values.pop(instance, None)
+
+    def info(self):
+        """Return hits, misses, maxsize (per instance) and current number of results."""
+        return CacheInfo(
+            self.hits,
+            self.misses,
+            self.maxsize,
+            sum(len(values) for values in self._values.values()),
+        )
+
+
+def cached(func=None, maxsize=128):
+    """Decorator to cache the result of a method call, per instance.
+
+    It can be used either as @cached or as @cached(maxsize=n). The decorated method exposes
+    cache_info() and cache_clear(instance=None) to get statistics and invalidate results.
+    """
+    if func is None:
+        return functools.partial(cached, maxsize=maxsize)
 
-    func.cache = {}
+    cache = _InstanceCache(func, maxsize)
 
     @functools.wraps(func)
-    def wrapper(*args, **kwargs):
+    def wrapper(self, *args, **kwargs):
         if kwargs:
             key = args, frozenset(kwargs.items())
         else:
             key = args
-        if key not in func.cache:
-            func.cache[key] = func(*args, **kwargs)
-        return func.cache[key]
+        return cache.get(self, key, *args, **kwargs)
 
+    wrapper.cache_info = cache.info
+    wrapper.cache_clear = cache.clear
     return wrapper
 
 
-def cachedproperty(func):
-    """Decorator to cache property values."""
-    values = {}
+class cachedproperty(object):
+    """Decorator to cache property values, per instance.
 
-    @property
-    @functools.wraps(func)
-    def wrapper(self):
-        if self not in values:
-            values[self] = func(self)
-        return values[self]
+    Deleting the attribute (del instance.name) invalidates the value of that instance.
+    cache_info() and cache_clear(instance=None) are available on the class attribute.
+    """
 
-    return wrapper
+    def __init__(self, func):
+        functools.update_wrapper(self, func)
+        self._cache = _InstanceCache(func, maxsize=1)
+        self.cache_info = self._cache.info
+        self.cache_clear = self._cache.clear
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        return self._cache.get(instance, None)
+
+    def __delete__(self, instance):
+        self._cache.clear(instance)
 
 
 def implemented_if_true(name):
@@ -0,0 +1,671 @@
+"""
+Arc-flow ILP model of the embedding problem, built directly as sparse arrays.
+
+The model is
+    min  c x   s.t.   row_lower <= A x <= row_upper,   0 <= x <= 1,   x integer where integrality is 1
+and can be written as an MPS file, converted to a pulp problem or handed to HiGHS through scipy
+(see SparseModel, shared with the path formulation of pathflow).
+"""
+import logging
+from collections import defaultdict
+
+import numpy as np
+import scipy.sparse as sp
+from scipy.sparse import csgraph
+
+_log = logging.getLogger(__name__)
+
+
+def host_classes(network):
+    """Return the classes of interchangeable physical nodes of a compiled network, as sorted lists of indices.
+
+    Two compute nodes are interchangeable if they have the same cores and memory and interfaces with the same
+    rates towards the same neighbors, only the classes of at least two nodes are returned.
+    """
+    classes = defaultdict(list)
+    for i in range(network.n_nodes):
+        if network.cores_view[i] <= 0 or network.memory_view[i] <= 0:
+            continue
+        slots = range(
+            network.iface_ptr_view[network.indptr_view[i]],
+            network.iface_ptr_view[network.indptr_view[i + 1]],
+        )
+        interfaces = sorted(
+            (int(network.iface_dst[s]), network.rate_view[s]) for s in slots
+        )
+        classes[
+            (network.cores_view[i], network.memory_view[i], tuple(interfaces))
+        ].append(i)
+    return [hosts for hosts in classes.values() if len(hosts) > 1]
+
+
+class SparseModel(object):
+    """Sparse ILP model of the embedding problem, as in the module docstring.
+
+    The subclasses set c, A (in CSR format), row_lower, row_upper, integrality, n_variables, n_constraints,
+    variable_names and constraint_names (None if not named), and for the relabelling of the physical nodes
+    network (the compiled physical network), virtual_nodes, fits and host_classes.
+    """
+
+    def write_mps(self, filename):
+        """Write the model in MPS format, the variables and constraints are numbered if not named.
+
+        The fields are aligned as in the fixed format, so that the file is read by the solvers
+        that guess the format from the first lines.
+        """
+        variable_names = self.variable_names or [
+            f"x{j}" for j in range(self.n_variables)
+        ]
+        constraint_names = self.constraint_names or [
+            f"c{r}" for r in range(self.n_constraints)
+        ]
+        A = self.A.tocsc()
+        lines = ["NAME          Mapping_ILP", "ROWS", " N  OBJ"]
+        for name, lower, upper in zip(constraint_names, self.row_lower, self.row_upper):
+            sense = "E" if lower == upper else ("L" if lower == -np.inf else "G")
+            lines.append(f" {sense}  {name}")
+        lines.append("COLUMNS")
+        integer = False
+        for j, name in enumerate(variable_names):
+            if self.integrality[j] != integer:
+                integer = not integer
+                marker = "'INTORG'" if integer else "'INTEND'"
+                lines.append(f"    MARK      'MARKER'                 {marker}")
+            if self.c[j]:
+                lines.append(f"    {name:<8}  {'OBJ':<8}  {self.c[j]:.12g}")
+            for r, value in zip(
+                A.indices[A.indptr[j] : A.indptr[j + 1]].tolist(),
+                A.data[A.indptr[j] : A.indptr[j + 1]].tolist(),
+            ):
+                lines.append(f"    {name:<8}  {constraint_names[r]:<8}  {value:.12g}")
+        if integer:
+            lines.append("    MARK      'MARKER'                 'INTEND'")
+        lines.append("RHS")
+        for name, lower, upper in zip(constraint_names, self.row_lower, self.row_upper):
+            rhs = upper if upper != np.inf else lower
+            if rhs:
+                lines.append(f"    RHS       {name:<8}  {rhs:.12g}")
+        lines.append("BOUNDS")
+        lines.extend(f" UP BND       {name:<8}  1" for name in variable_names)
+        lines.append("ENDATA")
+        with open(filename, "w") as f:
+            f.write("\n".join(lines))
+            f.write("\n")
+
+    def to_pulp(self):
+        """Return a pulp problem equivalent to the model and the list of its variables, in the model order."""
+        import pulp
+
+        variable_names = self.variable_names or [
+            f"x{j}" for j in range(self.n_variables)
+        ]
+        variables = [
+            pulp.LpVariable(
+                name,
+                lowBound=0,
+                upBound=1,
+                cat=pulp.LpInteger if integer else pulp.LpContinuous,
+            )
+            for name, integer in zip(variable_names, self.integrality.tolist())
+        ]
+        problem = pulp.LpProblem("Mapping_ILP", pulp.LpMinimize)
+        objective = {
+            variables[j]: value
+            for j, value in zip(
+                np.flatnonzero(self.c).tolist(), self.c[self.c != 0].tolist()
+            )
+        }
+        if objective:
+            problem += pulp.LpAffineExpression(objective)
+        else:
+            # an empty objective is not accepted by all the solvers
+            problem += pulp.LpVariable("dummy", lowBound=1, upBound=1)
+
+        A = self.A
+        indptr, indices, data = A.indptr.tolist(), A.indices.tolist(), A.data.tolist()
+        for r, (lower, upper) in enumerate(
+            zip(self.row_lower.tolist(), self.row_upper.tolist())
+        ):
+            expression = pulp.LpAffineExpression(
+                {
+                    variables[j]: value
+                    for j, value in zip(
+                        indices[indptr[r] : indptr[r + 1]],
+                        data[indptr[r] : indptr[r + 1]],
+                    )
+                }
+            )
+            if lower == upper:
+                sense, rhs = pulp.LpConstraintEQ, lower
+            elif lower == -np.inf:
+                sense, rhs = pulp.LpConstraintLE, upper
+            else:
+                sense, rhs = pulp.LpConstraintGE, lower
+            problem.addConstraint(
+                pulp.LpConstraint(expression, sense, rhs=rhs),
+                None if self.constraint_names is None else self.constraint_names[r],
+            )
+        return problem, variables
+
+    def solve_highs(self, timelimit):
+        """Solve the model with HiGHS through scipy, return the scipy result."""
+        from scipy.optimize import Bounds, LinearConstraint, milp
+
+        return milp(
+            self.c,
+            integrality=self.integrality,
+            bounds=Bounds(0, 1),
+            constraints=LinearConstraint(self.A, self.row_lower, self.row_upper),
+            options={"time_limit": timelimit},
+        )
+
+    def _relabelling(self, solution):
+        """Return the physical node and the slot taking the place of each one to sort the interchangeable
+        physical nodes used by the solution by the first virtual node they host (all the indices).
+        """
+        network = self.network
+        node_of = np.arange(network.n_nodes)
+        for hosts in self.host_classes:
+            rank = np.cumsum(self.fits[:, hosts[0]]) - 1
+            first = {i: np.inf for i in hosts}
+            for n, u in enumerate(self.virtual_nodes):
+                i = network.index[solution.node_info(u)]
+                if i in first:
+                    first[i] = min(first[i], rank[n])
+            node_of[sorted(hosts, key=lambda i: (first[i], i))] = hosts
+
+        # the slots between two physical nodes are matched by rate, the interchangeable nodes have the same ones
+        entry_slots = [
+            sorted(
+                range(network.iface_ptr_view[k], network.iface_ptr_view[k + 1]),
+                key=lambda s: (network.rate_view[s], s),
+            )
+            for k in range(len(network.indices_view))
+        ]
+        slot_of = np.arange(len(network.slot_view))
+        for k, slots in enumerate(entry_slots):
+            i, j = network.iface_src_view[slots[0]], network.indices_view[k]
+            if node_of[i] != i or node_of[j] != j:
+                target = entry_slots[
+                    network.adjacency[
+                        (network.node_ids[node_of[i]], network.node_ids[node_of[j]])
+                    ]
+                ]
+                slot_of[slots] = target
+        return node_of, slot_of
+
+
+class ArcFlowModel(SparseModel):
+    """Arc-flow formulation of the mapping of a virtual network onto a physical network.
+
+    Variables, in this order:
+    - link mapping: for each virtual link e (in sorted_edges order) and each interface slot s of the compiled
+      physical network (a direction i->j of an interface), whether e is routed on s, at index e * n_slots + s;
+    - node mapping: for each virtual node u and physical node i, whether u is mapped on i;
+    - usage (only for obj="min_n_machines"): for each physical node i, whether it hosts a virtual node.
+
+    The constraints are the assignment of each virtual node, the cores and memory of each physical node,
+    the flow conservation of each virtual link on each physical node, the rate of each physical interface,
+    a single interface to leave and to reach each physical node, a single direction of each interface and
+    the usage of the physical nodes.
+    If names is True, each variable and constraint gets a descriptive name, otherwise they are only numbered.
+
+    If presolve is True, the variables that are 0 in every solution without cycles are removed:
+    the mapping of a virtual node on a switch or on a physical node too small for it, the usage of a physical
+    node fitting no virtual node and the slots that cannot be on a path of at most max_hops hops (any simple
+    path if None) between physical nodes fitting the ends of the virtual link. The constraints left empty are
+    removed, and the usage constraints are aggregated in the cores and memory ones.
+    The variables and the constraints kept are at the indices columns and rows of the full model.
+
+    If symmetry is True, the interchangeable physical nodes (see host_classes) are used in order of the first
+    virtual node they host: the k-th node of a class hosts none of the first k virtual nodes fitting it, and
+    with obj="min_n_machines" it is used only if the (k-1)-th one is.
+    """
+
+    def __init__(
+        self,
+        virtual,
+        physical,
+        obj="min_n_machines",
+        names=False,
+        presolve=True,
+        max_hops=None,
+        symmetry=True,
+    ):
+        if obj not in ("min_n_machines", "min_bw", "no_obj"):
+            raise ValueError("undefined objective")
+        self.virtual = virtual
+        self.physical = physical
+        self.obj = obj
+        self.network = network = physical.compile()
+
+        self.virtual_nodes = list(virtual.nodes())
+        self.virtual_links = list(virtual.sorted_edges())
+        index = {u: n for n, u in enumerate(self.virtual_nodes)}
+        n_nodes, n_links = len(self.virtual_nodes), len(self.virtual_links)
+        n_phy, n_slots, n_ifaces = (
+            network.n_nodes,
+            len(network.iface_key),
+            len(network.edge_ends),
+        )
+        self.n_slots = n_slots
+
+        # offsets of the groups of variables
+        self.node_offset = n_links * n_slots
+        self.usage_offset = self.node_offset + n_nodes * n_phy
+        n_variables = self.usage_offset + (n_phy if obj == "min_n_machines" else 0)
+
+        link_u = np.array([index[u] for (u, v) in self.virtual_links], dtype=np.int64)
+        link_v = np.array([index[v] for (u, v) in self.virtual_links], dtype=np.int64)
+        link_rate = np.array(
+            [virtual.req_rate(u, v) for (u, v) in self.virtual_links], dtype=float
+        )
+        req_cores = np.array(
+            [virtual.req_cores(u) for u in self.virtual_nodes], dtype=float
+        )
+        req_memory = np.array(
+            [virtual.req_memory(u) for u in self.virtual_nodes], dtype=float
+        )
+
+        # physical nodes each virtual node can be mapped on
+        if presolve:
+            self.fits = (
+                (network.cores > 0)
+                & (network.memory > 0)
+                & (req_cores[:, None] <= network.cores)
+                & (req_memory[:, None] <= network.memory)
+            )
+        else:
+            self.fits = np.ones((n_nodes, n_phy), dtype=bool)
+        keep = np.ones(n_variables, dtype=bool)
+        if presolve:
+            keep[: self.node_offset] = self._useful_slots(
+                link_u, link_v, max_hops
+            ).ravel()
+            keep[self.node_offset : self.usage_offset] = self.fits.ravel()
+            if obj == "min_n_machines":
+                keep[self.usage_offset :] = self.fits.any(axis=0)
+        # the k-th virtual node fitting a class of interchangeable physical nodes is on one of its first k
+        self.host_classes = host_classes(network) if symmetry else []
+        self.symmetric_pairs = []
+        if symmetry:
+            for hosts in self.host_classes:
+                rank = np.cumsum(self.fits[:, hosts[0]]) - 1
+                for k, i in enumerate(hosts):
+                    keep[self.node_offset + np.arange(n_nodes) * n_phy + i] &= rank >= k
+                self.symmetric_pairs.extend(zip(hosts, hosts[1:]))
+        # the resources of a physical node are available only if it is used
+        aggregate = presolve and obj == "min_n_machines"
+
+        # (e, s) pairs and (u, i) pairs, flattened in the order of the variables
+        e_of_link = np.repeat(np.arange(n_links), n_slots)
+        s_of_link = np.tile(np.arange(n_slots), n_links)
+        link_var = np.arange(self.node_offset)
+        u_of_node = np.repeat(np.arange(n_nodes), n_phy)
+        i_of_node = np.tile(np.arange(n_phy), n_nodes)
+        node_var = self.node_offset + np.arange(n_nodes * n_phy)
+
+        # each block of constraints is (rows, cols, coefficients, lower bounds, upper bounds)
+        blocks = []
+        self._row_kinds = []
+
+        def add_block(kind, n_rows, rows, cols, data, lower, upper):
+            blocks.append(
+                (
+                    np.concatenate(rows),
+                    np.concatenate(cols),
+                    np.concatenate(data),
+                    np.broadcast_to(np.asarray(lower, dtype=float), (n_rows,)),
+                    np.broadcast_to(np.asarray(upper, dtype=float), (n_rows,)),
+                )
+            )
+            self._row_kinds.append((kind, n_rows))
+
+        # assignment of each virtual node to a physical node
+        add_block(
+            "assignment",
+            n_nodes,
+            [u_of_node],
+            [node_var],
+            [np.ones(len(node_var))],
+            1,
+            1,
+        )
+        # cores and memory of each physical node
+        usage_var = self.usage_offset + np.arange(n_phy)
+        for kind, req, capacity in (
+            ("cores", req_cores, network.cores),
+            ("memory", req_memory, network.memory),
+        ):
+            if aggregate:
+                add_block(
+                    kind,
+                    n_phy,
+                    [i_of_node, np.arange(n_phy)],
+                    [node_var, usage_var],
+                    [req[u_of_node], -capacity],
+                    -np.inf,
+                    0,
+                )
+            else:
+                add_block(
+                    kind,
+                    n_phy,
+                    [i_of_node],
+                    [node_var],
+                    [req[u_of_node]],
+                    -np.inf,
+                    capacity,
+                )
+        # flow conservation on each physical node i for each virtual link e (row e * n_phy + i):
+        # what leaves i minus what reaches i is 1 on the host of u and -1 on the host of v
+        src = network.iface_src[s_of_link]
+        dst = network.iface_dst[s_of_link]
+        e_of_u = np.repeat(np.arange(n_links), n_phy)
+        i_of_u = np.tile(np.arange(n_phy), n_links)
+        add_block(
+            "conservation",
+            n_links * n_phy,
+            [
+                e_of_link * n_phy + src,
+                e_of_link * n_phy + dst,
+                e_of_u * n_phy + i_of_u,
+                e_of_u * n_phy + i_of_u,
+            ],
+            [
+                link_var,
+                link_var,
+                self.node_offset + link_u[e_of_u] * n_phy + i_of_u,
+                self.node_offset + link_v[e_of_u] * n_phy + i_of_u,
+            ],
+            [
+                np.ones(len(link_var)),
+                -np.ones(len(link_var)),
+                -np.ones(len(e_of_u)),
+                np.ones(len(e_of_u)),
+            ],
+            0,
+            0,
+        )
+        # rate of each physical interface, used in both directions
+        add_block(
+            "capacity",
+            n_ifaces,
+            [network.iface_edge[s_of_link]],
+            [link_var],
+            [link_rate[e_of_link]],
+            -np.inf,
+            network.edge_rate,
+        )
+        # a virtual link leaves and reaches each physical node through at most an interface
+        add_block(
+            "leave",
+            n_links * n_phy,
+            [e_of_link * n_phy + src],
+            [link_var],
+            [np.ones(len(link_var))],
+            -np.inf,
+            1,
+        )
+        add_block(
+            "reach",
+            n_links * n_phy,
+            [e_of_link * n_phy + dst],
+            [link_var],
+            [np.ones(len(link_var))],
+            -np.inf,
+            1,
+        )
+        # a virtual link uses an interface in a single direction
+        add_block(
+            "direction",
+            n_links * n_ifaces,
+            [e_of_link * n_ifaces + network.iface_edge[s_of_link]],
+            [link_var],
+            [np.ones(len(link_var))],
+            -np.inf,
+            1,
+        )
+        if obj == "min_n_machines":
+            # a physical node is used if a virtual node is mapped on it (row u * n_phy + i),
+            # when aggregated, only the virtual nodes requiring no resources need it
+            rows = np.arange(n_nodes * n_phy)
+            if aggregate:
+                rows = rows[(req_cores[u_of_node] == 0) & (req_memory[u_of_node] == 0)]
+            add_block(
+                "usage",
+                n_nodes * n_phy,
+                [rows, rows],
+                [node_var[rows], self.usage_offset + i_of_node[rows]],
+                [-np.ones(len(rows)), np.ones(len(rows))],
+                0,
+                np.inf,
+            )
+            # the interchangeable physical nodes are used in order
+            first, second = (
+                np.array(self.symmetric_pairs, dtype=np.int64).reshape(-1, 2).T
+            )
+            rows = np.arange(len(self.symmetric_pairs))
+            add_block(
+                "symmetry",
+                len(rows),
+                [rows, rows],
+                [self.usage_offset + first, self.usage_offset + second],
+                [np.ones(len(rows)), -np.ones(len(rows))],
+                0,
+                np.inf,
+            )
+
+        # stack the blocks, each one after the rows of the previous ones
+        rows, cols, data, lower, upper = [], [], [], [], []
+        n_rows = 0
+        for block, (kind, n_block_rows) in zip(blocks, self._row_kinds):
+            rows.append(block[0] + n_rows)
+            cols.append(block[1])
+            data.append(block[2])
+            lower.append(block[3])
+            upper.append(block[4])
+            n_rows += n_block_rows
+        self.n_full_variables = n_variables
+        self.columns = np.flatnonzero(keep)
+        A = sp.csr_matrix(
+            (np.concatenate(data), (np.concatenate(rows), np.concatenate(cols))),
+            shape=(n_rows, n_variables),
+        )[:, self.columns]
+        row_lower = np.concatenate(lower)
+        row_upper = np.concatenate(upper)
+        # an empty constraint is either always satisfied or never
+        empty = np.diff(A.indptr) == 0
+        self.infeasible = bool(np.any(empty & ((row_lower > 0) | (row_upper < 0))))
+        self.rows = np.flatnonzero(~empty | (row_lower > 0) | (row_upper < 0))
+        self.A = A[self.rows]
+        self.row_lower = row_lower[self.rows]
+        self.row_upper = row_upper[self.rows]
+        self.n_variables, self.n_constraints = len(self.columns), len(self.rows)
+
+        c = np.zeros(n_variables)
+        if obj == "min_n_machines":
+            c[self.usage_offset :] = 1
+        elif obj == "min_bw":
+            c[: self.node_offset] = link_rate[e_of_link]
+        self.c = c[self.columns]
+        # the flows on grouped interfaces can be split
+        integrality = np.ones(n_variables, dtype=np.int8)
+        if physical.grouped_interfaces:
+            integrality[: self.node_offset] = 0
+        self.integrality = integrality[self.columns]
+
+        self.variable_names, self.constraint_names = (
+            self._names() if names else (None, None)
+        )
+
+    def _useful_slots(self, link_u, link_v, max_hops):
+        """Return for each virtual link and each slot whether the slot can be on a path from a physical node
+        fitting u to one fitting v, with at most max_hops hops (n_nodes - 1 if None, any simple path).
+        """
+        network = self.network
+        n_phy = network.n_nodes
+        adjacency = sp.csr_matrix(
+            (np.ones(len(network.indices)), network.indices, network.indptr),
+            shape=(n_phy, n_phy),
+        )
+        hops = csgraph.shortest_path(adjacency, unweighted=True)
+        # hops from the closest physical node fitting each virtual node, computed once for equal fits
+        fits, inverse = np.unique(self.fits, axis=0, return_inverse=True)
+        hops_from = np.array(
+            [hops[f].min(axis=0) if f.any() else np.full(n_phy, np.inf) for f in fits]
+        )[inverse.ravel()]
+
+        src, dst = network.iface_src, network.iface_dst
+        bound = n_phy - 1 if max_hops is None else max_hops
+        useful = hops_from[link_u][:, src] + 1 + hops_from[link_v][:, dst] <= bound
+        # a path leaves a node with a single neighbor only if it starts there, and reaches it only if it ends there
+        single = np.diff(network.indptr) == 1
+        useful &= ~single[src] | self.fits[link_u][:, src]
+        useful &= ~single[dst] | self.fits[link_v][:, dst]
+        return useful
+
+    def expand(self, x):
+        """Return the values of the variables of the full model, given the ones of the variables kept."""
+        values = np.zeros(self.n_full_variables)
+        values[self.columns] = x
+        return values
+
+    def _names(self):
+        """Return the descriptive names of the variables and of the constraints."""
+        network = self.network
+        phy_nodes = network.node_ids.tolist()
+        slots = network.slot_view
+        variable_names = [
+            f"link_mapping_{u}_{v}_{i}_{j}_{device_id}"
+            for (u, v) in self.virtual_links
+            for (i, j, device_id) in slots
+        ]
+        variable_names += [
+            f"node_mapping_{u}_{i}" for u in self.virtual_nodes for i in phy_nodes
+        ]
+        if self.obj == "min_n_machines":
+            variable_names += [f"usage_{i}" for i in phy_nodes]
+
+        per_kind = {
+            "assignment": lambda: (f"assignment_of_{u}" for u in self.virtual_nodes),
+            "cores": lambda: (f"cores_of_{i}" for i in phy_nodes),
+            "memory": lambda: (f"memory_of_{i}" for i in phy_nodes),
+            "conservation": lambda: (
+                f"conservation_{u}_{v}_on_{i}"
+                for (u, v) in self.virtual_links
+                for i in phy_nodes
+            ),
+            "capacity": lambda: (
+                f"capacity_of_{i}_{j}_{device_id}"
+                for (i, j, device_id) in network.edge_ends
+            ),
+            "leave": lambda: (
+                f"leave_{u}_{v}_from_{i}"
+                for (u, v) in self.virtual_links
+                for i in phy_nodes
+            ),
+            "reach": lambda: (
+                f"reach_{u}_{v}_to_{i}"
+                for (u, v) in self.virtual_links
+                for i in phy_nodes
+            ),
+            "direction": lambda: (
+                f"direction_{u}_{v}_on_{i}_{j}_{device_id}"
+                for (u, v) in self.virtual_links
+                for (i, j, device_id) in network.edge_ends
+            ),
+            "usage": lambda: (
+                f"usage_{u}_on_{i}" for u in self.virtual_nodes for i in phy_nodes
+            ),
+            "symmetry": lambda: (
+                f"symmetry_{phy_nodes[i]}_{phy_nodes[j]}"
+                for (i, j) in self.symmetric_pairs
+            ),
+        }
+        constraint_names = [
+            name for (kind, _) in self._row_kinds for name in per_kind[kind]()
+        ]
+        # names cannot contain spaces in the MPS and LP files
+        return (
+            [variable_names[j].replace(" ", "_") for j in self.columns.tolist()],
+            [constraint_names[r].replace(" ", "_") for r in self.rows.tolist()],
+        )
+
+    def initial_values(self, solution):
+        """Return the values of the variables corresponding to an embedding solution, e.g., found by a heuristic,
+        or None if the solution uses variables removed from the model.
+
+        The interchangeable physical nodes are relabelled to follow the order required by the symmetry breaking.
+        """
+        network = self.network
+        n_phy = network.n_nodes
+        # physical node and slot corresponding to each one in the solution
+        node_of, slot_of = self._relabelling(solution)
+        # (i, j, interface name on the i side) -> slot, grouped interfaces have no name
+        slots = {
+            (i, j, network.iface_name[s]): s
+            for s, (i, j, device_id) in enumerate(network.slot_view)
+        }
+
+        values = np.zeros(self.n_full_variables)
+        for n, u in enumerate(self.virtual_nodes):
+            i = node_of[network.index[solution.node_info(u)]]
+            values[self.node_offset + n * n_phy + i] = 1
+            if self.obj == "min_n_machines":
+                values[self.usage_offset + i] = 1
+        for e, (u, v) in enumerate(self.virtual_links):
+            for path in solution.path_info((u, v)):
+                for (i, i_device, j_device, j) in path.path:
+                    name = None if self.physical.grouped_interfaces else i_device
+                    values[
+                        e * self.n_slots + slot_of[slots[(i, j, name)]]
+                    ] += path.f_rate
+
+        removed = np.ones(self.n_full_variables, dtype=bool)
+        removed[self.columns] = False
+        if np.any(values[removed] > 1e-9):
+            _log.warning("the initial solution uses variables removed from the model")
+            return None
+        return values[self.columns]
+
+    def node_mapping(self, x):
+        """Return a dict mapping each virtual node to its physical node in the solution x."""
+        n_phy = self.network.n_nodes
+        values = self.expand(x)[self.node_offset : self.usage_offset].reshape(-1, n_phy)
+        return {
+            u: self.network.node_ids[int(np.argmax(values[n]))]
+            for n, u in enumerate(self.virtual_nodes)
+        }
+
+    def link_mapping(self, x, node_mapping):
+        """Return a dict mapping each virtual link between distinct physical nodes to its path in the solution x,
+        as a list of (i, device_id, j).
+
+        The path follows from the physical node of u the interface carrying the largest part of the flow.
+        """
+        network = self.network
+        flows = self.expand(x)[: self.node_offset].reshape(-1, self.n_slots)
+        res_link_mapping = {}
+        for e, (u, v) in enumerate(self.virtual_links):
+            source, target = node_mapping[u], node_mapping[v]
+            if source == target:
+                continue
+            path = []
+            visited = {source}
+            i = network.index[source]
+            while network.node_ids[i] != target:
+                out_slots = range(
+                    network.iface_ptr_view[network.indptr_view[i]],
+                    network.iface_ptr_view[network.indptr_view[i + 1]],
+                )
+                slot = max(out_slots, key=lambda s: flows[e, s])
+                i_node, j_node, device_id = network.slot_view[slot]
+                if flows[e, slot] <= 1e-6 or j_node in visited:
+                    _log.warning(f"no path for the virtual link {u, v} in the solution")
+                    break
+                path.append((i_node, device_id, j_node))
+                visited.add(j_node)
+                i = network.index[j_node]
+            res_link_mapping[(u, v)] = path
+        return res_link_mapping
@@ -1,16 +1,35 @@
 import logging
-from collections import defaultdict, Counter, deque
+import math
+import multiprocessing
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from time import perf_counter
 
 import numpy as np
 from networkx.algorithms.community.kernighan_lin import kernighan_lin_bisection
 
+from distriopt.cache import partitions_cache
 from distriopt.constants import *
 from distriopt.decorators import timeit
 from distriopt.embedding import EmbedSolver
+from distriopt.embedding.algorithms.multilevel import Bisector
+from distriopt.embedding.residual import ResidualCapacity
 from distriopt.embedding.solution import Solution
 
 _log = logging.getLogger(__name__)
 
+# in the processes of EmbedGreedy.solve_parallel, set when the other starts are no longer needed
+_stop_event = None
+
+
+class _StartCancelled(Exception):
+    """Raised in a start of EmbedGreedy.solve_parallel when another one has reached the lower bound."""
+
+
+def _check_cancelled():
+    if _stop_event is not None and _stop_event.is_set():
+        raise _StartCancelled
+
 
 class Node(object):
     """Model a Node.
@@ -27,6 +46,8 @@ class Node(object):
         self.memory = memory
         self.l = None
         self.r = None
+        # number of virtual nodes of the partition already placed
+        self.n_placed = 0
 
 
 class Tree(object):
@@ -34,7 +55,6 @@ class Tree(object):
 
     def __init__(self, root):
         self.root = root
-        self.placed = set([])
 
     def print_tree(self):
         """Perform a BFS visit and print the tree."""
@@ -48,105 +68,207 @@ class Tree(object):
             if current.r:
                 to_visit.append((current.r, level + 1))
 
+    def place(self, node):
+        """Mark the virtual nodes of the partition of node as placed, in node and in its ancestors."""
+        n_new = len(node.partition) - node.n_placed
+        while node is not None:
+            node.n_placed += n_new
+            node = node.parent
+
     def bfs_visit(self):
-        """Perform a BFS visit of the partitions tree ignoring the already placed partitions."""
+        """Perform a BFS visit of the partitions tree ignoring the already placed partitions.
+
+        Partitions are marked as placed with place(), the subtree of a placed partition is skipped.
+        """
 
-        self.placed = set([])
         to_visit = deque()
 
         if self.root:
             to_visit.append(self.root)
 
+        # nothing is placed at the beginning of the visit
+        for current in self._nodes():
+            current.n_placed = 0
+
         while to_visit:
             current = to_visit.popleft()
-            if not current.partition.issubset(self.placed):
+            if current.n_placed < len(current.partition):
                 yield current
-                if current.l:
-                    to_visit.append(current.l)
-                if current.r:
-                    to_visit.append(current.r)
-
-
-def partition(virtual, algo="min_cut"):
-    """Iterative min cut algorithm.
-
-    Iteratively partitions the graph according to the chosen algorithm (either min cut or min bisection)
-    until the size of the partition is under a certain threshold.
+                # the partition may have been placed meanwhile
+                if current.n_placed < len(current.partition):
+                    if current.l:
+                        to_visit.append(current.l)
+                    if current.r:
+                        to_visit.append(current.r)
+
+    def _nodes(self):
+        """Return all the nodes of the tree."""
+        nodes = [self.root] if self.root else []
+        for current in nodes:
+            nodes.extend(child for child in (current.l, current.r) if child)
+        return nodes
+
+    def to_list(self):
+        """Return the tree as a list (partition, index of the parent, cores, memory), e.g., to be cached.
+
+        Parents come before their children, the left child before the right one.
+        """
+        nodes = self._nodes()
+        index = {id(current): i for i, current in enumerate(nodes)}
+        return [
+            (
+                current.partition,
+                index[id(current.parent)] if current.parent else None,
+                current.cores,
+                current.memory,
+            )
+            for current in nodes
+        ]
+
+    @classmethod
+    def from_list(cls, items):
+        """Build the tree from the list returned by to_list."""
+        nodes = []
+        for (partition, parent_index, cores, memory) in items:
+            parent = nodes[parent_index] if parent_index is not None else None
+            current = Node(partition, cores=cores, memory=memory, parent=parent)
+            if parent is not None and parent.l is None:
+                parent.l = current
+            elif parent is not None:
+                parent.r = current
+            nodes.append(current)
+        return cls(nodes[0] if nodes else None)
+
+
+# to be increased whenever the layout of the cached partition trees changes
+_PARTITIONS_CACHE_VERSION = 1
+
+# number of Karger trials run together, each batch draws its own random numbers
+_TRIALS_PER_BATCH = 16
+# smaller graphs are cut in the calling process, sending them to other processes costs more than their trials
+_MIN_PARALLEL_EDGES = 1000
+
+
+def _find(parent, u):
+    """Return the root of u, halving the path towards it."""
+    while parent[u] != u:
+        parent[u] = parent[parent[u]]
+        u = parent[u]
+    return u
+
+
+def _karger_batch(sources, targets, weights, n_nodes, n_trials, seed):
+    """Run n_trials Karger contractions of the graph with the given edges.
+
+    Picking edges at random with probability proportional to their weight until two super nodes are left
+    is the same as contracting the edges in increasing order of -log(U) / weight with U uniform in [0, 1),
+    so the orders of all the trials are drawn at once.
+    Return (weight, side) for the lightest cut found, where side[i] tells if node i is on the side of node 0.
     """
+    random_state = np.random.RandomState(seed)
+    with np.errstate(divide="ignore"):
+        keys = -np.log(random_state.random_sample((n_trials, len(weights)))) / weights
+    sources_list, targets_list = sources.tolist(), targets.tolist()
+
+    best_weight, best_side = math.inf, None
+    for order in np.argsort(keys, axis=1).tolist():
+        parent = list(range(n_nodes))
+        n_components = n_nodes
+        for edge in order:
+            if n_components <= 2:
+                break
+            root_u = _find(parent, sources_list[edge])
+            root_v = _find(parent, targets_list[edge])
+            if root_u != root_v:
+                parent[root_u] = root_v
+                n_components -= 1
+
+        # if the graph is not connected more than two components may be left, the cut is empty
+        root_0 = _find(parent, 0)
+        side = np.fromiter(
+            (_find(parent, u) == root_0 for u in range(n_nodes)), bool, n_nodes
+        )
+        weight = weights[side[sources] != side[targets]].sum()
+        if weight < best_weight:
+            best_weight, best_side = weight, side
+    return best_weight, best_side
 
-    class UnionFind:
-        """Utility Class used by the MinCut algorithm."""
-
-        def __init__(self, nodes):
-            self.parents = {u: u for u in nodes}
-            self.ranks = {u: 0 for u in nodes}
-            self.subsets = {u: {u} for u in nodes}
-
-        def find(self, u):
-            return u if self.parents[u] == u else self.find(self.parents[u])
-
-        def union(self, u, v):
-
-            u_root, v_root = self.find(u), self.find(v)
-
-            if self.ranks[u_root] < self.ranks[v_root]:
-                self.parents[u_root] = v_root
-
-                self.subsets[v_root] |= self.subsets[u_root]
-                del self.subsets[u_root]
-
-            elif self.ranks[u_root] > self.ranks[v_root]:
-                self.parents[v_root] = u_root
-
-                self.subsets[u_root] |= self.subsets[v_root]
-                del self.subsets[v_root]
-
-            else:
-                self.parents[v_root] = u_root
-                self.ranks[u_root] += 1
-
-                self.subsets[u_root] |= self.subsets[v_root]
-                del self.subsets[v_root]
 
-    def min_cut(g):
-        """Return a min cut of g.
+def min_cut(g, n_trials=32, seed=None, executor=None):
+    """Return a min cut of g as two sets of nodes, the lightest one found by n_trials runs of Karger's algorithm [1].
 
-        The procedure is based on Karger's algorithm [1].
+    Edges are weighted by their rate. The trials are run in batches, in parallel if a concurrent.futures
+    executor is given. Results are reproducible for a given seed, with or without executor.
 
-        [1] D. Karger "Global Min-cuts in RNC and Other Ramifications of a Simple Mincut Algorithm".
-        Proc. 4th Annual ACM-SIAM Symposium on Discrete Algorithms 1993.
-        """
-        edges = []
-        weights = []
-        sum_rate = 0
-
-        for (u, v) in g.edges():
-            edges.append((u, v))
-            rate = g[u][v]["rate"]
-            weights.append(rate)
-            sum_rate += rate
-
-        n_nodes = len(g.nodes())
-
-        uf = UnionFind(g.nodes())
-
-        sorted_edges = iter(
-            np.random.choice(
-                np.arange(len(edges)),
-                size=len(edges),
-                replace=False,
-                p=np.array(weights) / sum_rate,
-            )
-        )
+    [1] D. Karger "Global Min-cuts in RNC and Other Ramifications of a Simple Mincut Algorithm".
+    Proc. 4th Annual ACM-SIAM Symposium on Discrete Algorithms 1993.
+    """
+    nodes = list(g.nodes())
+    index = {u: i for i, u in enumerate(nodes)}
+    edges = list(g.edges(data="rate"))
+    sources = np.fromiter((index[u] for (u, _, _) in edges), int, len(edges))
+    targets = np.fromiter((index[v] for (_, v, _) in edges), int, len(edges))
+    weights = np.fromiter((rate for (_, _, rate) in edges), float, len(edges))
+
+    batch_sizes = [_TRIALS_PER_BATCH] * (n_trials // _TRIALS_PER_BATCH)
+    if n_trials % _TRIALS_PER_BATCH or not batch_sizes:
+        batch_sizes.append(max(1, n_trials % _TRIALS_PER_BATCH))
+    seeds = np.random.RandomState(seed).randint(2**31, size=len(batch_sizes))
+    batches = [
+        (sources, targets, weights, len(nodes), batch_size, batch_seed)
+        for batch_size, batch_seed in zip(batch_sizes, seeds.tolist())
+    ]
+    if executor is None:
+        results = [_karger_batch(*batch) for batch in batches]
+    else:
+        results = list(executor.map(_karger_batch, *zip(*batches)))
+
+    # the first of the lightest cuts, independently of how the batches have been run
+    _, side = min(results, key=lambda result: result[0])
+    return (
+        {u for u, on_side in zip(nodes, side) if on_side},
+        {u for u, on_side in zip(nodes, side) if not on_side},
+    )
 
-        while n_nodes > 2:
-            u, v = edges[next(sorted_edges)]
 
-            if uf.find(u) != uf.find(v):
-                n_nodes -= 1
-                uf.union(u, v)
+def partition(
+    virtual,
+    algo="min_cut",
+    n_trials=32,
+    seed=None,
+    n_jobs=1,
+    cache=True,
+    executor=None,
+):
+    """Iterative min cut algorithm.
 
-        return uf.subsets.values()
+    Iteratively partitions the graph according to the chosen algorithm (min cut, min bisection or
+    multilevel bisection) until the size of the partition is under a certain threshold.
+    For the min cut, n_trials Karger trials are run for each cut (see min_cut), on n_jobs processes.
+    A pool of processes is started at the first cut of at least _MIN_PARALLEL_EDGES links, unless
+    executor is given: it is then used instead, and left running, so that callers partitioning several
+    networks share the same processes.
+    The multilevel bisection (see Bisector) scales to networks of thousands of nodes.
+
+    If cache is True the tree is looked up in, and stored to, the partitions cache (see distriopt.cache)
+    using the fingerprint of the virtual network, so that the same network is partitioned only once.
+    The cache is kept in memory, and on disk only if DISTRIOPT_CACHE_DIR is set.
+    """
+    if cache:
+        key = f"{_PARTITIONS_CACHE_VERSION}|tree|{virtual.fingerprint()}|{algo}"
+        if algo == "min_cut":
+            key += f"|{n_trials}|{seed}"
+        elif algo == "multilevel":
+            key += f"|{seed}"
+        items = partitions_cache.get(key)
+        if items is not None:
+            return Tree.from_list(items)
+
+    random_state = np.random.RandomState(seed)
+    own_executor = executor is None and algo == "min_cut" and n_jobs > 1
+    bisector = (
+        Bisector(virtual.g, weight="rate", seed=seed) if algo == "multilevel" else None
+    )
 
     to_be_processed = [set(virtual.nodes())]
     partitions = []
@@ -162,51 +284,247 @@ def partition(virtual, algo="min_cut"):
     # to keep track of the Node associated to each of the partitions
     partitions_nodes = {frozenset(virtual.nodes()): root}
 
-    while to_be_processed:
-        p = to_be_processed.pop()
-        if len(p) <= 1:
-            partitions.append(p)
-        else:
-            if algo == "min_cut":
-                p1, p2 = min_cut(virtual.g.subgraph(p))
-            elif algo == "bisection":
-                p1, p2 = kernighan_lin_bisection(virtual.g.subgraph(p), weight="rate")
+    try:
+        while to_be_processed:
+            _check_cancelled()
+            p = to_be_processed.pop()
+            if len(p) <= 1:
+                partitions.append(p)
             else:
-                raise ValueError("undefined")
+                if algo == "min_cut":
+                    subgraph = virtual.g.subgraph(p)
+                    parallel = subgraph.number_of_edges() >= _MIN_PARALLEL_EDGES
+                    if parallel and own_executor and executor is None:
+                        executor = ProcessPoolExecutor(n_jobs)
+                    p1, p2 = min_cut(
+                        subgraph,
+                        n_trials=n_trials,
+                        seed=random_state.randint(2**31),
+                        executor=executor if parallel else None,
+                    )
+                elif algo == "bisection":
+                    p1, p2 = kernighan_lin_bisection(
+                        virtual.g.subgraph(p), weight="rate"
+                    )
+                elif algo == "multilevel":
+                    p1, p2 = bisector(p)
+                else:
+                    raise ValueError("undefined")
+
+                # update tree
+                parent = partitions_nodes[frozenset(p)]
+
+                p1_node = Node(
+                    frozenset(p1),
+                    cores=sum(virtual.req_cores(u) for u in p1),
+                    memory=sum(virtual.req_memory(u) for u in p1),
+                    parent=parent,
+                )
 
-            # update tree
-            parent = partitions_nodes[frozenset(p)]
+                p2_node = Node(
+                    frozenset(p2),
+                    cores=sum(virtual.req_cores(u) for u in p2),
+                    memory=sum(virtual.req_memory(u) for u in p2),
+                    parent=parent,
+                )
 
-            p1_node = Node(
-                frozenset(p1),
-                cores=sum(virtual.req_cores(u) for u in p1),
-                memory=sum(virtual.req_memory(u) for u in p1),
-                parent=parent,
-            )
+                partitions_nodes[frozenset(p)].l = partitions_nodes[frozenset(p1)] = (
+                    p1_node
+                )
+                partitions_nodes[frozenset(p)].r = partitions_nodes[frozenset(p2)] = (
+                    p2_node
+                )
 
-            p2_node = Node(
-                frozenset(p2),
-                cores=sum(virtual.req_cores(u) for u in p2),
-                memory=sum(virtual.req_memory(u) for u in p2),
-                parent=parent,
-            )
+                to_be_processed.append(p1)
+                to_be_processed.append(p2)
+    finally:
+        if own_executor and executor is not None:
+            executor.shutdown()
 
-            partitions_nodes[frozenset(p)].l = partitions_nodes[frozenset(p1)] = p1_node
-            partitions_nodes[frozenset(p)].r = partitions_nodes[frozenset(p2)] = p2_node
+    if cache:
+        partitions_cache.put(key, t.to_list())
+    return t
 
-            to_be_processed.append(p1)
-            to_be_processed.append(p2)
 
-    return t
+class _Step(object):
+    """Outcome of the placement of a partition, to replay it without searching again."""
+
+    __slots__ = ("node", "host", "paths", "cut_rate")
+
+    def __init__(self, node, host=None, paths=None, cut_rate=0):
+        self.node = node
+        # index of the physical node chosen for the partition, None if it has not been placed
+        self.host = host
+        # virtual link -> physical path (as returned by find_path) for the links routed with the partition
+        self.paths = paths
+        # rate going out from the physical node after the placement
+        self.cut_rate = cut_rate
+
+
+def _routed_rate(virtual, link_mapping):
+    """Return the bandwidth reserved on the physical links, i.e., the rate of each virtual link times its hops."""
+    return sum(
+        virtual.req_rate(u, v) * len(path) for (u, v), path in link_mapping.items()
+    )
+
+
+def _init_start(stop_event):
+    """Initialize a process of EmbedGreedy.solve_parallel."""
+    global _stop_event
+    _stop_event = stop_event
+
+
+def _run_start(virtual, physical, kwargs):
+    """Run a single start of EmbedGreedy.solve_parallel, return the mappings (or None) and the stats."""
+    prob = EmbedGreedy(virtual, physical)
+    try:
+        return prob._search(**kwargs), prob.stats
+    except _StartCancelled:
+        return None, prob.stats
 
 
 class EmbedGreedy(EmbedSolver):
     @timeit
     def solve(self, **kwargs):
+        """Place the partitions of the virtual network, from the biggest, on the fewest physical nodes.
+
+        The number of physical nodes is searched by galloping from the lower bound and then by bisection
+        (search="galloping", the default), or by trying them one after the other (search="linear").
+        Each try replays the placements of the previous tries that are still valid for it.
+        The galloping search assumes that the placement never fails on more physical nodes once it succeeds
+        on fewer ones, which the first fit does not guarantee: on some networks it may then use more physical
+        nodes than the linear search, which is the exact behavior of the previous versions.
+
+        Partitions are computed by algo, "bisection" (the default), "min_cut" or "multilevel": n_trials,
+        seed, n_jobs and executor are passed to the partition function. Unless cache is False,
+        partitions computed for the same virtual network are reused (in memory, and on disk only if
+        DISTRIOPT_CACHE_DIR is set, see distriopt.cache).
+
+        Physical nodes are tried in the order given by host_order: "resources" (the default) sorts them
+        by cores, memory and outgoing rate, "rate" by outgoing rate first, "random" shuffles them using seed.
+        """
 
-        algo = kwargs.get("algo", "bisection")
+        mapping = self._search(**kwargs)
+        if mapping is None:
+            self.status = Infeasible
+            return Infeasible
+
+        self._build(*mapping)
+        self.status = Solved
+        return Solved
+
+    @timeit
+    def solve_parallel(self, starts=None, n_starts=8, seed=None, n_jobs=None):
+        """Run independent starts of the heuristic on n_jobs processes and keep the best solution.
+
+        Each start is a dict of keyword arguments of solve, by default n_starts of them are generated
+        (see default_starts). The best solution uses the fewest physical nodes and, among those,
+        reserves the least bandwidth on the physical links.
+        As soon as a start reaches the lower bound, the starts not running yet are cancelled and the ones
+        running stop at their next partitioning or placement step.
+        """
+        if starts is None:
+            starts = self.default_starts(n_starts, seed)
+        lower_bound = self.lower_bound()
+
+        best, best_key = None, None
+        context = multiprocessing.get_context()
+        stop_event = context.Event()
+        executor = ProcessPoolExecutor(
+            n_jobs, mp_context=context, initializer=_init_start, initargs=(stop_event,)
+        )
+        try:
+            futures = [
+                executor.submit(
+                    _run_start, self.virtual, self.physical, dict(start, n_jobs=1)
+                )
+                for start in starts
+            ]
+            for future in as_completed(futures):
+                mapping, stats = future.result()
+                self._merge_stats(stats)
+                self.stats.count("starts")
+                if mapping is None:
+                    continue
+                node_mapping, link_mapping = mapping
+                key = (
+                    len(set(node_mapping.values())),
+                    _routed_rate(self.virtual, link_mapping),
+                )
+                if best_key is None or key < best_key:
+                    best, best_key = mapping, key
+                if best_key[0] <= lower_bound:
+                    stop_event.set()
+                    cancelled = sum(not f.done() for f in futures)
+                    self.stats.count("cancelled_starts", cancelled)
+                    break
+        finally:
+            # the running starts have been told to stop, they end without being waited for
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        if best is None:
+            self.status = Infeasible
+            return Infeasible
+
+        self._build(*best)
+        self.status = Solved
+        return Solved
 
-        partitions_tree = partition(self.virtual, algo=algo)
+    @staticmethod
+    def default_starts(n_starts=8, seed=None):
+        """Return the keyword arguments of n_starts different starts of solve.
+
+        The first start is the default one, the others alternate the min cut algorithm with different seeds
+        and the bisection with the physical nodes in different orders.
+        """
+        starts = [{"algo": "bisection"}, {"algo": "bisection", "host_order": "rate"}]
+        random_state = np.random.RandomState(seed)
+        for i in range(len(starts), n_starts):
+            start_seed = int(random_state.randint(2**31))
+            if i % 2 == 0:
+                starts.append({"algo": "min_cut", "seed": start_seed})
+            else:
+                starts.append(
+                    {"algo": "bisection", "host_order": "random", "seed": start_seed}
+                )
+        return starts[:n_starts]
+
+    def _merge_stats(self, stats):
+        """Add the timings and counters of a start to the ones of the solver."""
+        for name, seconds in stats.phases.items():
+            self.stats.add_time(name, seconds)
+        self.stats.counters.update(stats.counters)
+        self.stats.retries.update(stats.retries)
+
+    def _build(self, res_node_mapping, res_link_mapping):
+        self.solution = Solution.build_solution(
+            self.virtual,
+            self.physical,
+            res_node_mapping,
+            res_link_mapping,
+            check_solution=False,
+            stats=self.stats,
+        )
+
+    def _search(self, **kwargs):
+        """Search the fewest physical nodes where the partitions can be placed (see solve).
+
+        Return the node and link mappings, None if the virtual network cannot be placed.
+        """
+
+        algo = kwargs.get("algo", "bisection")
+        search = kwargs.get("search", "galloping")
+
+        with self.stats.phase("partitioning"):
+            partitions_tree = partition(
+                self.virtual,
+                algo=algo,
+                n_trials=kwargs.get("n_trials", 32),
+                seed=kwargs.get("seed"),
+                n_jobs=kwargs.get("n_jobs", 1),
+                cache=kwargs.get("cache", True),
+                executor=kwargs.get("executor"),
+            )
 
         # nodes are sorted in non increasing order according to the amount of resources (cpu, memory)
         # the formula used is : n_cores * 1000 + memory + outgoing_rate
@@ -217,103 +535,195 @@ class EmbedGreedy(EmbedSolver):
             + self.physical.rate_out(x),
             reverse=True,
         )
+        host_order = kwargs.get("host_order", "resources")
+        if host_order == "rate":
+            sorted_compute_nodes.sort(key=self.physical.rate_out, reverse=True)
+        elif host_order == "random":
+            np.random.RandomState(kwargs.get("seed")).shuffle(sorted_compute_nodes)
+        elif host_order != "resources":
+            raise ValueError("undefined host order")
+
+        # n_nodes_to_consider -> (steps of the placement, solution or None)
+        tries = {}
+
+        def feasible(n_nodes_to_consider):
+            # replay the longest valid prefix among the previous tries
+            prefix = max(
+                (
+                    steps[: self._valid_prefix(steps, n_tried, n_nodes_to_consider)]
+                    for n_tried, (steps, _) in tries.items()
+                ),
+                key=len,
+                default=[],
+            )
+            tries[n_nodes_to_consider] = self._place(
+                partitions_tree,
+                sorted_compute_nodes[:n_nodes_to_consider],
+                prefix,
+            )
+            if tries[n_nodes_to_consider][1] is None:
+                self.stats.retry(n_nodes_to_consider)
+                return False
+            return True
+
+        lower_bound, upper_bound = self.lower_bound(), len(sorted_compute_nodes)
+        if search == "linear":
+            n_feasible = next(
+                (n for n in range(lower_bound, upper_bound + 1) if feasible(n)), None
+            )
+        elif search == "galloping":
+            n_feasible = None
+            # exponentially increasing steps from the lower bound, the last unfeasible is lo - 1
+            lo, step = lower_bound, 1
+            while lo <= upper_bound:
+                n = min(lo + step - 1, upper_bound)
+                if feasible(n):
+                    n_feasible = n
+                    break
+                lo, step = n + 1, step * 2
+            # bisection between the last unfeasible and the first feasible
+            if n_feasible is not None:
+                hi = n_feasible
+                while lo < hi:
+                    mid = (lo + hi) // 2
+                    if feasible(mid):
+                        hi = mid
+                    else:
+                        lo = mid + 1
+                n_feasible = hi
+        else:
+            raise ValueError("undefined search")
 
-        for n_nodes_to_consider in range(
-            self.lower_bound(), len(sorted_compute_nodes) + 1
-        ):
-
-            nodes_to_consider = sorted_compute_nodes[:n_nodes_to_consider]
-
-            cores_used = defaultdict(int)
-            memory_used = defaultdict(int)
-            rate_used = defaultdict(int)
-            assigned = defaultdict(list)
-
-            res_node_mapping = {}
-            res_link_mapping = {}
-
-            # for each partition, starting from the biggest
-            for node in partitions_tree.bfs_visit():
-                # consider the physical nodes starting from the already selected ones
-                for phy_node in nodes_to_consider:
-                    try:
-                        # check if the node resources are enough
-                        if node.cores + cores_used[phy_node] > self.physical.cores(
-                            phy_node
-                        ) or node.memory + memory_used[phy_node] > self.physical.memory(
-                            phy_node
-                        ):
-                            raise NodeResourceError
-
-                        # check if outgoing communications can be performed and find a path
-                        if sum(
-                            self.virtual.req_rate(u, v)
-                            for u in node.partition | set(assigned[phy_node])
-                            for v in self.virtual.neighbors(u)
-                            if v not in node.partition | set(assigned[phy_node])
-                        ) > self.physical.rate_out(phy_node):
-                            raise LinkCapacityError
-
-                        temp_rate = defaultdict(int)
-                        temp_paths = defaultdict(list)
-                        # check if virtual links can be mapped
-                        for (u, v) in [
-                            (u, v)
-                            for u in node.partition
-                            for v in self.virtual.neighbors(u)
-                            if v not in node.partition
-                        ]:
-                            if (
-                                v in res_node_mapping
-                                and res_node_mapping[v] != phy_node
-                            ):
-
-                                # find a path for the virtual link
-                                path = self.physical.find_path(
-                                    phy_node,
-                                    res_node_mapping[v],
-                                    req_rate=self.virtual.req_rate(u, v),
-                                    used_rate=Counter(rate_used) + Counter(temp_rate),
-                                )
-
-                                # for each link in the path
-                                for (i, j, device_id) in path:
-                                    temp_rate[
-                                        (i, j, device_id)
-                                    ] += self.virtual.req_rate(u, v)
-                                    temp_paths[(u, v)].append((i, device_id, j))
-
-                        # update the partitions placed
-                        partitions_tree.placed |= set(node.partition)
-
-                        # update results
-                        res_link_mapping.update(temp_paths)
-                        for u in node.partition:
-                            res_node_mapping[u] = phy_node
-                            assigned[phy_node].append(u)
-
-                        # update used resources
-                        cores_used[phy_node] += node.cores
-                        memory_used[phy_node] += node.memory
-                        for k, v in temp_rate.items():
-                            rate_used[k] += v
-                        break
-
-                    except (NodeResourceError, LinkCapacityError, NoPathFoundError):
-                        pass
-
-            # if all virtual nodes have been mapped return the solution
-            if set(res_node_mapping) == set(self.virtual.nodes()):
-                self.solution = Solution.build_solution(
-                    self.virtual,
-                    self.physical,
-                    res_node_mapping,
-                    res_link_mapping,
-                    check_solution=False,
-                )
-                self.status = Solved
-                return Solved
+        if n_feasible is None:
+            return None
+        return tries[n_feasible][1]
 
-        else:
-            self.status = Infeasible
-            return Infeasible
+    @staticmethod
+    def _valid_prefix(steps, n_tried, n_nodes_to_consider):
+        """Return how many steps of a placement on n_tried physical nodes are the same with n_nodes_to_consider.
+
+        Physical nodes are tried in the same order, so a step is the same as long as the chosen physical node
+        is among the first n_nodes_to_consider ones and, if more nodes are available, the partition
+        has been placed (it may fit on one of the additional physical nodes otherwise).
+        """
+        for i, step in enumerate(steps):
+            if step.host is None:
+                if n_nodes_to_consider > n_tried:
+                    return i
+            elif step.host >= n_nodes_to_consider:
+                return i
+        return len(steps)
+
+    def _place(self, partitions_tree, nodes_to_consider, prefix=()):
+        """Place the partitions on the physical nodes, replaying the steps in prefix first.
+
+        Return the list of steps and, if all the virtual nodes have been placed, the node and link mappings
+        (None otherwise).
+        """
+        residual = ResidualCapacity(self.physical)
+        # rate of the virtual links going out from the virtual nodes placed on each physical node
+        cut_rate = defaultdict(int)
+
+        res_node_mapping = {}
+        res_link_mapping = {}
+        steps = []
+
+        # for each partition, starting from the biggest
+        for node in partitions_tree.bfs_visit():
+            _check_cancelled()
+            if len(steps) < len(prefix):
+                # same outcome as in a previous try, reserve again what it reserved
+                step = prefix[len(steps)]
+                steps.append(step)
+                if step.host is not None:
+                    phy_node = nodes_to_consider[step.host]
+                    residual.reserve_node(phy_node, node.cores, node.memory)
+                    for (u, v), path in step.paths.items():
+                        residual.reserve_path(path, self.virtual.req_rate(u, v))
+                        res_link_mapping[(u, v)] = [
+                            (i, device_id, j) for (i, j, device_id) in path
+                        ]
+                    partitions_tree.place(node)
+                    for u in node.partition:
+                        res_node_mapping[u] = phy_node
+                    cut_rate[phy_node] = step.cut_rate
+                continue
+
+            self.stats.count("placements")
+            steps.append(_Step(node))
+
+            # virtual links going out from the partition
+            out_links = [
+                (u, v)
+                for u in node.partition
+                for v in self.virtual.neighbors(u)
+                if v not in node.partition
+            ]
+            # rate going out from the partition, in total and towards each physical node already used
+            out_rate = 0
+            out_rate_to = defaultdict(int)
+            for (u, v) in out_links:
+                out_rate += self.virtual.req_rate(u, v)
+                if v in res_node_mapping:
+                    out_rate_to[res_node_mapping[v]] += self.virtual.req_rate(u, v)
+
+            # consider the physical nodes starting from the already selected ones
+            for host, phy_node in enumerate(nodes_to_consider):
+                savepoint = residual.savepoint()
+                phase, start = "placement", perf_counter()
+                try:
+                    # check if the node resources are enough and reserve them
+                    residual.reserve_node(phy_node, node.cores, node.memory)
+
+                    # check if outgoing communications can be performed and find a path:
+                    # the links between the partition and the virtual nodes already on phy_node
+                    # are no longer part of the cut, in either direction
+                    new_cut_rate = (
+                        cut_rate[phy_node] + out_rate - 2 * out_rate_to[phy_node]
+                    )
+                    if new_cut_rate > self.physical.rate_out(phy_node):
+                        raise LinkCapacityError
+
+                    self.stats.add_time(phase, perf_counter() - start)
+                    phase, start = "routing", perf_counter()
+                    paths = {}
+                    # check if virtual links can be mapped
+                    for (u, v) in out_links:
+                        if v in res_node_mapping and res_node_mapping[v] != phy_node:
+
+                            # find a path for the virtual link and reserve its rate
+                            paths[(u, v)] = path = self.physical.find_path(
+                                phy_node,
+                                res_node_mapping[v],
+                                req_rate=self.virtual.req_rate(u, v),
+                                residual=residual,
+                                stats=self.stats,
+                            )
+                            residual.reserve_path(path, self.virtual.req_rate(u, v))
+
+                    # update the partitions placed
+                    partitions_tree.place(node)
+
+                    # update results
+                    for (u, v), path in paths.items():
+                        # for each link in the path
+                        res_link_mapping[(u, v)] = [
+                            (i, device_id, j) for (i, j, device_id) in path
+                        ]
+                    for u in node.partition:
+                        res_node_mapping[u] = phy_node
+                    cut_rate[phy_node] = new_cut_rate
+                    steps[-1] = _Step(node, host, paths, new_cut_rate)
+                    self.stats.add_time(phase, perf_counter() - start)
+                    break
+
+                except (NodeResourceError, LinkCapacityError, NoPathFoundError):
+                    # release the resources reserved for this physical node
+                    residual.rollback(savepoint)
+                    self.stats.add_time(phase, perf_counter() - start)
+                    self.stats.count("placement_retries")
+
+        # if all virtual nodes have been mapped return the solution
+        if len(res_node_mapping) == self.virtual.number_of_nodes():
+            return steps, (res_node_mapping, res_link_mapping)
+        return steps, None
@@ -1,11 +1,12 @@
-import itertools
 import logging
-
-import pulp
+import time
 
 from distriopt.constants import *
 from distriopt.decorators import timeit
 from distriopt.embedding import EmbedSolver
+from distriopt.embedding.algorithms.arcflow import ArcFlowModel
+from distriopt.embedding.algorithms.greedy import EmbedGreedy
+from distriopt.embedding.algorithms.pathflow import PathFlowModel
 from distriopt.embedding.solution import Solution
 
 _log = logging.getLogger(__name__)
@@ -13,272 +14,208 @@ _log = logging.getLogger(__name__)
 
 class EmbedILP(EmbedSolver):
     @staticmethod
-    def _get_solver(solver_name, timelimit):
+    def _get_solver(solver_name, timelimit, warm_start=False):
+        import pulp
+
+        # the initial values of the variables are passed only if set, GLPK and SCIP take none
+        options = {"warmStart": True} if warm_start else {}
         if solver_name == "cplex":
-            return pulp.CPLEX_PY(msg=0, timeLimit=timelimit)
+            return pulp.CPLEX_PY(msg=0, timeLimit=timelimit, **options)
         elif solver_name == "gurobi":
-            return pulp.GUROBI(msg=0, timeLimit=timelimit)
+            return pulp.GUROBI(msg=0, timeLimit=timelimit, **options)
         elif solver_name == "glpk":
-            return pulp.GLPK(msg=0, options=["--tmlim", str(timelimit)])
+            return pulp.GLPK_CMD(msg=0, timeLimit=timelimit)
         elif solver_name == "cbc":
-            return pulp.COIN(msg=0, maxSeconds=timelimit)
+            return pulp.PULP_CBC_CMD(msg=0, timeLimit=timelimit, **options)
         elif solver_name == "scip":
-            return pulp.SCIP(msg=0, options=["-c", f"set limits time {timelimit}"])
+            return pulp.SCIP_CMD(msg=0, timeLimit=timelimit)
 
         raise ValueError("Invalid Solver Name")
 
+    def _initial_solution(self, warm_start):
+        """Return the solution to start from, found by the heuristic warm_start or given, None if there is none."""
+        if isinstance(warm_start, Solution):
+            return warm_start
+        elif warm_start == "greedy":
+            heuristic = EmbedGreedy(self.virtual, self.physical)
+            heuristic.solve()
+            if heuristic.status != Solved:
+                _log.info("the heuristic found no solution to start from")
+                return None
+            return heuristic.solution
+        raise ValueError("undefined warm start")
+
     @timeit
     def solve(self, **kwargs):
-
+        """Solve the arc-flow ILP model (see ArcFlowModel) minimizing obj, "min_n_machines" by default.
+
+        With formulation="paths" the path model (see PathFlowModel) is solved instead: the paths of the virtual
+        links are generated on the linear relaxation, with the k_paths (2 by default) shortest ones between the
+        same physical nodes, and the integer model is solved on them within the rest of timelimit. Its solution
+        is the best one routing the virtual links on the paths generated, not necessarily the optimum, and
+        current_val is the optimum of the relaxation. It does not support max_hops. The relaxations are solved
+        by HiGHS through scipy (>= 1.9) whatever the solver of the integer model.
+
+        With _get_solver="highs" the sparse model is handed directly to HiGHS through scipy, the other solvers
+        ("glpk" by default, "cbc", "cplex", "gurobi" and "scip") get it converted to a pulp problem.
+        With names=True the variables and the constraints get descriptive names, e.g., to inspect the model.
+        Unless presolve=False, the variables that cannot be 1 are removed from the model, max_hops (None by
+        default, any path) bounds the number of hops of the paths of the virtual links.
+        Unless symmetry=False, the interchangeable physical nodes are used in a fixed order.
+
+        With warm_start="greedy" the solution of EmbedGreedy (or warm_start itself, if it is a Solution) is
+        the initial solution of the solvers accepting one ("cbc", "cplex" and "gurobi"), and it is returned
+        if the solver finds none within timelimit.
+        """
         obj = kwargs.get("obj", "min_n_machines")
         solver_name = kwargs.get("_get_solver", "glpk").lower()
         timelimit = int(kwargs.get("timelimit", "3600"))
+        formulation = kwargs.get("formulation", "arcs")
 
         _log.debug(f"called ILP _get_solver with the following parameters: {kwargs}")
 
-        # link mapping variables
-        link_mapping = pulp.LpVariable.dicts(
-            "link_mapping",
-            itertools.chain(
-                *(
-                    ((u, v, i, j, device_id), (u, v, j, i, device_id))
-                    for (u, v) in self.virtual.sorted_edges()
-                    for (i, j, device_id) in self.physical.edges(keys=True)
-                )
-            ),
-            lowBound=0,
-            upBound=1,
-            cat=pulp.LpContinuous
-            if self.physical.grouped_interfaces
-            else pulp.LpBinary,
-        )
-
-        # node mapping variables
-        node_mapping = pulp.LpVariable.dicts(
-            "node_mapping",
-            ((u, i) for u in self.virtual.nodes() for i in self.physical.nodes()),
-            cat=pulp.LpBinary,
-        )
-
-        # problem definition
-        mapping_ILP = pulp.LpProblem("Mapping ILP", pulp.LpMinimize)
-        # get _get_solver
-        solver = self._get_solver(solver_name, timelimit)
-        # set _get_solver
-        mapping_ILP.setSolver(solver)
-
-        # Case 1: empty objective
-        if obj == "no_obj":
-            mapping_ILP += pulp.LpVariable("dummy", lowBound=1, upBound=1)
-        # Case 2: minimize number of used machines
-        elif obj == "min_n_machines":
-            # define variables to keep track of the number of machines used
-            usage_phy_machine = pulp.LpVariable.dicts(
-                "usage", [i for i in self.physical.nodes()], cat=pulp.LpBinary
-            )
-            # set objective
-            mapping_ILP += pulp.lpSum(
-                usage_phy_machine[i] for i in self.physical.nodes()
-            )
-            # a machine is used if at least a virtual node is mapped on it
-            for i in self.physical.nodes():
-                for u in self.virtual.nodes():
-                    mapping_ILP += usage_phy_machine[i] >= node_mapping[(u, i)]
-        # Case 3: minimize used bandwidth
-        elif obj == "min_bw":
-            mapping_ILP += pulp.lpSum(
-                self.virtual.req_rate(u, v)
-                * (
-                    link_mapping[(u, v, i, j, device_id)]
-                    + link_mapping[(u, v, j, i, device_id)]
-                )
-                for (u, v) in self.virtual.sorted_edges()
-                for (i, j, device_id) in self.physical.edges(keys=True)
-            )
-
-        # Assignment of virtual nodes to physical nodes
-        for u in self.virtual.nodes():
-            mapping_ILP += (
-                pulp.lpSum(node_mapping[(u, i)] for i in self.physical.nodes()) == 1,
-                f"assignment of {u} to a physical node",
-            )
-
-        # Node capacity constraints
-        for i in self.physical.nodes():
-            # CPU limit
-            mapping_ILP += (
-                pulp.lpSum(
-                    self.virtual.req_cores(u) * node_mapping[(u, i)]
-                    for u in self.virtual.nodes()
-                )
-                <= self.physical.cores(i),
-                f"CPU capacity for physical node {i}",
-            )
-            # Memory limit
-            mapping_ILP += (
-                pulp.lpSum(
-                    self.virtual.req_memory(u) * node_mapping[(u, i)]
-                    for u in self.virtual.nodes()
+        with self.stats.phase("model"):
+            if formulation == "arcs":
+                model = ArcFlowModel(
+                    self.virtual,
+                    self.physical,
+                    obj=obj,
+                    names=kwargs.get("names", False),
+                    presolve=kwargs.get("presolve", True),
+                    max_hops=kwargs.get("max_hops", None),
+                    symmetry=kwargs.get("symmetry", True),
                 )
-                <= self.physical.memory(i),
-                f"memory capacity for physical node {i}",
-            )
-
-        # Max latency for a virtual link in the substrate network
-        # @todo to be added
-
-        # Bandwidth conservation
-        for (u, v) in self.virtual.sorted_edges():
-            for i in self.physical.nodes():
-                mapping_ILP += (
-                    pulp.lpSum(
-                        (
-                            link_mapping[(u, v, i, j, device_id)]
-                            - link_mapping[(u, v, j, i, device_id)]
-                        )
-                        for j in self.physical.neighbors(i)
-                        for device_id in self.physical.interfaces_ids(i, j)
+            elif formulation == "paths":
+                if kwargs.get("max_hops") is not None:
+                    raise ValueError(
+                        "max_hops is not supported by the paths formulation"
                     )
-                    == (node_mapping[(u, i)] - node_mapping[(v, i)]),
-                    f"flow conservation on physical node {i} for virtual link {u, v}",
+                model = PathFlowModel(
+                    self.virtual,
+                    self.physical,
+                    obj=obj,
+                    names=kwargs.get("names", False),
+                    symmetry=kwargs.get("symmetry", True),
+                    k_paths=kwargs.get("k_paths", 2),
                 )
+            else:
+                raise ValueError("undefined formulation")
+        if model.infeasible:
+            # some virtual node fits in no physical node
+            self.current_val = 0
+            self.status = Infeasible
+            return Infeasible
 
-        # Link capacity
-        for (i, j, device_id) in self.physical.edges(keys=True):
-            mapping_ILP += (
-                pulp.lpSum(
-                    self.virtual.req_rate(u, v)
-                    * (
-                        link_mapping[(u, v, i, j, device_id)]
-                        + link_mapping[(u, v, j, i, device_id)]
-                    )
-                    for (u, v) in self.virtual.sorted_edges()
-                )
-                <= self.physical.rate(i, j, device_id),
-                f"link capacity for physical link {i, j, device_id}",
+        initial_solution = None
+        if kwargs.get("warm_start") is not None:
+            with self.stats.phase("warm_start"):
+                initial_solution = self._initial_solution(kwargs["warm_start"])
+                if initial_solution is not None and formulation == "paths":
+                    model.add_solution(initial_solution)
+
+        if formulation == "paths":
+            start = time.perf_counter()
+            with self.stats.phase("pricing"):
+                self.stats.count("relaxations", model.generate(timelimit))
+            self.stats.count("paths", len(model.paths))
+            if model.infeasible:
+                self.current_val = 0
+                self.status = Infeasible
+                return Infeasible
+            # the rest of the time limit is left to the integer model
+            timelimit = max(int(timelimit - (time.perf_counter() - start)), 1)
+        self.stats.count("variables", model.n_variables)
+        self.stats.count("constraints", model.n_constraints)
+        if formulation == "arcs":
+            self.stats.count(
+                "removed_variables", model.n_full_variables - model.n_variables
             )
 
-        # Given a virtual link a physical machine the rate that goes out from the physical machine to an interface_name
-        # or that comes in to the physical machine from an interface_name is at most 1
-        for (u, v) in self.virtual.sorted_edges():
-            for i in self.physical.nodes():
-                mapping_ILP += (
-                    pulp.lpSum(
-                        link_mapping[(u, v, i, j, device_id)]
-                        for j in self.physical.neighbors(i)
-                        for device_id in self.physical.interfaces_ids(i, j)
-                    )
-                    <= 1,
-                    f"virtual link {u, v} can use only a network interface_name to going out from physical node {i}",
-                )
-                mapping_ILP += (
-                    pulp.lpSum(
-                        link_mapping[(u, v, j, i, device_id)]
-                        for j in self.physical.neighbors(i)
-                        for device_id in self.physical.interfaces_ids(i, j)
-                    )
-                    <= 1,
-                    f"virtual link {u, v} can use only a network interface_name to reach physical node {i}",
-                )
-
-        # A link can be used only in a direction
-        for (u, v) in self.virtual.sorted_edges():
-            for (i, j, device_id) in self.physical.edges(keys=True):
-                mapping_ILP += (
-                    link_mapping[(u, v, i, j, device_id)]
-                    + link_mapping[(u, v, j, i, device_id)]
-                    <= 1,
-                    f"{u, v} can be mapped to a single direction of physical node {i, j, device_id}",
-                )
-
-        # solve the ILqP
-        status = pulp.LpStatus[mapping_ILP.solve()]
-
-        if solver_name == "cplex":
-            self.current_val = solver.solverModel.solution.MIP.get_best_objective()
-        elif solver_name == "gurobi":
-            self.current_val = mapping_ILP.solverModel.ObjBound
+        initial_values = None
+        if initial_solution is not None:
+            with self.stats.phase("warm_start"):
+                initial_values = model.initial_values(initial_solution)
+
+        if solver_name == "highs":
+            with self.stats.phase("solver"):
+                result = model.solve_highs(timelimit)
+            self.current_val = getattr(result, "mip_dual_bound", 0)
+            if formulation == "paths":
+                # the bound of the solver holds only for the paths generated
+                self.current_val = model.lower_bound or 0
+            # 2 is infeasible for scipy.optimize.milp, with the paths generated only it proves nothing
+            if result.status == 2 and formulation == "arcs":
+                self.status = Infeasible
+                return Infeasible
+            elif result.x is not None:
+                values = result.x
+            elif initial_values is not None:
+                # the time limit expired before the first solution, scipy takes no initial one
+                values = initial_values
+            else:
+                self.status = NotSolved
+                return NotSolved
         else:
-            self.current_val = 0
-
-        # check status
-        if status == "Infeasible":
-            self.status = Infeasible
-            return Infeasible
-        elif (status == "Not Solved" or status == "Undefined") and (
-            not pulp.value(mapping_ILP.objective)
-            or pulp.value(mapping_ILP.objective) < 1.1
-        ):
-            # @todo check specific _get_solver status
-            self.status = NotSolved
-            return NotSolved
+            # pulp is imported only when a model is solved, it is not needed by the other algorithms
+            import pulp
+
+            with self.stats.phase("model"):
+                mapping_ILP, variables = model.to_pulp()
+                if initial_values is not None:
+                    for variable, value in zip(variables, initial_values.tolist()):
+                        variable.setInitialValue(value)
+            # get _get_solver
+            solver = self._get_solver(
+                solver_name, timelimit, warm_start=initial_values is not None
+            )
+            # set _get_solver
+            mapping_ILP.setSolver(solver)
+
+            # solve the ILP
+            with self.stats.phase("solver"):
+                status = pulp.LpStatus[mapping_ILP.solve()]
+
+            if solver_name == "cplex":
+                self.current_val = solver.solverModel.solution.MIP.get_best_objective()
+            elif solver_name == "gurobi":
+                self.current_val = mapping_ILP.solverModel.ObjBound
+            else:
+                self.current_val = 0
+            if formulation == "paths":
+                # the bound of the solver holds only for the paths generated
+                self.current_val = model.lower_bound or 0
+
+            # check status
+            if status == "Infeasible" and formulation == "arcs":
+                self.status = Infeasible
+                return Infeasible
+            elif (
+                status == "Infeasible"
+                or (status == "Not Solved" or status == "Undefined")
+                and (
+                    not pulp.value(mapping_ILP.objective)
+                    or pulp.value(mapping_ILP.objective) < 1.1
+                )
+            ):
+                if initial_values is None:
+                    # @todo check specific _get_solver status
+                    self.status = NotSolved
+                    return NotSolved
+                values = initial_values
+            else:
+                values = [variable.varValue or 0 for variable in variables]
 
         # build solution from variables values
-        res_node_mapping, res_link_mapping = self._build_ILP_solution(
-            self.virtual, self.physical, node_mapping, link_mapping
-        )
+        with self.stats.phase("build"):
+            res_node_mapping = model.node_mapping(values)
+            res_link_mapping = model.link_mapping(values, res_node_mapping)
         # if interfaces have been grouped, map to solution to the original network
         self.solution = Solution.build_solution(
-            self.virtual, self.physical, res_node_mapping, res_link_mapping
+            self.virtual,
+            self.physical,
+            res_node_mapping,
+            res_link_mapping,
+            stats=self.stats,
         )
         self.status = Solved
         return Solved
-
-    @staticmethod
-    def _build_ILP_solution(virtual, physical, node_mapping, link_mapping):
-        """Build an assignment of virtual nodes and virtual links starting from the values of the variables in the ILP
-        """
-        res_node_mapping = {}
-        res_link_mapping = {}
-        # mapping for the virtual nodes
-        for virtual_node in virtual.nodes():
-            res_node_mapping[virtual_node] = next(
-                (
-                    physical_node
-                    for physical_node in physical.nodes()
-                    if node_mapping[(virtual_node, physical_node)].varValue > 0
-                ),
-                None,
-            )
-        # mapping for the virtual links
-        for (u, v) in virtual.sorted_edges():
-            if res_node_mapping[u] != res_node_mapping[v]:
-                s_node, d_node = res_node_mapping[u], res_node_mapping[v]
-                # source of the virtual link
-                source = next(
-                    (
-                        (s_node, device_id, j)
-                        for j in physical.neighbors(s_node)
-                        for device_id in physical.interfaces_ids(s_node, j)
-                        if link_mapping[(u, v, s_node, j, device_id)].varValue
-                        + link_mapping[(u, v, j, s_node, device_id)].varValue
-                        > 0.99
-                    ),
-                    None,
-                )
-                # destination of the virtual link
-                dest = next(
-                    (
-                        (j, device_id, d_node)
-                        for j in physical.neighbors(d_node)
-                        for device_id in physical.interfaces_ids(d_node, j)
-                        if link_mapping[(u, v, d_node, j, device_id)].varValue
-                        + link_mapping[(u, v, j, d_node, device_id)].varValue
-                        > 0.99
-                    ),
-                    None,
-                )
-                # intermediary nodes in the path
-                # @todo - intemediate nodes may be in the wrong order -> build the full path
-                inter = [
-                    (i, device_id, j)
-                    for (i, j, device_id) in physical.edges(keys=True)
-                    if i not in (s_node, d_node)
-                    and j not in (s_node, d_node)
-                    and link_mapping[(u, v, i, j, device_id)].varValue
-                    + link_mapping[(u, v, j, i, device_id)].varValue
-                    > 0.99
-                ]
-
-                res_link_mapping[(u, v)] = [source] + inter + [dest]
-        return res_node_mapping, res_link_mapping
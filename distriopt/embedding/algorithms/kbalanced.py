@@ -1,76 +1,119 @@
 import logging
 import math
-from collections import defaultdict
 
 from networkx.algorithms.community.kernighan_lin import kernighan_lin_bisection
 
+from distriopt.cache import partitions_cache
 from distriopt.constants import *
 from distriopt.decorators import timeit
 from distriopt.embedding import EmbedSolver
+from distriopt.embedding.assignment import assign_partitions
+from distriopt.embedding.algorithms.multilevel import Bisector, multilevel_partition
+from distriopt.embedding.residual import ResidualCapacity
+from distriopt.embedding.routing import ShortestPathTrees
 from distriopt.embedding.solution import Solution
 
 _log = logging.getLogger(__name__)
 
+# to be increased whenever the layout of the cached partitions changes
+_PARTITIONS_CACHE_VERSION = 2
 
-class GetPartitions(object):
-    """Callable object."""
 
-    def __init__(self):
-        # to keep track of the already computed partitions
-        self._cache = {}
+class _Hierarchy(object):
+    """Recursive bisection of a graph, computed lazily.
 
-    def __call__(self, g, n_partitions):
-        """Given the graph G and the number of partitions k, returns a list with k sets of nodes."""
+    Each part is bisected at most once, the bisections are shared by all the numbers of partitions requested.
+    Parts are bisected by algo, "bisection" (Kernighan-Lin) or "multilevel" (see Bisector).
+    """
 
-        def _iterative_cutting(g, p):
-            """helper function (iterative version)"""
+    __slots__ = ("g", "algo", "bisector", "children")
 
-            to_be_processed = [g]
-            K = math.ceil(len(g.nodes()) / p)
+    def __init__(self, g, splits=(), algo="bisection", seed=None):
+        self.g = g
+        self.algo = algo
+        self.bisector = (
+            Bisector(g, weight="rate", seed=seed) if algo == "multilevel" else None
+        )
+        # part -> (left part, right part), for the parts already bisected
+        self.children = {g_l | g_r: (g_l, g_r) for (g_l, g_r) in splits}
+
+    def splits(self):
+        """Return the bisections computed so far as a list of (left part, right part), e.g., to be cached."""
+        return list(self.children.values())
+
+    def _bisect(self, part):
+        if part not in self.children:
+            if self.algo == "bisection":
+                g_l, g_r = kernighan_lin_bisection(self.g.subgraph(part), weight="rate")
+            elif self.algo == "multilevel":
+                g_l, g_r = self.bisector(part)
+            else:
+                raise ValueError("undefined")
+            self.children[part] = (frozenset(g_l), frozenset(g_r))
+        return self.children[part]
+
+    def partitions(self, n_partitions):
+        """Return n_partitions frozensets of nodes (less only if there are fewer nodes).
+
+        Parts are bisected until their size is at most ceil(n_nodes / n_partitions), then the two smallest
+        parts are merged (or the biggest one bisected) until the required number of partitions is reached.
+        """
+        max_size = math.ceil(self.g.number_of_nodes() / n_partitions)
 
-            res = []
-            while len(to_be_processed) > 0:
+        partitions = []
+        to_be_processed = [frozenset(self.g.nodes())]
+        while to_be_processed:
+            part = to_be_processed.pop()
+            if len(part) > max_size:
+                to_be_processed.extend(self._bisect(part))
+            else:
+                partitions.append(part)
 
-                g = to_be_processed.pop()
-                g_l, g_r = kernighan_lin_bisection(g, weight="rate")
+        # merge small partitions to return the required number of partitions
+        while len(partitions) > n_partitions:
+            partitions.sort(key=len, reverse=True)
+            e1 = partitions.pop()
+            e2 = partitions.pop()
+            partitions.append(e1 | e2)
+        # or bisect the biggest ones, when the parts of the same size cannot be bisected evenly
+        while len(partitions) < n_partitions:
+            biggest = max(partitions, key=len)
+            if len(biggest) < 2:
+                break
+            partitions.remove(biggest)
+            partitions.extend(self._bisect(biggest))
+        return partitions
 
-                for partition in g_l, g_r:
-                    if len(partition) > K:
-                        to_be_processed.append(g.subgraph(partition))
-                    else:
-                        res.append(partition)
-            return res
 
-        def _recursive_cutting(g, p, res=[]):
-            """helper function (recursive version)"""
-            k = math.ceil(len(g.nodes()) / p)
-            g_l, g_r = kernighan_lin_bisection(g, weight="rate")
+class GetPartitions(object):
+    """Callable object."""
 
-            for partition in g_l, g_r:
-                if len(partition) > k:
-                    _recursive_cutting(g.subgraph(partition), p / 2, res)
-                else:
-                    res.append(partition)
+    def __init__(self):
+        # to keep track of the hierarchy of the last graph partitioned
+        self._cache = {}
 
-            return res
+    def __call__(self, g, n_partitions, fingerprint=None, algo="bisection", seed=None):
+        """Given the graph G and the number of partitions k, returns a list with k sets of nodes, the biggest first.
 
-        # when computing a partitioning for the graph nodes,
-        # if result is known for a smaller value of n_partitions
-        # don't restart from scratch but use it as an initial value
-        if g not in self._cache or len(self._cache[g]) < n_partitions:
+        The bisections, computed by algo (see _Hierarchy) using seed, are computed once for each graph
+        and shared by all the values of k.
+        If the fingerprint of the virtual network is given, the bisections are looked up in, and stored to,
+        the partitions cache (see distriopt.cache).
+        """
+        key = f"{_PARTITIONS_CACHE_VERSION}|k_partition|{fingerprint}|{algo}"
+        if algo == "multilevel":
+            key += f"|{seed}"
+        if (g, algo, seed) not in self._cache:
             self._cache.clear()
-            partitions = _recursive_cutting(g, p=n_partitions)
-            self._cache[g] = partitions[:]
-        else:
-            partitions = self._cache[g][:]
+            splits = partitions_cache.get(key) if fingerprint else None
+            self._cache[(g, algo, seed)] = _Hierarchy(g, splits or (), algo, seed)
+        hierarchy = self._cache[(g, algo, seed)]
 
-        # merge small partitions to return the required number of partitions
-        while len(partitions) > n_partitions:
-            partitions.sort(key=len, reverse=True)
-            e1 = partitions.pop()
-            e2 = partitions.pop()
-            partitions.append(e1.union(e2))
-        return partitions
+        n_splits = len(hierarchy.children)
+        partitions = hierarchy.partitions(n_partitions)
+        if fingerprint and len(hierarchy.children) > n_splits:
+            partitions_cache.put(key, hierarchy.splits())
+        return sorted(partitions, key=len, reverse=True)
 
 
 get_partitions = GetPartitions()
@@ -81,7 +124,20 @@ class EmbedBalanced(EmbedSolver):
     def solve(self, **kwargs):
         """Heuristic based on computing a k-balanced partitions of virtual nodes for then mapping the partition
            on a subset of the physical nodes.
+
+           Partitions are computed by algo, "bisection" (the default, Kernighan-Lin) or "multilevel",
+           the latter using seed.
+           With balance="resources" the parts are balanced by the cores and memory of the virtual nodes,
+           in proportion to the physical node they are mapped to, instead of by their number of nodes
+           (balance="nodes", the default). These parts depend on the hosts chosen for each number of
+           partitions, so they are computed by multilevel_partition at each try and not cached.
+           The partitions are paired with the physical nodes by assignment, "traffic" (the default), "capacity"
+           or "in_order" (see distriopt.embedding.assignment).
         """
+        balance = kwargs.get("balance", "nodes")
+        if balance not in ("nodes", "resources"):
+            raise ValueError("undefined balance")
+        node_weights = self.resource_weights() if balance == "resources" else None
 
         sorted_compute_nodes = sorted(
             self.physical.compute_nodes,
@@ -89,18 +145,39 @@ class EmbedBalanced(EmbedSolver):
             reverse=True,
         )
 
+        # resources available on the physical network, restored after each unfeasible try
+        residual = ResidualCapacity(self.physical)
+        # partitions computed for the same virtual network are reused, unless cache is False
+        fingerprint = self.virtual.fingerprint() if kwargs.get("cache", True) else None
+
         for n_partitions_to_try in range(
             self.lower_bound(), len(sorted_compute_nodes) + 1
         ):
 
-            # partitioning of virtual nodes in n_partitions_to_try partitions
-            k_partition = get_partitions(
-                self.virtual.g, n_partitions=n_partitions_to_try
-            )
-
             # subset of hosts of size n_partitions_to_try
             chosen_physical = sorted_compute_nodes[:n_partitions_to_try]
 
+            # partitioning of virtual nodes in n_partitions_to_try partitions
+            with self.stats.phase("partitioning"):
+                if node_weights is None:
+                    k_partition = get_partitions(
+                        self.virtual.g,
+                        n_partitions=n_partitions_to_try,
+                        fingerprint=fingerprint,
+                        algo=kwargs.get("algo", "bisection"),
+                        seed=kwargs.get("seed"),
+                    )
+                else:
+                    # the i-th part is proportional to the capacity of the i-th chosen host
+                    k_partition = multilevel_partition(
+                        self.virtual.g,
+                        n_partitions_to_try,
+                        weight="rate",
+                        seed=kwargs.get("seed"),
+                        node_weights=node_weights,
+                        capacities=[self.capacity_weight(h) for h in chosen_physical],
+                    )
+
             #
             # check if the partitioning is a feasible solution
             #
@@ -108,65 +185,71 @@ class EmbedBalanced(EmbedSolver):
                 # virtual nodes to physical nodes assignment
                 res_node_mapping = {}
 
-                # iterate over each pair (physical_node i, virtual nodes assigned to i)
-                for physical_node, assigned_virtual_nodes in zip(
-                    chosen_physical, k_partition
-                ):
-                    # keep track of the node physical resources used
-                    cores_used = memory_used = 0
-                    # check if node resources are not exceeded:
-                    for virtual_node in assigned_virtual_nodes:
-                        # cpu cores
-                        cores_used += self.virtual.req_cores(virtual_node)
-                        if self.physical.cores(physical_node) < cores_used:
-                            raise NodeResourceError(physical_node, "cpu cores")
-                        # memory
-                        memory_used += self.virtual.req_memory(virtual_node)
-                        if self.physical.memory(physical_node) < memory_used:
-                            raise NodeResourceError(physical_node, "memory")
-                        # assign the virtual nodes to a physical node
-                        res_node_mapping[virtual_node] = physical_node
+                with self.stats.phase("placement"):
+                    # iterate over each pair (physical_node i, virtual nodes assigned to i)
+                    for physical_node, assigned_virtual_nodes in assign_partitions(
+                        self.virtual,
+                        self.physical,
+                        k_partition,
+                        chosen_physical,
+                        assignment=kwargs.get("assignment", "traffic"),
+                    ):
+                        # check if node resources are not exceeded:
+                        for virtual_node in assigned_virtual_nodes:
+                            residual.reserve_node(
+                                physical_node,
+                                self.virtual.req_cores(virtual_node),
+                                self.virtual.req_memory(virtual_node),
+                            )
+                            # assign the virtual nodes to a physical node
+                            res_node_mapping[virtual_node] = physical_node
 
                 #
                 # virtual links to physical links assignment
                 #
-                res_link_mapping = {}
-                rate_used = defaultdict(int)
-
-                # iterate over each virtual link between two virtual nodes not mapped on the same physical machine
-                for (u, v) in (
-                    (u, v)
-                    for (u, v) in self.virtual.sorted_edges()
-                    if res_node_mapping[u] != res_node_mapping[v]
-                ):
-
-                    res_link_mapping[(u, v)] = []
-
-                    # physical nodes on which u and v have been placed
-                    phy_u, phy_v = res_node_mapping[u], res_node_mapping[v]
-
-                    # for each link in the physical path
-                    for (i, j, device_id) in self.physical.find_path(
-                        phy_u,
-                        phy_v,
-                        req_rate=self.virtual.req_rate(u, v),
-                        used_rate=rate_used,
+                with self.stats.phase("routing"):
+                    res_link_mapping = {}
+                    # paths from the same physical node are served by a single shortest path tree
+                    paths = ShortestPathTrees(
+                        self.physical, residual=residual, stats=self.stats
+                    )
+
+                    # iterate over each virtual link between two virtual nodes not mapped on the same physical machine
+                    for (u, v) in (
+                        (u, v)
+                        for (u, v) in self.virtual.sorted_edges()
+                        if res_node_mapping[u] != res_node_mapping[v]
                     ):
-                        # else update the rate
-                        rate_used[(i, j, device_id)] += self.virtual.req_rate(u, v)
 
-                        res_link_mapping[(u, v)].append((i, device_id, j))
+                        res_link_mapping[(u, v)] = []
+
+                        # physical nodes on which u and v have been placed
+                        phy_u, phy_v = res_node_mapping[u], res_node_mapping[v]
+
+                        # find a physical path and reserve its rate
+                        path = paths.find_path(
+                            phy_u, phy_v, req_rate=self.virtual.req_rate(u, v)
+                        )
+                        residual.reserve_path(path, self.virtual.req_rate(u, v))
+
+                        for (i, j, device_id) in path:
+                            res_link_mapping[(u, v)].append((i, device_id, j))
 
                 # build solution from the output
                 self.solution = Solution.build_solution(
-                    self.virtual, self.physical, res_node_mapping, res_link_mapping
+                    self.virtual,
+                    self.physical,
+                    res_node_mapping,
+                    res_link_mapping,
+                    stats=self.stats,
                 )
                 self.status = Solved
                 return Solved
 
             except (NodeResourceError, NoPathFoundError):
                 # unfeasible, increase the number of partitions to be used
-                pass
+                residual.rollback()
+                self.stats.retry(n_partitions_to_try)
         else:
             self.status = Infeasible
             return Infeasible
@@ -0,0 +1,415 @@
+"""
+Multilevel graph partitioning, in the spirit of METIS [1].
+
+The graph is coarsened by collapsing its heaviest edges, the coarsest graph is bisected by growing a region
+from a random node and the bisection is refined with the Fiduccia-Mattheyses heuristic [2] while it is
+projected back on the finer graphs. Partitioning into k parts is done by recursive bisection.
+
+[1] G. Karypis and V. Kumar, "A fast and high quality multilevel scheme for partitioning irregular graphs",
+    SIAM Journal on Scientific Computing, 1998.
+[2] C. M. Fiduccia and R. M. Mattheyses, "A linear-time heuristic for improving network partitions",
+    Design Automation Conference, 1982.
+"""
+import heapq
+import logging
+
+import numpy as np
+
+_log = logging.getLogger(__name__)
+
+# graphs with at most this number of nodes are not coarsened any further
+_COARSEST_SIZE = 40
+# the coarsening stops when a level removes less than this fraction of the nodes
+_MIN_SHRINK = 0.05
+# number of bisections of the coarsest graph, the best one is kept
+_INITIAL_TRIES = 4
+# refinement passes on each level, and moves without improvement after which a pass stops
+_FM_PASSES = 8
+_FM_MAX_BAD_MOVES = 64
+# allowed imbalance of a bisection, as a fraction of the weight expected on the lightest side
+_IMBALANCE = 0.01
+
+
+class _Graph(object):
+    """Undirected graph in compressed sparse row format, with weighted nodes 0, ..., n - 1 and edges.
+
+    The neighbors of node u are indices[indptr[u]:indptr[u + 1]], each edge is stored in both directions
+    and rows holds the source node of each stored edge.
+    """
+
+    __slots__ = ("indptr", "indices", "weights", "node_weights", "rows")
+
+    def __init__(self, indptr, indices, weights, node_weights, rows):
+        self.indptr = indptr
+        self.indices = indices
+        self.weights = weights
+        self.node_weights = node_weights
+        self.rows = rows
+
+    @property
+    def n(self):
+        return len(self.node_weights)
+
+    @classmethod
+    def from_edges(cls, n, rows, cols, weights, node_weights):
+        """Build the graph from the arrays of the edges, sorted by rows and stored in both directions."""
+        indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=n), out=indptr[1:])
+        return cls(indptr, cols, weights, node_weights, rows)
+
+    @classmethod
+    def from_networkx(cls, g, nodes, weight="rate", node_weights=None):
+        """Build the graph from the networkx graph g, the i-th node is nodes[i].
+
+        node_weights maps each node to its weight, all the nodes weigh 1 if None.
+        """
+        index = {u: i for i, u in enumerate(nodes)}
+        edges = [
+            (index[u], index[v], w)
+            for (u, v, w) in g.edges(data=weight, default=1)
+            if u != v
+        ]
+        if edges:
+            sources, targets, weights = (np.array(values) for values in zip(*edges))
+        else:
+            sources = targets = np.zeros(0, dtype=np.int64)
+            weights = np.zeros(0)
+        rows = np.concatenate((sources, targets)).astype(np.int64)
+        cols = np.concatenate((targets, sources)).astype(np.int64)
+        order = np.argsort(rows, kind="stable")
+        return cls.from_edges(
+            len(nodes),
+            rows[order],
+            cols[order],
+            np.concatenate((weights, weights)).astype(float)[order],
+            (
+                np.ones(len(nodes))
+                if node_weights is None
+                else np.array([node_weights[u] for u in nodes], dtype=float)
+            ),
+        )
+
+    def subgraph(self, ids):
+        """Return the subgraph induced by the sorted array of nodes ids, its i-th node is ids[i]."""
+        local = np.full(self.n, -1, dtype=np.int64)
+        local[ids] = np.arange(len(ids))
+        rows, cols = local[self.rows], local[self.indices]
+        keep = (rows >= 0) & (cols >= 0)
+        return _Graph.from_edges(
+            len(ids), rows[keep], cols[keep], self.weights[keep], self.node_weights[ids]
+        )
+
+    def contract(self, cmap, n_coarse):
+        """Return the graph where the nodes with the same cmap are merged, parallel edges are summed."""
+        rows, cols = cmap[self.rows], cmap[self.indices]
+        keep = rows != cols
+        keys, inverse = np.unique(
+            rows[keep] * n_coarse + cols[keep], return_inverse=True
+        )
+        weights = np.bincount(inverse.ravel(), weights=self.weights[keep])
+        return _Graph.from_edges(
+            n_coarse,
+            keys // n_coarse,
+            keys % n_coarse,
+            weights,
+            np.bincount(cmap, weights=self.node_weights, minlength=n_coarse),
+        )
+
+
+def _heavy_edge_matching(graph, random_state, max_node_weight):
+    """Match each node with the unmatched neighbor connected by the heaviest edge, visiting them randomly.
+
+    Return the map of the nodes to the coarse ones and the number of coarse nodes.
+    """
+    indptr = graph.indptr.tolist()
+    indices = graph.indices.tolist()
+    weights = graph.weights.tolist()
+    node_weights = graph.node_weights.tolist()
+
+    match = [-1] * graph.n
+    for u in random_state.permutation(graph.n).tolist():
+        if match[u] != -1:
+            continue
+        best, best_weight = u, -1
+        for k in range(indptr[u], indptr[u + 1]):
+            v = indices[k]
+            if (
+                match[v] == -1
+                and v != u
+                and weights[k] > best_weight
+                and node_weights[u] + node_weights[v] <= max_node_weight
+            ):
+                best, best_weight = v, weights[k]
+        match[u], match[best] = best, u
+
+    # the node with the smallest index represents its pair
+    match = np.array(match, dtype=np.int64)
+    leaders = np.flatnonzero(np.arange(graph.n) <= match)
+    cmap = np.empty(graph.n, dtype=np.int64)
+    cmap[leaders] = np.arange(len(leaders))
+    cmap[match[leaders]] = cmap[leaders]
+    return cmap, len(leaders)
+
+
+class _Bisection(object):
+    """Assignment of the nodes of a graph to side 0 or 1, with the weight of side 0 close to target."""
+
+    def __init__(self, graph, side, target):
+        self.graph = graph
+        self.side = np.asarray(side, dtype=np.int8)
+        self.target = target
+        # imbalance tolerated, at least half of the heaviest node so that a balanced bisection exists
+        # with nodes of the same weight, and no side is left empty
+        total = graph.node_weights.sum()
+        self.tolerance = max(
+            _IMBALANCE * min(target, total - target),
+            graph.node_weights.max(initial=0) / 2,
+        )
+
+    def violation(self, weight):
+        """Return how much a weight of side 0 exceeds the tolerated imbalance."""
+        return max(0.0, abs(weight - self.target) - self.tolerance)
+
+    def gains(self):
+        """Return the cut, the weight of side 0, the gain of moving each node and the boundary nodes."""
+        graph, side = self.graph, self.side
+        rows = graph.rows
+        external = side[rows] != side[graph.indices]
+        gains = np.bincount(
+            rows,
+            weights=np.where(external, graph.weights, -graph.weights),
+            minlength=graph.n,
+        )
+        boundary = np.flatnonzero(np.bincount(rows[external], minlength=graph.n) > 0)
+        return (
+            graph.weights[external].sum() / 2,
+            graph.node_weights[side == 0].sum(),
+            gains,
+            boundary,
+        )
+
+    def refine(self, passes=_FM_PASSES):
+        """Improve the bisection with passes of the Fiduccia-Mattheyses heuristic.
+
+        Return its violation of the balance and its cut.
+
+        Each pass moves, one at a time, the unlocked node with the highest gain that keeps the balance,
+        then the moves after the best bisection seen (the most balanced, then the one with the smallest cut)
+        are undone. A pass stops after _FM_MAX_BAD_MOVES moves without improvement.
+        """
+        indptr = self.graph.indptr.tolist()
+        indices = self.graph.indices.tolist()
+        weights = self.graph.weights.tolist()
+        node_weights = self.graph.node_weights.tolist()
+
+        for _ in range(passes):
+            cut, weight, gains, boundary = self.gains()
+            side = self.side.tolist()
+            gains = gains.tolist()
+            locked = [False] * self.graph.n
+            # when unbalanced, any node may have to be moved
+            candidates = (
+                boundary.tolist() if self.violation(weight) == 0 else range(len(side))
+            )
+            heap = [(-gains[v], v) for v in candidates]
+            heapq.heapify(heap)
+
+            moves = []
+            best_key, n_best, n_bad = (self.violation(weight), cut), 0, 0
+            while heap and n_bad <= _FM_MAX_BAD_MOVES:
+                neg_gain, v = heapq.heappop(heap)
+                if locked[v] or -neg_gain != gains[v]:
+                    # outdated entry
+                    continue
+                a = side[v]
+                new_weight = (
+                    weight - node_weights[v] if a == 0 else weight + node_weights[v]
+                )
+                violation = self.violation(new_weight)
+                if violation > 0 and violation >= self.violation(weight):
+                    # the move would break the balance, or would not restore it
+                    continue
+
+                locked[v] = True
+                side[v] = 1 - a
+                weight = new_weight
+                cut -= gains[v]
+                gains[v] = -gains[v]
+                moves.append(v)
+                for k in range(indptr[v], indptr[v + 1]):
+                    u = indices[k]
+                    gains[u] += 2 * weights[k] if side[u] == a else -2 * weights[k]
+                    if not locked[u]:
+                        heapq.heappush(heap, (-gains[u], u))
+
+                key = (self.violation(weight), cut)
+                if key < best_key:
+                    best_key, n_best, n_bad = key, len(moves), 0
+                else:
+                    n_bad += 1
+
+            for v in moves[n_best:]:
+                side[v] = 1 - side[v]
+            self.side = np.array(side, dtype=np.int8)
+            if n_best == 0:
+                break
+        return best_key
+
+
+def _grow_bisection(graph, target, random_state):
+    """Return the nodes reached by a breadth first visit from a random node, until their weight is target."""
+    indptr = graph.indptr.tolist()
+    indices = graph.indices.tolist()
+    node_weights = graph.node_weights.tolist()
+    side = [1] * graph.n
+    weight = 0
+    order = random_state.permutation(graph.n).tolist()
+    queue, head, next_start = [], 0, 0
+    while weight < target:
+        if head == len(queue):
+            # start again from a random node, if the graph is not connected
+            while side[order[next_start]] == 0:
+                next_start += 1
+            queue.append(order[next_start])
+            side[order[next_start]] = 0
+            weight += node_weights[order[next_start]]
+            continue
+        u = queue[head]
+        head += 1
+        for v in indices[indptr[u] : indptr[u + 1]]:
+            if side[v] == 1 and weight < target:
+                side[v] = 0
+                weight += node_weights[v]
+                queue.append(v)
+    return side
+
+
+def _bisect(graph, fraction, random_state):
+    """Return the side (0 or 1) of each node, with about fraction of the weight of the nodes on side 0."""
+    total = graph.node_weights.sum()
+    max_node_weight = 1.5 * total / _COARSEST_SIZE
+
+    # coarsening
+    levels, cmaps = [graph], []
+    while levels[-1].n > _COARSEST_SIZE:
+        cmap, n_coarse = _heavy_edge_matching(levels[-1], random_state, max_node_weight)
+        if n_coarse > (1 - _MIN_SHRINK) * levels[-1].n:
+            break
+        cmaps.append(cmap)
+        levels.append(levels[-1].contract(cmap, n_coarse))
+
+    # initial bisection of the coarsest graph
+    target = fraction * total
+    best, best_key = None, None
+    for _ in range(_INITIAL_TRIES):
+        bisection = _Bisection(
+            levels[-1], _grow_bisection(levels[-1], target, random_state), target
+        )
+        key = bisection.refine()
+        if best_key is None or key < best_key:
+            best, best_key = bisection, key
+
+    # uncoarsening
+    side = best.side
+    for level, cmap in zip(reversed(levels[:-1]), reversed(cmaps)):
+        bisection = _Bisection(level, side[cmap], target)
+        bisection.refine()
+        side = bisection.side
+    return side
+
+
+def _small_bisection(graph):
+    """Bisect a graph of 2 or 3 nodes, separating the node with the lightest links."""
+    degrees = np.bincount(graph.rows, weights=graph.weights, minlength=graph.n)
+    side = np.ones(graph.n, dtype=np.int8)
+    side[np.argmin(degrees)] = 0
+    return side
+
+
+class Bisector(object):
+    """Bisect the subgraphs of g induced by a set of nodes, e.g., by the parts of its previous bisections.
+
+    Edges are weighted by their weight attribute (1 if missing), seed initializes the random choices.
+    The subgraph of each part returned is kept until the part is bisected, so that a recursive bisection
+    never goes back to g.
+    """
+
+    def __init__(self, g, weight="rate", seed=None):
+        self.nodes = list(g.nodes())
+        self._index = {u: i for i, u in enumerate(self.nodes)}
+        self._random_state = np.random.RandomState(seed)
+        self._graph = _Graph.from_networkx(g, self.nodes, weight=weight)
+        # part -> (indices of its nodes, induced subgraph), for the parts not bisected yet
+        self._subgraphs = {
+            frozenset(self.nodes): (np.arange(self._graph.n), self._graph)
+        }
+
+    def __call__(self, part):
+        """Return a bisection of part as two sets of nodes of about the same size, cutting the lightest edges."""
+        part = frozenset(part)
+        if part in self._subgraphs:
+            ids, graph = self._subgraphs.pop(part)
+        else:
+            ids = np.array(sorted(self._index[u] for u in part), dtype=np.int64)
+            graph = self._graph.subgraph(ids)
+        if graph.n < 2:
+            return set(part), set()
+        side = (
+            _small_bisection(graph)
+            if graph.n <= 3
+            else _bisect(graph, 0.5, self._random_state)
+        )
+
+        bisection = []
+        for s in (0, 1):
+            local = np.flatnonzero(side == s)
+            nodes = frozenset(self.nodes[i] for i in ids[local].tolist())
+            if len(nodes) > 1:
+                self._subgraphs[nodes] = (ids[local], graph.subgraph(local))
+            bisection.append(set(nodes))
+        return tuple(bisection)
+
+
+def multilevel_bisection(g, weight="rate", seed=None):
+    """Return a bisection of g as two sets of nodes of about the same size, cutting the lightest edges.
+
+    Edges are weighted by their weight attribute (1 if missing), seed initializes the random choices.
+    To bisect g recursively, a Bisector is faster.
+    """
+    return Bisector(g, weight=weight, seed=seed)(g.nodes())
+
+
+def multilevel_partition(
+    g, n_partitions, weight="rate", seed=None, node_weights=None, capacities=None
+):
+    """Return n_partitions sets of nodes of g of about the same size, cutting the lightest edges.
+
+    If node_weights (a dict node -> weight) is given, the size of a part is the total weight of its nodes
+    instead of their number. If capacities is given, the i-th part has a size proportional to capacities[i]
+    (e.g., to the resources of the physical node it is meant for), the same size otherwise.
+    Parts are obtained by recursive bisection, some of them are empty only if g has fewer nodes.
+    """
+    if capacities is None:
+        capacities = [1] * n_partitions
+    assert len(capacities) == n_partitions, "a capacity is needed for each partition"
+    random_state = np.random.RandomState(seed)
+    nodes = list(g.nodes())
+    graph = _Graph.from_networkx(g, nodes, weight=weight, node_weights=node_weights)
+
+    partitions = [set() for _ in range(n_partitions)]
+    # (indices of the nodes, induced subgraph, range of the partitions they are split into)
+    to_be_processed = [(np.arange(graph.n), graph, 0, n_partitions)]
+    while to_be_processed:
+        ids, subgraph, first, last = to_be_processed.pop()
+        if last - first == 1 or len(ids) <= 1:
+            partitions[first].update(nodes[i] for i in ids.tolist())
+            continue
+        middle = (first + last) // 2
+        fraction = sum(capacities[first:middle]) / sum(capacities[first:last])
+        side = _bisect(subgraph, fraction, random_state)
+        for s, (side_first, side_last) in ((0, (first, middle)), (1, (middle, last))):
+            local = np.flatnonzero(side == s)
+            to_be_processed.append(
+                (ids[local], subgraph.subgraph(local), side_first, side_last)
+            )
+    return partitions
@@ -1,17 +1,86 @@
+import heapq
+import itertools
 import logging
+import math
 import random
-from collections import defaultdict
+import warnings
+from collections import Counter, defaultdict
 
 from distriopt.constants import *
 from distriopt.decorators import timeit
 from distriopt.embedding import EmbedSolver
+from distriopt.embedding.assignment import assign_partitions
+from distriopt.embedding.algorithms.multilevel import multilevel_partition
+from distriopt.embedding.residual import ResidualCapacity
+from distriopt.embedding.routing import ShortestPathTrees
 from distriopt.embedding.solution import Solution
 
 _log = logging.getLogger(__name__)
 
+# gains below this value are rounding errors of the rates
+_MIN_GAIN = 1e-9
 
-def get_partitions(virtual, n_partitions, n_swaps=100):
-    """ Divide the nodes in n_partitions bins and then tries to swap nodes to reduce the cut weight."""
+
+def _gain(u, part, part_of, conn):
+    """Return the reduction of the cut weight if u is moved to part."""
+    return conn[u].get(part, 0) - conn[u].get(part_of[u], 0)
+
+
+def _best_move(u, part_of, conn):
+    """Return (gain, part) of the move of u reducing the cut weight the most, None if no move reduces it."""
+    source = part_of[u]
+    internal = conn[u].get(source, 0)
+    best = None
+    # moving u to a part without neighbors of u never reduces the cut
+    for part, external in conn[u].items():
+        gain = external - internal
+        if part != source and gain > _MIN_GAIN and (best is None or gain > best[0]):
+            best = (gain, part)
+    return best
+
+
+def get_partitions(
+    virtual,
+    n_partitions,
+    max_moves=None,
+    algo="swap",
+    seed=None,
+    node_weights=None,
+    capacities=None,
+    n_swaps=None,
+):
+    """ Divide the nodes in n_partitions bins and then moves nodes between them to reduce the cut weight.
+
+    Each move takes the node with the largest gain (reduction of the cut weight), kept up to date from the
+    rate of the links of each node towards each bin. A move making the sizes of the bins differ by more than 1
+    is paired with a move the other way, i.e., the two nodes are swapped.
+    Moves stop when no move reduces the cut weight or after about max_moves moves.
+
+    With algo="multilevel" the bins are computed by multilevel_partition using seed instead, balancing
+    node_weights (if given) so that the i-th bin is proportional to capacities[i].
+
+    n_swaps is a deprecated alias of max_moves.
+    """
+    if n_swaps is not None:
+        if max_moves is not None:
+            raise TypeError("n_swaps and max_moves cannot be both given")
+        warnings.warn(
+            "n_swaps is deprecated, use max_moves", DeprecationWarning, stacklevel=2
+        )
+        max_moves = n_swaps
+    if algo == "multilevel":
+        return multilevel_partition(
+            virtual.g,
+            n_partitions,
+            weight="rate",
+            seed=seed,
+            node_weights=node_weights,
+            capacities=capacities,
+        )
+    elif algo != "swap":
+        raise ValueError("undefined")
+    elif node_weights is not None or capacities is not None:
+        raise ValueError("nodes can be weighted only by the multilevel algorithm")
 
     nodes = list(virtual.nodes())
     random.shuffle(nodes)
@@ -19,40 +88,92 @@ def get_partitions(virtual, n_partitions, n_swaps=100):
     nodes_partition = {
         node: id_node % n_partitions for id_node, node in enumerate(nodes)
     }
+    sizes = Counter(nodes_partition.values())
+    # the sizes of the bins stay the initial ones, up to the remainder of the division
+    min_size = len(nodes) // n_partitions
+    max_size = math.ceil(len(nodes) / n_partitions)
 
-    # current cost for the partition
-    old_cost = sum(
-        virtual.req_rate(u, v)
-        for (u, v) in virtual.edges()
-        if nodes_partition[u] != nodes_partition[v]
-    )
+    # node -> neighbor -> rate of the link
+    adjacency = {
+        u: {v: virtual.req_rate(u, v) for v in virtual.neighbors(u)} for u in nodes
+    }
+    # node -> id of a partition -> rate of the links of the node towards the partition
+    conn = {u: defaultdict(int) for u in nodes}
+    for u in nodes:
+        for (v, rate) in adjacency[u].items():
+            conn[u][nodes_partition[v]] += rate
 
-    for _ in range(n_swaps):
-        # take two random nodes
-        u1, u2 = random.sample(nodes, k=2)
-        # if the partitions ids of u1 and u2 are the same continue
-        if nodes_partition[u1] == nodes_partition[u2]:
-            continue
-        # store the old partition ids of u1 and u2
-        old_u1, old_u2 = nodes_partition[u1], nodes_partition[u2]
-        # swap the partitions
-        nodes_partition[u1], nodes_partition[u2] = (
-            nodes_partition[u2],
-            nodes_partition[u1],
-        )
-        # compute the new cost
-        new_cost = sum(
-            virtual.req_rate(u, v)
-            for (u, v) in virtual.edges()
-            if nodes_partition[u] != nodes_partition[v]
-        )
+    # breaks the ties between moves with the same gain in the heaps
+    tie = itertools.count()
+    heap = []
 
-        if new_cost < old_cost:
-            # update the current cost
-            old_cost = new_cost
-        else:
-            # go back to the previous solution
-            nodes_partition[u1], nodes_partition[u2] = old_u1, old_u2
+    def move(u, part):
+        source = nodes_partition[u]
+        nodes_partition[u] = part
+        sizes[source] -= 1
+        sizes[part] += 1
+        for (v, rate) in adjacency[u].items():
+            conn[v][source] -= rate
+            conn[v][part] += rate
+            best = _best_move(v, nodes_partition, conn)
+            if best is not None:
+                heapq.heappush(heap, (-best[0], next(tie), v, best[1]))
+
+    n_moves = 0
+    while max_moves is None or n_moves < max_moves:
+        # a pass: the best move of each node, applied from the largest gain if still valid
+        for u in nodes:
+            best = _best_move(u, nodes_partition, conn)
+            if best is not None:
+                heap.append((-best[0], next(tie), u, best[1]))
+        heapq.heapify(heap)
+        # (source, target) -> heap of the moves reducing the cut weight of the nodes whose best move
+        # was not applied since it unbalances the partitions
+        blocked = defaultdict(list)
+        n_moves_pass = 0
+
+        while heap and (max_moves is None or n_moves < max_moves):
+            neg_gain, _, u, part = heapq.heappop(heap)
+            if _best_move(u, nodes_partition, conn) != (-neg_gain, part):
+                # outdated by the moves of its neighbors, the new one has been pushed
+                continue
+            source = nodes_partition[u]
+            if sizes[source] > min_size and sizes[part] < max_size:
+                move(u, part)
+                n_moves += 1
+                n_moves_pass += 1
+                continue
+
+            # swap u with the best node waiting to move the other way, if the cut weight is reduced
+            partners = blocked[(part, source)]
+            while partners:
+                partner_gain, _, v = partners[0]
+                if nodes_partition[v] == part and _gain(
+                    v, source, nodes_partition, conn
+                ) == -partner_gain:
+                    break
+                heapq.heappop(partners)
+            if partners:
+                partner_gain, _, v = partners[0]
+                # the link between u and v is cut both before and after the swap
+                swap_gain = -neg_gain - partner_gain - 2 * adjacency[u].get(v, 0)
+                if swap_gain > _MIN_GAIN:
+                    heapq.heappop(partners)
+                    move(u, part)
+                    move(v, source)
+                    n_moves += 2
+                    n_moves_pass += 2
+                    continue
+            # u waits for a partner towards any bin reducing the cut weight, not only the best one
+            for (other, external) in conn[u].items():
+                gain = _gain(u, other, nodes_partition, conn)
+                if other != source and gain > _MIN_GAIN:
+                    heapq.heappush(blocked[(source, other)], (-gain, next(tie), u))
+
+        heap.clear()
+        if not n_moves_pass:
+            # converged, no move reduces the cut weight
+            break
 
     partitions = defaultdict(list)
     for node, id_partition in nodes_partition.items():
@@ -65,20 +186,52 @@ class EmbedPartition(EmbedSolver):
     def solve(self, **kwargs):
         """Heuristic based on computing a k-balanced partitions of virtual nodes for then mapping the partition
            on a subset of the physical nodes.
+
+           Partitions are computed by algo, "swap" (the default) or "multilevel", the latter using seed.
+           With balance="resources" (only multilevel, the default algo in that case) the parts are balanced
+           by the cores and memory of the virtual nodes, in proportion to the physical node they are mapped to,
+           instead of by their number of nodes (balance="nodes", the default).
+           The partitions are paired with the physical nodes by assignment, "traffic" (the default), "capacity"
+           or "in_order" (see distriopt.embedding.assignment).
         """
+        balance = kwargs.get("balance", "nodes")
+        if balance == "resources":
+            algo = kwargs.get("algo", "multilevel")
+            node_weights = self.resource_weights()
+        elif balance == "nodes":
+            algo = kwargs.get("algo", "swap")
+            node_weights = None
+        else:
+            raise ValueError("undefined balance")
+
         sorted_compute_nodes = sorted(
             self.physical.compute_nodes,
             key=lambda x: self.physical.cores(x) * 1000 + self.physical.memory(x),
             reverse=True,
         )
 
+        # resources available on the physical network, restored after each unfeasible try
+        residual = ResidualCapacity(self.physical)
+
         for n_partitions_to_try in range(
             self.lower_bound(), len(self.physical.compute_nodes) + 1
         ):
-            # partitioning of virtual nodes in n_partitions_to_try partitions
-            k_partition = get_partitions(self.virtual, n_partitions=n_partitions_to_try)
             # random subset of hosts of size n_partitions_to_try
             chosen_physical = sorted_compute_nodes[:n_partitions_to_try]
+            # partitioning of virtual nodes in n_partitions_to_try partitions
+            with self.stats.phase("partitioning"):
+                k_partition = get_partitions(
+                    self.virtual,
+                    n_partitions=n_partitions_to_try,
+                    algo=algo,
+                    seed=kwargs.get("seed"),
+                    node_weights=node_weights,
+                    capacities=(
+                        None
+                        if node_weights is None
+                        else [self.capacity_weight(h) for h in chosen_physical]
+                    ),
+                )
             #
             # check if the partitioning is a feasible solution
             #
@@ -86,63 +239,71 @@ class EmbedPartition(EmbedSolver):
                 # virtual nodes to physical nodes assignment
                 res_node_mapping = {}
 
-                # iterate over each pair (physical_node i, virtual nodes assigned to i)
-                for physical_node, assigned_virtual_nodes in zip(
-                    chosen_physical, k_partition
-                ):
-                    # keep track of the node physical resources used
-                    cores_used = memory_used = 0
-                    # check if node resources are not exceeded:
-                    for virtual_node in assigned_virtual_nodes:
-                        # cpu cores
-                        cores_used += self.virtual.req_cores(virtual_node)
-                        if self.physical.cores(physical_node) < cores_used:
-                            raise NodeResourceError(physical_node, "cpu cores")
-                        # memory
-                        memory_used += self.virtual.req_memory(virtual_node)
-                        if self.physical.memory(physical_node) < memory_used:
-                            raise NodeResourceError(physical_node, "memory")
-                        # assign the virtual nodes to a physical node
-                        res_node_mapping[virtual_node] = physical_node
+                with self.stats.phase("placement"):
+                    # iterate over each pair (physical_node i, virtual nodes assigned to i)
+                    for physical_node, assigned_virtual_nodes in assign_partitions(
+                        self.virtual,
+                        self.physical,
+                        k_partition,
+                        chosen_physical,
+                        assignment=kwargs.get("assignment", "traffic"),
+                    ):
+                        # check if node resources are not exceeded:
+                        for virtual_node in assigned_virtual_nodes:
+                            residual.reserve_node(
+                                physical_node,
+                                self.virtual.req_cores(virtual_node),
+                                self.virtual.req_memory(virtual_node),
+                            )
+                            # assign the virtual nodes to a physical node
+                            res_node_mapping[virtual_node] = physical_node
 
                 #
                 # virtual links to physical links assignment
                 #
-                res_link_mapping = {}
-                rate_used = defaultdict(int)
-
-                # iterate over each virtual link between two virtual nodes not mapped on the same physical machine
-                for (u, v) in (
-                    (u, v)
-                    for (u, v) in self.virtual.sorted_edges()
-                    if res_node_mapping[u] != res_node_mapping[v]
-                ):
-
-                    res_link_mapping[(u, v)] = []
-
-                    # physical nodes on which u and v have been placed
-                    phy_u, phy_v = res_node_mapping[u], res_node_mapping[v]
-
-                    # for each link in the physical path
-                    for (i, j, device_id) in self.physical.find_path(
-                        phy_u,
-                        phy_v,
-                        req_rate=self.virtual.req_rate(u, v),
-                        used_rate=rate_used,
+                with self.stats.phase("routing"):
+                    res_link_mapping = {}
+                    # paths from the same physical node are served by a single shortest path tree
+                    paths = ShortestPathTrees(
+                        self.physical, residual=residual, stats=self.stats
+                    )
+
+                    # iterate over each virtual link between two virtual nodes not mapped on the same physical machine
+                    for (u, v) in (
+                        (u, v)
+                        for (u, v) in self.virtual.sorted_edges()
+                        if res_node_mapping[u] != res_node_mapping[v]
                     ):
-                        rate_used[(i, j, device_id)] += self.virtual.req_rate(u, v)
-                        res_link_mapping[(u, v)].append((i, device_id, j))
+
+                        res_link_mapping[(u, v)] = []
+
+                        # physical nodes on which u and v have been placed
+                        phy_u, phy_v = res_node_mapping[u], res_node_mapping[v]
+
+                        # find a physical path and reserve its rate
+                        path = paths.find_path(
+                            phy_u, phy_v, req_rate=self.virtual.req_rate(u, v)
+                        )
+                        residual.reserve_path(path, self.virtual.req_rate(u, v))
+
+                        for (i, j, device_id) in path:
+                            res_link_mapping[(u, v)].append((i, device_id, j))
 
                 # build solution from the output
                 self.solution = Solution.build_solution(
-                    self.virtual, self.physical, res_node_mapping, res_link_mapping
+                    self.virtual,
+                    self.physical,
+                    res_node_mapping,
+                    res_link_mapping,
+                    stats=self.stats,
                 )
                 self.status = Solved
                 return Solved
 
-            except (NodeResourceError, NoPathFoundError) as err:
+            except (NodeResourceError, NoPathFoundError):
                 # unfeasible, increase the number of partitions to be used
-                pass
+                residual.rollback()
+                self.stats.retry(n_partitions_to_try)
         else:
             self.status = Infeasible
             return Infeasible
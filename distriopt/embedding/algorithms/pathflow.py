@@ -0,0 +1,739 @@
+"""
+Path formulation of the embedding problem, solved by column generation.
+
+Each virtual link is routed on a path between the physical nodes hosting its ends. The model holds only
+the paths found useful: the linear relaxation is solved with the paths generated so far, and the paths
+with a negative reduced cost, shortest paths for interface weights given by the duals of the relaxation,
+are added until there is none left. The integer model is then solved on the paths generated.
+
+The relaxations are solved by scipy.optimize.linprog with method="highs", whose dual values (marginals)
+require scipy >= 1.7, below the scipy >= 1.9 already required by the HiGHS solver.
+"""
+import logging
+import time
+from itertools import islice
+
+import networkx as nx
+import numpy as np
+import scipy.sparse as sp
+from scipy.sparse import csgraph
+
+from distriopt.embedding.algorithms.arcflow import SparseModel, host_classes
+
+_log = logging.getLogger(__name__)
+
+# reduced cost below which a path improves the linear relaxation
+_TOLERANCE = 1e-6
+
+
+class PathFlowModel(SparseModel):
+    """Path formulation of the mapping of a virtual network onto a physical network.
+
+    Variables, in this order:
+    - node mapping: for each virtual node u and physical node i fitting it, whether u is mapped on i;
+    - usage (only for obj="min_n_machines"): for each physical node fitting a virtual node, whether it is used;
+    - path mapping: for each virtual link e and each path generated for it, from a physical node to another one
+      (a tuple of interface slots of the compiled physical network), whether e is routed on it.
+
+    The constraints are the assignment of each virtual node, the cores and memory of each physical node
+    (available only if it is used, for obj="min_n_machines"), the flow conservation of each virtual link on each
+    physical node that can host one of its ends (the paths leaving it minus the ones reaching it are 1 on the
+    host of u and -1 on the host of v), a single path leaving the host of u and the rate of each physical
+    interface. A virtual link with both ends on the same physical node needs no path.
+    If names is True, each variable and constraint gets a descriptive name, otherwise they are only numbered.
+
+    The model starts without paths, generate() adds them. With each path generated, the k_paths shortest
+    paths (in hops) between the same physical nodes are added as well, as alternatives for the integer solution.
+    If symmetry is True, the interchangeable physical nodes are used in order, as in ArcFlowModel.
+    """
+
+    def __init__(
+        self,
+        virtual,
+        physical,
+        obj="min_n_machines",
+        names=False,
+        symmetry=True,
+        k_paths=2,
+    ):
+        if obj not in ("min_n_machines", "min_bw", "no_obj"):
+            raise ValueError("undefined objective")
+        self.virtual = virtual
+        self.physical = physical
+        self.obj = obj
+        self.k_paths = k_paths
+        self.network = network = physical.compile()
+
+        self.virtual_nodes = list(virtual.nodes())
+        self.virtual_links = list(virtual.sorted_edges())
+        index = {u: n for n, u in enumerate(self.virtual_nodes)}
+        n_nodes, n_links, n_phy = (
+            len(self.virtual_nodes),
+            len(self.virtual_links),
+            network.n_nodes,
+        )
+        self.link_u = np.array(
+            [index[u] for (u, v) in self.virtual_links], dtype=np.int64
+        )
+        self.link_v = np.array(
+            [index[v] for (u, v) in self.virtual_links], dtype=np.int64
+        )
+        self.link_rate = np.array(
+            [virtual.req_rate(u, v) for (u, v) in self.virtual_links], dtype=float
+        )
+        req_cores = np.array(
+            [virtual.req_cores(u) for u in self.virtual_nodes], dtype=float
+        )
+        req_memory = np.array(
+            [virtual.req_memory(u) for u in self.virtual_nodes], dtype=float
+        )
+
+        self.fits = (
+            (network.cores > 0)
+            & (network.memory > 0)
+            & (req_cores[:, None] <= network.cores)
+            & (req_memory[:, None] <= network.memory)
+        )
+        # some virtual node fits in no physical node
+        self.infeasible = not self.fits.any(axis=1).all()
+        # physical nodes each virtual node can be mapped on, after the symmetry breaking
+        self.placeable = self.fits.copy()
+        self.host_classes = host_classes(network) if symmetry else []
+        self.symmetric_pairs = []
+        for hosts in self.host_classes:
+            rank = np.cumsum(self.fits[:, hosts[0]]) - 1
+            for k, i in enumerate(hosts):
+                self.placeable[:, i] &= rank >= k
+            # the nodes hosting none of the virtual nodes have no usage
+            used = [i for i in hosts if self.placeable[:, i].any()]
+            self.symmetric_pairs.extend(zip(used, used[1:]))
+        self.hosts = np.flatnonzero(self.placeable.any(axis=0))
+        host_pos = np.full(n_phy, -1)
+        host_pos[self.hosts] = np.arange(len(self.hosts))
+
+        # node mapping variables, grouped by virtual node
+        self.node_u, self.node_i = np.nonzero(self.placeable)
+        n_node_vars = len(self.node_u)
+        self._node_column = np.full((n_nodes, n_phy), -1)
+        self._node_column[self.node_u, self.node_i] = np.arange(n_node_vars)
+        self._node_columns = np.split(
+            np.arange(n_node_vars), np.cumsum(self.placeable.sum(axis=1))[:-1]
+        )
+        self._usage_column = np.full(n_phy, -1)
+        if obj == "min_n_machines":
+            self._usage_column[self.hosts] = n_node_vars + np.arange(len(self.hosts))
+        self.path_offset = n_node_vars + (
+            len(self.hosts) if obj == "min_n_machines" else 0
+        )
+
+        # each block of constraints is (rows, cols, coefficients, lower bounds, upper bounds)
+        blocks = []
+        self._row_kinds = []
+
+        def add_block(kind, n_rows, rows, cols, data, lower, upper):
+            start = sum(n for (_, n) in self._row_kinds)
+            blocks.append(
+                (
+                    np.concatenate(rows) + start,
+                    np.concatenate(cols),
+                    np.concatenate(data),
+                    np.broadcast_to(np.asarray(lower, dtype=float), (n_rows,)),
+                    np.broadcast_to(np.asarray(upper, dtype=float), (n_rows,)),
+                )
+            )
+            self._row_kinds.append((kind, n_rows))
+            return start + np.arange(n_rows)
+
+        node_var = np.arange(n_node_vars)
+        # assignment of each virtual node to a physical node
+        add_block(
+            "assignment",
+            n_nodes,
+            [self.node_u],
+            [node_var],
+            [np.ones(n_node_vars)],
+            1,
+            1,
+        )
+        # cores and memory of each physical node
+        for kind, req, capacity in (
+            ("cores", req_cores, network.cores),
+            ("memory", req_memory, network.memory),
+        ):
+            if obj == "min_n_machines":
+                add_block(
+                    kind,
+                    len(self.hosts),
+                    [host_pos[self.node_i], np.arange(len(self.hosts))],
+                    [node_var, self._usage_column[self.hosts]],
+                    [req[self.node_u], -capacity[self.hosts]],
+                    -np.inf,
+                    0,
+                )
+            else:
+                add_block(
+                    kind,
+                    len(self.hosts),
+                    [host_pos[self.node_i]],
+                    [node_var],
+                    [req[self.node_u]],
+                    -np.inf,
+                    capacity[self.hosts],
+                )
+        # flow conservation of each virtual link e on each physical node i that can host u or v:
+        # the paths leaving i minus the ones reaching i, minus the mapping of u on i plus the one of v
+        self.conservation = np.nonzero(
+            self.placeable[self.link_u] | self.placeable[self.link_v]
+        )
+        e_of_row, i_of_row = self.conservation
+        rows = np.arange(len(e_of_row))
+        u_column = self._node_column[self.link_u[e_of_row], i_of_row]
+        v_column = self._node_column[self.link_v[e_of_row], i_of_row]
+        self.conservation_rows = add_block(
+            "conservation",
+            len(rows),
+            [rows[u_column >= 0], rows[v_column >= 0]],
+            [u_column[u_column >= 0], v_column[v_column >= 0]],
+            [
+                -np.ones(np.count_nonzero(u_column >= 0)),
+                np.ones(np.count_nonzero(v_column >= 0)),
+            ],
+            0,
+            0,
+        )
+        self._conservation_row = np.full((n_links, n_phy), -1)
+        self._conservation_row[e_of_row, i_of_row] = self.conservation_rows
+        # a single path leaves the physical node of u
+        self.leave = np.nonzero(self.placeable[self.link_u])
+        e_of_row, i_of_row = self.leave
+        rows = np.arange(len(e_of_row))
+        leave_rows = add_block(
+            "leave",
+            len(rows),
+            [rows],
+            [self._node_column[self.link_u[e_of_row], i_of_row]],
+            [-np.ones(len(rows))],
+            -np.inf,
+            0,
+        )
+        self._leave_row = np.full((n_links, n_phy), -1)
+        self._leave_row[e_of_row, i_of_row] = leave_rows
+        # rate of each physical interface, used in both directions
+        self.capacity_rows = add_block(
+            "capacity",
+            len(network.edge_ends),
+            [np.empty(0, dtype=np.int64)],
+            [np.empty(0, dtype=np.int64)],
+            [np.empty(0)],
+            -np.inf,
+            network.edge_rate,
+        )
+        if obj == "min_n_machines":
+            # a physical node is used if a virtual node requiring no resources is mapped on it
+            columns = node_var[
+                (req_cores[self.node_u] == 0) & (req_memory[self.node_u] == 0)
+            ]
+            rows = np.arange(len(columns))
+            add_block(
+                "usage",
+                len(rows),
+                [rows, rows],
+                [columns, self._usage_column[self.node_i[columns]]],
+                [-np.ones(len(rows)), np.ones(len(rows))],
+                0,
+                np.inf,
+            )
+            self._usage_nodes = columns
+            # the interchangeable physical nodes are used in order
+            first, second = (
+                np.array(self.symmetric_pairs, dtype=np.int64).reshape(-1, 2).T
+            )
+            rows = np.arange(len(self.symmetric_pairs))
+            add_block(
+                "symmetry",
+                len(rows),
+                [rows, rows],
+                [self._usage_column[first], self._usage_column[second]],
+                [np.ones(len(rows)), -np.ones(len(rows))],
+                0,
+                np.inf,
+            )
+
+        self._entries = [
+            (
+                np.concatenate([block[0] for block in blocks]),
+                np.concatenate([block[1] for block in blocks]),
+                np.concatenate([block[2] for block in blocks]),
+            )
+        ]
+        self.row_lower = np.concatenate([block[3] for block in blocks])
+        self.row_upper = np.concatenate([block[4] for block in blocks])
+        self.n_constraints = len(self.row_lower)
+
+        self._costs = [np.zeros(self.path_offset)]
+        if obj == "min_n_machines":
+            self._costs[0][n_node_vars:] = 1
+        self.n_variables = self.path_offset
+        # the flows on grouped interfaces can be split
+        self._path_integrality = 0 if physical.grouped_interfaces else 1
+
+        # (virtual link, slots) of each path variable, and the variable of each one
+        self.paths = []
+        self._path_column = {}
+        self._link_columns = [[] for _ in range(n_links)]
+        # (i, j) -> adjacency entry between the physical nodes, and the interface of largest rate of each entry
+        self._entry = {
+            (i, int(j)): k
+            for i in range(n_phy)
+            for k, j in zip(
+                range(network.indptr_view[i], network.indptr_view[i + 1]),
+                network.indices_view[
+                    network.indptr_view[i] : network.indptr_view[i + 1]
+                ],
+            )
+        }
+        self._widest = [
+            max(
+                range(network.iface_ptr_view[k], network.iface_ptr_view[k + 1]),
+                key=lambda s: (network.rate_view[s], -s),
+            )
+            for k in range(len(network.indices_view))
+        ]
+        self._graph = nx.Graph(list(self._entry))
+        # (i, j) -> k_paths shortest paths between them
+        self._candidates = {}
+        # cost of the artificial variables keeping the relaxation feasible, higher than any solution
+        self._penalty = 1 + (
+            len(self.hosts)
+            if obj == "min_n_machines"
+            else (self.link_rate.sum() * n_phy if obj == "min_bw" else 0)
+        )
+        self.lower_bound = None
+
+        self.constraint_names = self._constraint_names() if names else None
+        self.variable_names = self._node_names() if names else None
+        self._build()
+
+    def _node_names(self):
+        """Return the descriptive names of the node mapping and of the usage variables."""
+        phy_nodes = self.network.node_ids
+        names = [
+            f"node_mapping_{self.virtual_nodes[u]}_{phy_nodes[i]}"
+            for u, i in zip(self.node_u.tolist(), self.node_i.tolist())
+        ]
+        if self.obj == "min_n_machines":
+            names += [f"usage_{phy_nodes[i]}" for i in self.hosts.tolist()]
+        return [name.replace(" ", "_") for name in names]
+
+    def _constraint_names(self):
+        """Return the descriptive names of the constraints."""
+        network = self.network
+        phy_nodes = network.node_ids
+        links = self.virtual_links
+        per_kind = {
+            "assignment": lambda: (f"assignment_of_{u}" for u in self.virtual_nodes),
+            "cores": lambda: (f"cores_of_{phy_nodes[i]}" for i in self.hosts),
+            "memory": lambda: (f"memory_of_{phy_nodes[i]}" for i in self.hosts),
+            "conservation": lambda: (
+                f"conservation_{links[e][0]}_{links[e][1]}_on_{phy_nodes[i]}"
+                for e, i in zip(*self.conservation)
+            ),
+            "leave": lambda: (
+                f"leave_{links[e][0]}_{links[e][1]}_from_{phy_nodes[i]}"
+                for e, i in zip(*self.leave)
+            ),
+            "capacity": lambda: (
+                f"capacity_of_{i}_{j}_{device_id}"
+                for (i, j, device_id) in network.edge_ends
+            ),
+            "usage": lambda: (
+                f"usage_{self.virtual_nodes[self.node_u[n]]}_on_{phy_nodes[self.node_i[n]]}"
+                for n in self._usage_nodes
+            ),
+            "symmetry": lambda: (
+                f"symmetry_{phy_nodes[i]}_{phy_nodes[j]}"
+                for (i, j) in self.symmetric_pairs
+            ),
+        }
+        return [
+            name.replace(" ", "_")
+            for (kind, _) in self._row_kinds
+            for name in per_kind[kind]()
+        ]
+
+    def _build(self):
+        """Build A, c and integrality from the variables added so far."""
+        rows, cols, data = (np.concatenate(entries) for entries in zip(*self._entries))
+        self._entries = [(rows, cols, data)]
+        self.A = sp.csr_matrix(
+            (data, (rows, cols)), shape=(self.n_constraints, self.n_variables)
+        )
+        self.c = np.concatenate(self._costs)
+        self._costs = [self.c]
+        self.integrality = np.ones(self.n_variables, dtype=np.int8)
+        self.integrality[self.path_offset :] = self._path_integrality
+
+    def add_paths(self, paths):
+        """Add the variables of a list of (virtual link index, tuple of slots) paths, skipping the ones in the model.
+
+        Return the number of variables added.
+        """
+        network = self.network
+        rows, cols, data, costs = [], [], [], []
+        for e, slots in paths:
+            if (e, slots) in self._path_column:
+                continue
+            column = self.n_variables + len(costs)
+            i, j = network.iface_src_view[slots[0]], int(network.iface_dst[slots[-1]])
+            rate = self.link_rate[e]
+            path_rows = [
+                self._conservation_row[e, i],
+                self._conservation_row[e, j],
+                self._leave_row[e, i],
+            ]
+            path_data = [1, -1, 1]
+            if rate:
+                path_rows.extend(
+                    self.capacity_rows[network.iface_edge_view[s]] for s in slots
+                )
+                path_data.extend([rate] * len(slots))
+            rows.extend(path_rows)
+            cols.extend([column] * len(path_rows))
+            data.extend(path_data)
+            costs.append(rate * len(slots) if self.obj == "min_bw" else 0)
+
+            self._path_column[(e, slots)] = column
+            self._link_columns[e].append(column)
+            self.paths.append((e, slots))
+            if self.variable_names is not None:
+                u, v = self.virtual_links[e]
+                self.variable_names.append(
+                    f"path_mapping_{u}_{v}_{len(self._link_columns[e])}".replace(
+                        " ", "_"
+                    )
+                )
+        if costs:
+            self._entries.append(
+                (
+                    np.array(rows, dtype=np.int64),
+                    np.array(cols, dtype=np.int64),
+                    np.array(data, dtype=float),
+                )
+            )
+            self._costs.append(np.array(costs, dtype=float))
+            self.n_variables += len(costs)
+            self._build()
+        return len(costs)
+
+    def generate(self, timelimit=None, dive=True):
+        """Add the paths improving the linear relaxation until there is none or timelimit seconds have passed.
+
+        Return the number of relaxations solved. lower_bound is set to the optimum of the relaxation if no path
+        is left to add (a lower bound of the optimum of the integer model with all the paths), infeasible is set
+        if the relaxation has no solution.
+        If dive is True, the paths are then generated again fixing the virtual nodes one at a time, each time
+        the fractional mapping closest to 1 (and the usage of its physical node), until the mapping of the
+        relaxation is integer, so that the model holds the paths of at least an integer solution.
+        """
+        deadline = None if timelimit is None else time.perf_counter() + timelimit
+        self.lower_bound = None
+        rounds, result = self._generate(deadline)
+        if result is not None:
+            self.lower_bound = result.fun
+        n_node_vars = len(self.node_u)
+        fixed = np.zeros(n_node_vars, dtype=bool)
+        while dive and result is not None:
+            values = result.x[:n_node_vars]
+            fractional = (values > _TOLERANCE) & (values < 1 - _TOLERANCE)
+            if not fractional.any():
+                break
+            fixed |= values >= 1 - _TOLERANCE
+            fixed[np.argmax(np.where(fractional, values, -1))] = True
+            used = np.zeros(self.path_offset, dtype=bool)
+            used[:n_node_vars] = fixed
+            if self.obj == "min_n_machines":
+                used[self._usage_column[self.node_i[fixed]]] = True
+            more, result = self._generate(deadline, used)
+            rounds += more
+        return rounds
+
+    def _generate(self, deadline, fixed=None):
+        """Add the paths improving the relaxation with the node mapping and usage variables where fixed is True
+        fixed to 1 (none if None).
+
+        Return the number of relaxations solved and the scipy result of the last one, None if the time limit
+        expired or the relaxation routes no path for some virtual link.
+        """
+        rounds = 0
+        while True:
+            remaining = None if deadline is None else deadline - time.perf_counter()
+            if remaining is not None and remaining <= 0:
+                _log.info("time limit reached while generating the paths")
+                return rounds, None
+            result, duals = self._solve_relaxation(remaining, fixed)
+            rounds += 1
+            # 2 is infeasible for scipy.optimize.linprog
+            if result.status == 2 and fixed is None:
+                self.infeasible = True
+                return rounds, None
+            elif result.status != 0:
+                _log.info(f"the relaxation was not solved: {result.message}")
+                return rounds, None
+            if not self.add_paths(self._price(duals)):
+                if np.any(result.x[self.n_variables :] > _TOLERANCE):
+                    _log.info("the relaxation routes no path for some virtual link")
+                    return rounds, None
+                return rounds, result
+
+    def _solve_relaxation(self, timelimit, fixed=None):
+        """Solve the linear relaxation with HiGHS through scipy, with the variables where fixed is True fixed
+        to 1 (none if None), return the scipy result and the duals of the rows.
+
+        Artificial variables on the flow conservation, more expensive than any solution, keep it feasible
+        whatever the paths in the model.
+        """
+        from scipy.optimize import linprog
+
+        n_rows = len(self.conservation_rows)
+        artificial = sp.csr_matrix(
+            (
+                np.concatenate((np.ones(n_rows), -np.ones(n_rows))),
+                (
+                    np.tile(self.conservation_rows, 2),
+                    np.arange(2 * n_rows),
+                ),
+            ),
+            shape=(self.n_constraints, 2 * n_rows),
+        )
+        A = sp.hstack([self.A, artificial], format="csr")
+        c = np.concatenate((self.c, np.full(2 * n_rows, self._penalty)))
+        lower_bounds = np.zeros(len(c))
+        if fixed is not None:
+            lower_bounds[: len(fixed)] = fixed
+        equal = self.row_lower == self.row_upper
+        upper = ~equal & np.isinf(self.row_lower)
+        lower = ~equal & ~upper
+        result = linprog(
+            c,
+            A_ub=sp.vstack([A[upper], -A[lower]], format="csr"),
+            b_ub=np.concatenate((self.row_upper[upper], -self.row_lower[lower])),
+            A_eq=A[equal],
+            b_eq=self.row_lower[equal],
+            bounds=np.column_stack((lower_bounds, np.ones(len(c)))),
+            method="highs",
+            options={} if timelimit is None else {"time_limit": timelimit},
+        )
+        if result.status != 0:
+            return result, None
+        # the reduced cost of a variable is its cost minus the duals times its column
+        duals = np.zeros(self.n_constraints)
+        duals[equal] = result.eqlin.marginals
+        marginals = result.ineqlin.marginals
+        duals[upper] = marginals[: np.count_nonzero(upper)]
+        duals[lower] = -marginals[np.count_nonzero(upper) :]
+        return result, duals
+
+    def _price(self, duals):
+        """Return the paths with a negative reduced cost, as (virtual link index, tuple of slots).
+
+        The reduced cost of a path of e from i to j is rate(e) times the weight of its interfaces (their cost
+        and the dual of their rate), minus the duals of the conservation of e on i and j and of leaving i.
+        For each virtual link, the shortest path between the physical nodes i and j of least reduced cost
+        is returned, together with the k_paths shortest paths in hops between i and j.
+        """
+        network = self.network
+        n_links = len(self.virtual_links)
+        weight = np.maximum(-duals[self.capacity_rows], 0)
+        if self.obj == "min_bw":
+            weight += 1
+        slot_weight = weight[network.iface_edge]
+        # the interface of least weight of each adjacency entry, the first one if tied
+        entry_weight = np.minimum.reduceat(slot_weight, network.iface_ptr[:-1])
+        entry_of_slot = np.repeat(
+            np.arange(len(network.indices)), np.diff(network.iface_ptr)
+        )
+        cheapest = np.empty(len(network.indices), dtype=np.int64)
+        least = np.flatnonzero(slot_weight == entry_weight[entry_of_slot])[::-1]
+        cheapest[entry_of_slot[least]] = least
+        # a small weight for each hop breaks the ties by the number of hops
+        graph = sp.csr_matrix(
+            (entry_weight + 1e-9, network.indices, network.indptr),
+            shape=(network.n_nodes, network.n_nodes),
+        )
+        distance, predecessors = csgraph.dijkstra(
+            graph, indices=self.hosts, return_predecessors=True
+        )
+        distance = distance[:, self.hosts]
+
+        conservation = np.zeros((n_links, network.n_nodes))
+        conservation[self.conservation] = duals[self.conservation_rows]
+        leave = np.zeros((n_links, network.n_nodes))
+        leave[self.leave] = duals[self._leave_row[self.leave]]
+
+        def reduced_cost(e, slots):
+            i, j = network.iface_src_view[slots[0]], network.iface_dst[slots[-1]]
+            return (
+                self.link_rate[e] * slot_weight[list(slots)].sum()
+                - conservation[e, i]
+                - leave[e, i]
+                + conservation[e, j]
+            )
+
+        hosts = self.hosts
+        paths = []
+        for e in range(n_links):
+            rate = self.link_rate[e]
+            path_weight = (
+                rate * distance if rate else np.where(np.isinf(distance), np.inf, 0)
+            )
+            costs = (
+                path_weight
+                - (conservation[e, hosts] + leave[e, hosts])[:, None]
+                + conservation[e, hosts][None, :]
+            )
+            costs[~self.placeable[self.link_u[e], hosts]] = np.inf
+            costs[:, ~self.placeable[self.link_v[e], hosts]] = np.inf
+            np.fill_diagonal(costs, np.inf)
+            a, b = np.unravel_index(np.argmin(costs), costs.shape)
+            if costs[a, b] < -_TOLERANCE:
+                i, j = int(hosts[a]), int(hosts[b])
+                nodes = [j]
+                while nodes[-1] != i:
+                    nodes.append(int(predecessors[a, nodes[-1]]))
+                nodes.reverse()
+                shortest = tuple(
+                    int(cheapest[self._entry[(k, l)]]) for k, l in zip(nodes, nodes[1:])
+                )
+                for slots in [shortest, *self._shortest_paths(i, j)]:
+                    if (e, slots) not in self._path_column and reduced_cost(
+                        e, slots
+                    ) < -_TOLERANCE:
+                        paths.append((e, slots))
+        return list(dict.fromkeys(paths))
+
+    def _shortest_paths(self, i, j):
+        """Return the k_paths shortest paths in hops from the physical node i to j, on the interfaces
+        of largest rate.
+        """
+        if (i, j) not in self._candidates:
+            try:
+                paths = list(
+                    islice(nx.shortest_simple_paths(self._graph, i, j), self.k_paths)
+                )
+            except nx.NetworkXNoPath:
+                paths = []
+            self._candidates[(i, j)] = [
+                tuple(self._widest[self._entry[(k, l)]] for k, l in zip(path, path[1:]))
+                for path in paths
+            ]
+        return self._candidates[(i, j)]
+
+    def _solution_paths(self, solution):
+        """Return the physical node of each virtual node in an embedding solution, and its paths as
+        (virtual link index, tuple of slots, share of the rate), relabelled as required by the symmetry breaking.
+        """
+        network = self.network
+        node_of, slot_of = self._relabelling(solution)
+        # (i, j, interface name on the i side) -> slot, grouped interfaces have no name
+        slots = {
+            (i, j, network.iface_name[s]): s
+            for s, (i, j, device_id) in enumerate(network.slot_view)
+        }
+        hosts = [
+            int(node_of[network.index[solution.node_info(u)]])
+            for u in self.virtual_nodes
+        ]
+        paths = []
+        for e, (u, v) in enumerate(self.virtual_links):
+            for path in solution.path_info((u, v)):
+                if not path.path:
+                    continue
+                path_slots = tuple(
+                    int(
+                        slot_of[
+                            slots[
+                                (
+                                    i,
+                                    j,
+                                    (
+                                        None
+                                        if self.physical.grouped_interfaces
+                                        else i_device
+                                    ),
+                                )
+                            ]
+                        ]
+                    )
+                    for (i, i_device, j_device, j) in path.path
+                )
+                paths.append((e, path_slots, path.f_rate))
+        return hosts, paths
+
+    def add_solution(self, solution):
+        """Add the paths of an embedding solution, e.g., found by a heuristic, so that it is a solution of the model."""
+        _, paths = self._solution_paths(solution)
+        return self.add_paths([(e, slots) for e, slots, _ in paths])
+
+    def initial_values(self, solution):
+        """Return the values of the variables corresponding to an embedding solution, or None if the solution uses
+        variables not in the model (see add_solution).
+        """
+        hosts, paths = self._solution_paths(solution)
+        values = np.zeros(self.n_variables)
+        for n, i in enumerate(hosts):
+            if self._node_column[n, i] < 0:
+                _log.warning("the initial solution uses variables not in the model")
+                return None
+            values[self._node_column[n, i]] = 1
+            if self.obj == "min_n_machines":
+                values[self._usage_column[i]] = 1
+        for e, slots, f_rate in paths:
+            if (e, slots) not in self._path_column:
+                _log.warning("the initial solution uses paths not in the model")
+                return None
+            values[self._path_column[(e, slots)]] += f_rate
+        return values
+
+    def node_mapping(self, x):
+        """Return a dict mapping each virtual node to its physical node in the solution x."""
+        x = np.asarray(x)
+        node_ids = self.network.node_ids
+        return {
+            u: node_ids[self.node_i[columns[np.argmax(x[columns])]]]
+            for u, columns in zip(self.virtual_nodes, self._node_columns)
+        }
+
+    def link_mapping(self, x, node_mapping):
+        """Return a dict mapping each virtual link between distinct physical nodes to its path in the solution x,
+        as a list of (i, device_id, j).
+
+        If the flow of a virtual link is split, the path carrying its largest part is returned.
+        """
+        x = np.asarray(x)
+        network = self.network
+        res_link_mapping = {}
+        for e, (u, v) in enumerate(self.virtual_links):
+            source, target = (
+                network.index[node_mapping[u]],
+                network.index[node_mapping[v]],
+            )
+            if source == target:
+                continue
+            columns = [
+                column
+                for column in self._link_columns[e]
+                if network.iface_src_view[self.paths[column - self.path_offset][1][0]]
+                == source
+                and network.iface_dst[self.paths[column - self.path_offset][1][-1]]
+                == target
+            ]
+            if not columns or x[max(columns, key=x.__getitem__)] <= 1e-6:
+                _log.warning(f"no path for the virtual link {u, v} in the solution")
+                res_link_mapping[(u, v)] = []
+                continue
+            _, slots = self.paths[max(columns, key=x.__getitem__) - self.path_offset]
+            res_link_mapping[(u, v)] = [
+                (i, device_id, j)
+                for (i, j, device_id) in (network.slot_view[s] for s in slots)
+            ]
+        return res_link_mapping
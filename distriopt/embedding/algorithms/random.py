@@ -1,10 +1,10 @@
 import logging
 import random
-from collections import defaultdict
 
 from distriopt.constants import *
 from distriopt.decorators import timeit
 from distriopt.embedding import EmbedSolver
+from distriopt.embedding.residual import ResidualCapacity
 from distriopt.embedding.solution import Solution
 
 _log = logging.getLogger(__name__)
@@ -18,11 +18,12 @@ class RandomSelection(EmbedSolver):
 
         compute_nodes = sorted(list(self.physical.compute_nodes))
 
+        # resources available on the physical network, restored after each unfeasible try
+        residual = ResidualCapacity(self.physical)
+
         while True:
             try:
                 res_node_mapping = {}
-                cores_used = defaultdict(int)
-                memory_used = defaultdict(int)
 
                 # random virtual node to physical node assignment
                 for virtual_node, phy_node in zip(
@@ -30,16 +31,13 @@ class RandomSelection(EmbedSolver):
                     my_random.choices(compute_nodes, k=self.virtual.number_of_nodes()),
                 ):
                     res_node_mapping[virtual_node] = phy_node
-                    cores_used[phy_node] += self.virtual.req_cores(virtual_node)
-                    memory_used[phy_node] += self.virtual.req_memory(virtual_node)
-
-                    if cores_used[phy_node] > self.physical.cores(
-                        phy_node
-                    ) or memory_used[phy_node] > self.physical.memory(phy_node):
-                        raise NodeResourceError
+                    residual.reserve_node(
+                        phy_node,
+                        self.virtual.req_cores(virtual_node),
+                        self.virtual.req_memory(virtual_node),
+                    )
 
                 res_link_mapping = {}
-                rate_used = defaultdict(int)
                 # link mapping
                 # iterate over each virtual link between two virtual nodes not mapped on the same physical machine
                 for (u, v) in (
@@ -53,47 +51,45 @@ class RandomSelection(EmbedSolver):
                     # physical nodes on which u and v have been placed
                     phy_u, phy_v = res_node_mapping[u], res_node_mapping[v]
 
-                    next_node = phy_u
                     # for each link in the physical path
-                    for (i, j) in self.physical.find_path(phy_u, phy_v):
+                    for (i, j, _) in self.physical.find_path(
+                        phy_u,
+                        phy_v,
+                        req_rate=self.virtual.req_rate(u, v),
+                        residual=residual,
+                        stats=self.stats,
+                    ):
 
                         # get an interface_name with enough available rate
                         feasible_interfaces_ids = [
                             interface_id
                             for interface_id in self.physical.interfaces_ids(i, j)
-                            if self.physical.rate(i, j, interface_id)
-                            - rate_used[(i, j, interface_id)]
+                            if residual.rate(i, j, interface_id)
                             >= self.virtual.req_rate(u, v)
                         ]
+                        chosen_interface_id = my_random.choice(feasible_interfaces_ids)
 
-                        if not feasible_interfaces_ids:
-                            raise LinkCapacityError
-                        else:
-                            chosen_interface_id = my_random.choice(
-                                feasible_interfaces_ids
-                            )
-
-                        # else update the rate
-                        rate_used[(i, j, chosen_interface_id)] += self.virtual.req_rate(
-                            u, v
+                        # reserve the rate on the chosen interface
+                        residual.reserve_path(
+                            [(i, j, chosen_interface_id)], self.virtual.req_rate(u, v)
                         )
 
-                        res_link_mapping[(u, v)].append(
-                            (i, chosen_interface_id, j)
-                            if i == next_node
-                            else (j, chosen_interface_id, i)
-                        )
-                        next_node = j if i == next_node else i
+                        res_link_mapping[(u, v)].append((i, chosen_interface_id, j))
 
                 # build solution from the output
                 self.solution = Solution.build_solution(
-                    self.virtual, self.physical, res_node_mapping, res_link_mapping
+                    self.virtual,
+                    self.physical,
+                    res_node_mapping,
+                    res_link_mapping,
+                    stats=self.stats,
                 )
                 self.status = Solved
                 return Solved
 
-            except (NodeResourceError, LinkCapacityError):
-                pass
+            except (NodeResourceError, LinkCapacityError, NoPathFoundError):
+                residual.rollback()
+                self.stats.count("retries")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,159 @@
+"""
+Assignment of the partitions of the virtual nodes to physical nodes, shared by the partition-based heuristics.
+
+An assignment is a function method(virtual, physical, partitions, hosts) returning a list of
+(physical node, partition) pairs, each partition paired with a different host.
+"""
+import logging
+import weakref
+from collections import defaultdict, deque
+
+_log = logging.getLogger(__name__)
+
+# compiled network -> physical node -> number of hops to each physical node, a network never changes
+_hop_distances = weakref.WeakKeyDictionary()
+
+
+def in_order(virtual, physical, partitions, hosts):
+    """The i-th partition goes to the i-th host."""
+    return list(zip(hosts, partitions))
+
+
+def _demands(virtual, partitions):
+    """Return the cores and the memory required by each partition."""
+    return [
+        (
+            sum(virtual.req_cores(u) for u in part),
+            sum(virtual.req_memory(u) for u in part),
+        )
+        for part in partitions
+    ]
+
+
+def _shares(physical, hosts, demands):
+    """Return the largest share of the resources of the biggest host used by each partition."""
+    max_cores = max(physical.cores(host) for host in hosts)
+    max_memory = max(physical.memory(host) for host in hosts)
+    return [max(cores / max_cores, memory / max_memory) for cores, memory in demands]
+
+
+def hop_distances(physical, sources):
+    """Return a dict mapping each source to a dict with the number of hops to each physical node."""
+    network = physical.compile()
+    distances = _hop_distances.setdefault(network, {})
+    for source in sources:
+        if source in distances:
+            continue
+        # breadth first visit on the compiled network
+        dist = [None] * network.n_nodes
+        dist[network.index[source]] = 0
+        queue = deque([network.index[source]])
+        while queue:
+            i = queue.popleft()
+            for j in network.indices_view[
+                network.indptr_view[i] : network.indptr_view[i + 1]
+            ]:
+                if dist[j] is None:
+                    dist[j] = dist[i] + 1
+                    queue.append(j)
+        distances[source] = {
+            network.node_ids[i]: d for i, d in enumerate(dist) if d is not None
+        }
+    return {source: distances[source] for source in sources}
+
+
+def by_capacity(virtual, physical, partitions, hosts):
+    """The partition requiring the most resources first goes to the smallest host it fits in.
+
+    If it fits in no host left, it goes to the biggest one (the mapping is then unfeasible).
+    """
+    return _assign(virtual, physical, partitions, hosts)
+
+
+def by_traffic(virtual, physical, partitions, hosts):
+    """Like by_capacity, but after the first partition, the one exchanging the most traffic with the partitions
+    already assigned goes next, to the host it fits in closest (in hops) to their hosts.
+
+    The cost of a host is the rate between the partition and each partition already assigned, times
+    the number of hops between their hosts, so that coupled partitions share the same switch.
+    """
+    part_of = {u: p for p, part in enumerate(partitions) for u in part}
+    # partition -> partition -> rate of the virtual links between them
+    traffic = defaultdict(lambda: defaultdict(int))
+    for (u, v) in virtual.edges():
+        p, q = part_of[u], part_of[v]
+        if p != q:
+            rate = virtual.req_rate(u, v)
+            traffic[p][q] += rate
+            traffic[q][p] += rate
+    if not traffic:
+        return _assign(virtual, physical, partitions, hosts)
+    return _assign(
+        virtual, physical, partitions, hosts, traffic, hop_distances(physical, hosts)
+    )
+
+
+def _assign(virtual, physical, partitions, hosts, traffic=None, distances=None):
+    """Assign each partition to the host minimizing (cost, size) among the ones it fits in.
+
+    Partitions are taken by decreasing (traffic towards the partitions already assigned, share of the resources),
+    the cost of a host is the traffic times the hops towards the hosts of the partitions already assigned.
+    """
+    demands = _demands(virtual, partitions)
+    shares = _shares(physical, hosts, demands)
+    capacity = {host: (physical.cores(host), physical.memory(host)) for host in hosts}
+    # same order of the hosts as the solvers
+    size = {host: cores * 1000 + memory for host, (cores, memory) in capacity.items()}
+    free_hosts = list(hosts)
+    # partition -> host
+    host_of = {}
+    # partition not assigned yet -> rate towards the partitions already assigned
+    coupling = {p: 0 for p in range(len(partitions))}
+    while coupling and free_hosts:
+        p = max(coupling, key=lambda p: (coupling[p], shares[p]))
+        del coupling[p]
+
+        def cost(host):
+            if traffic is None:
+                return 0
+            return sum(
+                rate * distances[host].get(host_of[q], len(distances[host]))
+                for q, rate in traffic[p].items()
+                if q in host_of
+            )
+
+        candidates = [
+            host
+            for host in free_hosts
+            if demands[p][0] <= capacity[host][0] and demands[p][1] <= capacity[host][1]
+        ]
+        if candidates:
+            host = min(candidates, key=lambda host: (cost(host), size[host]))
+        else:
+            host = max(free_hosts, key=size.__getitem__)
+        free_hosts.remove(host)
+        host_of[p] = host
+        if traffic is not None:
+            for q, rate in traffic[p].items():
+                if q in coupling:
+                    coupling[q] += rate
+    return [(host_of[p], partitions[p]) for p in sorted(host_of)]
+
+
+ASSIGNMENTS = {
+    "in_order": in_order,
+    "capacity": by_capacity,
+    "traffic": by_traffic,
+}
+
+
+def assign_partitions(virtual, physical, partitions, hosts, assignment="traffic"):
+    """Return a list of (physical node, partition) pairs, pairing the partitions with distinct hosts.
+
+    assignment is either a key of ASSIGNMENTS or a function with the same arguments.
+    """
+    partitions = list(partitions)
+    method = ASSIGNMENTS.get(assignment, assignment)
+    if not callable(method):
+        raise ValueError("undefined assignment")
+    return method(virtual, physical, partitions, hosts)
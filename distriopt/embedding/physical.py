@@ -1,14 +1,135 @@
+import hashlib
 import json
 import logging
 import os
 
 import networkx as nx
+import numpy as np
 
+from distriopt.cache import cache_path, dump_cached, load_cached
 from distriopt.constants import NoPathFoundError
-from distriopt.decorators import cached, cachedproperty, implemented_if_true
+from distriopt.decorators import cachedproperty, implemented_if_true
+from distriopt.embedding.routing import residual_from_used_rate, shortest_path
 
 _log = logging.getLogger(__name__)
 
+# to be increased whenever the pickled layout of PhysicalNetwork or CompiledNetwork changes
+_CACHE_VERSION = 1
+
+
+def _cache_file(contents, n_interfaces_to_consider, group_interfaces):
+    """Return the path of the cached network for the given files content and parameters."""
+    h = hashlib.sha256()
+    for content in contents:
+        h.update(hashlib.sha256(content).digest())
+    h.update(f"{_CACHE_VERSION}|{n_interfaces_to_consider}|{group_interfaces}".encode())
+    return cache_path("physical", h.hexdigest())
+
+
+class CompiledNetwork(object):
+    """Array-backed form of a physical network.
+
+    Node ids are interned to the integers 0..n_nodes-1 (in the order of g.nodes()) and:
+    - cores and memory are stored in arrays indexed by node index;
+    - the adjacency is stored in CSR form: the neighbors of node i are indices[indptr[i]:indptr[i+1]];
+    - each adjacency entry k (a pair i->j) owns the interface slots iface_ptr[k]:iface_ptr[k+1],
+      and for each slot the endpoints, the device id, the rate, the interface name on the i side
+      and the id of the undirected physical interface (shared by i->j and j->i) are stored.
+    """
+
+    def __init__(self, g):
+        self.node_ids = np.empty(g.number_of_nodes(), dtype=object)
+        self.node_ids[:] = list(g.nodes())
+        self.index = {u: idx for idx, u in enumerate(self.node_ids)}
+        self.n_nodes = len(self.node_ids)
+
+        self.cores = np.array([g.nodes[u].get("cores", 0) for u in self.node_ids])
+        self.memory = np.array([g.nodes[u].get("memory", 0) for u in self.node_ids])
+
+        indptr, indices, iface_ptr = [0], [], [0]
+        iface_key, iface_rate, iface_name, iface_edge = [], [], [], []
+        iface_src, iface_dst = [], []
+        # (i, j) -> adjacency entry, (i, j, device_id) -> interface slot
+        self.adjacency = {}
+        self.slot = {}
+        # (i, j, device_id) -> undirected interface id
+        edge_index = {}
+        self.edge_ends = []
+
+        for u in self.node_ids:
+            for v, interfaces in g[u].items():
+                self.adjacency[(u, v)] = len(indices)
+                indices.append(self.index[v])
+                for device_id, attrs in interfaces.items():
+                    self.slot[(u, v, device_id)] = len(iface_key)
+                    iface_key.append(device_id)
+                    iface_src.append(self.index[u])
+                    iface_dst.append(self.index[v])
+                    iface_rate.append(attrs["rate"])
+                    iface_name.append(
+                        attrs["devices"][u] if "devices" in attrs else None
+                    )
+                    if (v, u, device_id) in edge_index:
+                        iface_edge.append(edge_index[(v, u, device_id)])
+                    else:
+                        edge_index[(u, v, device_id)] = len(self.edge_ends)
+                        iface_edge.append(len(self.edge_ends))
+                        self.edge_ends.append((u, v, device_id))
+                iface_ptr.append(len(iface_key))
+            indptr.append(len(indices))
+
+        self.indptr = np.array(indptr, dtype=np.int64)
+        self.indices = np.array(indices, dtype=np.int64)
+        self.iface_ptr = np.array(iface_ptr, dtype=np.int64)
+        self.iface_key = np.empty(len(iface_key), dtype=object)
+        self.iface_key[:] = iface_key
+        self.iface_rate = np.array(iface_rate)
+        self.iface_name = np.empty(len(iface_name), dtype=object)
+        self.iface_name[:] = iface_name
+        self.iface_edge = np.array(iface_edge, dtype=np.int64)
+        self.iface_src = np.array(iface_src, dtype=np.int64)
+        self.iface_dst = np.array(iface_dst, dtype=np.int64)
+
+        # rate of each undirected interface
+        self.edge_rate = np.zeros(len(self.edge_ends), dtype=self.iface_rate.dtype)
+        self.edge_rate[self.iface_edge] = self.iface_rate
+        # total rate supported by the interfaces of each node
+        node_slots = self.iface_ptr[self.indptr]
+        cumulative_rate = np.concatenate(([0], np.cumsum(self.iface_rate)))
+        self.rate_out = (
+            cumulative_rate[node_slots[1:]] - cumulative_rate[node_slots[:-1]]
+        )
+
+        # plain Python views of the tables for the scalar accessors of PhysicalNetwork,
+        # indexing a NumPy array from Python code boxes each value and is several times slower
+        self.cores_view = self.cores.tolist()
+        self.memory_view = self.memory.tolist()
+        self.rate_view = self.iface_rate.tolist()
+        self.rate_out_view = self.rate_out.tolist()
+        self.neighbors_view = [
+            tuple(self.node_ids[self.neighbors(idx)]) for idx in range(self.n_nodes)
+        ]
+        self.interfaces_view = [
+            tuple(self.iface_key[start:end])
+            for start, end in zip(self.iface_ptr[:-1], self.iface_ptr[1:])
+        ]
+        # views used by the routing engine
+        self.indptr_view = self.indptr.tolist()
+        self.indices_view = self.indices.tolist()
+        self.iface_ptr_view = self.iface_ptr.tolist()
+        self.iface_src_view = self.iface_src.tolist()
+        self.iface_edge_view = self.iface_edge.tolist()
+        # adjacency entry j->i for each entry i->j (adjacency is filled in entry order)
+        self.reverse_view = [self.adjacency[(j, i)] for (i, j) in self.adjacency]
+        # (i, j, device_id) for each interface slot
+        self.slot_view = list(
+            zip(self.node_ids[self.iface_src], self.node_ids[self.iface_dst], iface_key)
+        )
+
+    def neighbors(self, idx):
+        """Return the indices of the neighbors of the node with index idx."""
+        return self.indices[self.indptr[idx] : self.indptr[idx + 1]]
+
 
 class PhysicalNetwork(object):
     "Utility class to model the physical network. Uses networkx.MultiGraph."
@@ -16,15 +137,26 @@ class PhysicalNetwork(object):
     def __init__(self, g, grouped_interfaces=False):
         self._g = g
         self.grouped_interfaces = grouped_interfaces
+        self._compiled = None
 
     @property
     def g(self):
         return self._g
 
+    def compile(self):
+        """Return the array-backed form of the network, it is built on the first call.
+
+        The graph is frozen, so the compiled form never needs to be rebuilt.
+        """
+        if self._compiled is None:
+            self._compiled = CompiledNetwork(self._g)
+        return self._compiled
+
     @cachedproperty
     def compute_nodes(self):
         """Physical nodes able to run virtual nodes."""
-        return set(u for u in self.nodes() if self.cores(u) > 0 and self.memory(u) > 0)
+        c = self.compile()
+        return set(c.node_ids[(c.cores > 0) & (c.memory > 0)])
 
     def edges(self, keys=False):
         """Return the edges of the graph."""
@@ -36,36 +168,38 @@ class PhysicalNetwork(object):
 
     def cores(self, node):
         """Return the number of physical cores for a physical node."""
-        return self._g.node[node].get("cores", 0)
+        c = self.compile()
+        return c.cores_view[c.index[node]]
 
     def memory(self, node):
         """Return the amount of memory for a physical node."""
-        return self._g.node[node].get("memory", 0)
+        c = self.compile()
+        return c.memory_view[c.index[node]]
 
     def rate(self, i, j, device_id="dummy"):
         """Return the rate associated to a physical link and interface id."""
-        return self._g[i][j][device_id]["rate"]
+        c = self.compile()
+        return c.rate_view[c.slot[(i, j, device_id)]]
 
-    @cached
     def rate_out(self, i):
         """Return the total rate supported by the node interface(s)."""
-        return sum(
-            self.rate(i, j, device_id)
-            for j in self.neighbors(i)
-            for device_id in self.interfaces_ids(i, j)
-        )
+        c = self.compile()
+        return c.rate_out_view[c.index[i]]
 
     def interfaces_ids(self, i, j):
         """Return the network interfaces identifiers for a link (i,j)."""
-        return self._g[i][j]
+        c = self.compile()
+        return c.interfaces_view[c.adjacency[(i, j)]]
 
     def interface_name(self, i, j, device_id):
         """Return the network interfaces *from i to j* (order matters) corresponding to a device id."""
-        return self._g[i][j][device_id]["devices"][i]
+        c = self.compile()
+        return c.iface_name[c.slot[(i, j, device_id)]]
 
     def neighbors(self, i):
         """Return the neighbor nodes for a node i."""
-        return self._g[i]
+        c = self.compile()
+        return c.neighbors_view[c.index[i]]
 
     @implemented_if_true("grouped_interfaces")
     def associated_nw_interfaces(self, i, j):
@@ -86,54 +220,42 @@ class PhysicalNetwork(object):
     def number_of_nodes(self):
         return self._g.number_of_nodes()
 
-    def find_path(self, source, target, req_rate=0, used_rate={}):
-        """Given the physical network, return the path between the source and the target nodes."""
-
-        path = [source]
-        interfaces_used = [None]
-
-        stack = [(u for u in self.neighbors(source))]
-
-        while stack:
-            prev = path[-1]
-            curr = next(stack[-1], None)
-            # if generator has not been exhausted
-            # take the first device which can support the requested rate
-            if curr is None:
-                stack.pop()
-                path.pop()
-                interfaces_used.pop()
-            else:
-                device_id = next(
-                    (
-                        device_id
-                        for device_id in self.interfaces_ids(prev, curr)
-                        if self.rate(prev, curr, device_id)
-                        >= req_rate
-                        + used_rate.get((prev, curr, device_id), 0)
-                        + used_rate.get((curr, prev, device_id), 0)
-                    ),
-                    None,
-                )
-
-                if device_id is not None:
-                    if curr == target:
-                        interfaces_used.append(device_id)
-                        path.append(target)
-                        # return a path as a list (i, j, device_id)
-                        res = [
-                            (path[i], path[i + 1], device_id)
-                            for (i, device_id) in zip(
-                                range(len(path) - 1), interfaces_used[1:]
-                            )
-                        ]
-                        return res
-                    elif curr not in path:
-                        interfaces_used.append(device_id)
-                        path.append(curr)
-                        stack.append((u for u in self.neighbors(curr)))
+    def find_path(
+        self,
+        source,
+        target,
+        req_rate=0,
+        used_rate=None,
+        metric="hops",
+        residual=None,
+        stats=None,
+    ):
+        """Given the physical network, return the path between the source and the target nodes.
+
+        The path is computed on the residual network, i.e., only the interfaces with at least req_rate
+        available are considered. The available rate is read from residual (a ResidualCapacity) if given,
+        otherwise it is computed from the rate already used (used_rate, in both directions).
+        Among the shortest paths according to the metric (see routing.METRICS) the widest one is returned,
+        as a list (i, j, device_id).
+        If given, the calls and the nodes expanded by the search are counted in stats (a SolveStats).
+        """
+        c = self.compile()
+        if residual is None:
+            available = residual_from_used_rate(c, used_rate)
         else:
+            available = residual.slot_rate
+        path = shortest_path(
+            c,
+            c.index[source],
+            c.index[target],
+            req_rate=req_rate,
+            residual=available,
+            metric=metric,
+            stats=stats,
+        )
+        if path is None:
             raise NoPathFoundError
+        return [c.slot_view[slot] for slot in path]
 
     @classmethod
     def from_mininet(
@@ -188,82 +310,109 @@ class PhysicalNetwork(object):
 
     @classmethod
     def from_files(
-        cls, *filenames, n_interfaces_to_consider=float("inf"), group_interfaces=False
+        cls,
+        *filenames,
+        n_interfaces_to_consider=float("inf"),
+        group_interfaces=False,
+        cache=True,
     ):
-        """Create a PhysicalNetwork from json files."""
+        """Create a PhysicalNetwork from json files.
 
-        g = nx.MultiGraph()
+        If cache is True and the DISTRIOPT_CACHE_DIR environment variable gives a directory, the network
+        is also stored there, compiled, and loaded from there by the next calls with the same files content
+        and parameters. Without it nothing is written to disk.
+        """
 
+        contents = []
         for filename in filenames:
             with open(
                 os.path.join(
                     os.path.dirname(os.path.abspath(__file__)),
                     "instances",
                     filename + ".json",
-                )
+                ),
+                "rb",
             ) as f:
+                contents.append(f.read())
 
-                data = json.load(f)
+        cache_file = (
+            _cache_file(contents, n_interfaces_to_consider, group_interfaces)
+            if cache
+            else None
+        )
+        if cache_file is not None:
+            physical = load_cached(cache_file)
+            if physical is not None:
+                return physical
 
-                for node_info in data["nodes"]:
-                    g.add_node(
-                        node_info["id"],
-                        cores=node_info.get("cores", 0),
-                        memory=node_info.get("memory", 0),
-                    )
+        g = nx.MultiGraph()
 
-                for link_info in data["links"]:
-                    u, v, devices = (
-                        link_info["source"],
-                        link_info["target"],
-                        link_info["devices"],
+        for content in contents:
+            data = json.loads(content)
+
+            for node_info in data["nodes"]:
+                g.add_node(
+                    node_info["id"],
+                    cores=node_info.get("cores", 0),
+                    memory=node_info.get("memory", 0),
+                )
+
+            for link_info in data["links"]:
+                u, v, devices = (
+                    link_info["source"],
+                    link_info["target"],
+                    link_info["devices"],
+                )
+
+                n_added_interfaces = 0
+                for device in devices:
+                    source_device, target_device, rate = (
+                        device["source_device"],
+                        device["target_device"],
+                        device["rate"],
                     )
 
-                    n_added_interfaces = 0
-                    for device in devices:
-                        source_device, target_device, rate = (
-                            device["source_device"],
-                            device["target_device"],
-                            device["rate"],
+                    if not group_interfaces:
+                        g.add_edge(
+                            u,
+                            v,
+                            rate=rate,
+                            devices={u: source_device, v: target_device},
                         )
-
-                        if not group_interfaces:
+                    else:
+                        if not g.has_edge(u, v):
                             g.add_edge(
                                 u,
                                 v,
+                                key="dummy",
                                 rate=rate,
-                                devices={u: source_device, v: target_device},
+                                associated_devices={
+                                    n_added_interfaces: {
+                                        u: source_device,
+                                        v: target_device,
+                                        "rate": rate,
+                                    }
+                                },
                             )
                         else:
-                            if not g.has_edge(u, v):
-                                g.add_edge(
-                                    u,
-                                    v,
-                                    key="dummy",
-                                    rate=rate,
-                                    associated_devices={
-                                        n_added_interfaces: {
-                                            u: source_device,
-                                            v: target_device,
-                                            "rate": rate,
-                                        }
-                                    },
-                                )
-                            else:
-                                g[u][v]["dummy"]["rate"] += rate
-                                g[u][v]["dummy"]["associated_devices"][
-                                    n_added_interfaces
-                                ] = {u: source_device, v: target_device, "rate": rate}
-
-                        n_added_interfaces += 1
-                        if n_added_interfaces == n_interfaces_to_consider:
-                            break
+                            g[u][v]["dummy"]["rate"] += rate
+                            g[u][v]["dummy"]["associated_devices"][
+                                n_added_interfaces
+                            ] = {u: source_device, v: target_device, "rate": rate}
+
+                    n_added_interfaces += 1
+                    if n_added_interfaces == n_interfaces_to_consider:
+                        break
 
         # @TODO add support for disconnected physical networks
         if not nx.is_connected(g):
             raise ValueError("Physical Network is not connected")
 
-        return cls(nx.freeze(g), group_interfaces)
+        physical = cls(nx.freeze(g), group_interfaces)
+        if cache_file is not None:
+            physical.compile()
+            dump_cached(cache_file, physical)
+        return physical
 
     @classmethod
     def create_test_nw(cls, cores=4, memory=4000, rate=10000, group_interfaces=False):
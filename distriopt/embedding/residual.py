@@ -0,0 +1,115 @@
+"""
+Residual capacity of a physical network while virtual nodes and links are being mapped.
+"""
+import logging
+
+from distriopt.constants import LinkCapacityError, NodeResourceError
+
+_log = logging.getLogger(__name__)
+
+
+class ResidualCapacity(object):
+    """Ledger of the cores, memory and per-interface rate still available on a physical network.
+
+    Each reservation or release costs O(1) per node or interface and is recorded in an undo log:
+    savepoint() marks the current state, rollback(savepoint) undoes everything done after it
+    and commit() makes the current reservations permanent by discarding the log.
+
+    Examples
+    --------
+    >>> residual = ResidualCapacity(physical)
+    >>> savepoint = residual.savepoint()
+    >>> try:
+    ...     residual.reserve_node("grisou-1", cores=4, memory=8000)
+    ...     residual.reserve_path(physical.find_path("grisou-1", "grisou-2", req_rate=200, residual=residual), 200)
+    ... except (NodeResourceError, LinkCapacityError, NoPathFoundError):
+    ...     residual.rollback(savepoint)
+    """
+
+    def __init__(self, physical):
+        self._network = physical.compile()
+        self._cores = self._network.cores.tolist()
+        self._memory = self._network.memory.tolist()
+        # rate available on each undirected interface, shared by both directions
+        self._rate = self._network.edge_rate.tolist()
+        self._log = []
+
+    def cores(self, node):
+        """Return the number of cores still available on a physical node."""
+        return self._cores[self._network.index[node]]
+
+    def memory(self, node):
+        """Return the amount of memory still available on a physical node."""
+        return self._memory[self._network.index[node]]
+
+    def rate(self, i, j, device_id="dummy"):
+        """Return the rate still available on a physical interface."""
+        return self.slot_rate(self._network.slot[(i, j, device_id)])
+
+    def slot_rate(self, slot):
+        """Return the rate still available on an interface slot of the compiled network."""
+        return self._rate[self._network.iface_edge_view[slot]]
+
+    def reserve_node(self, node, cores, memory):
+        """Reserve cores and memory on a physical node, raise NodeResourceError if they are not available."""
+        idx = self._network.index[node]
+        if cores > self._cores[idx]:
+            raise NodeResourceError(node, "cpu cores", cores, self._cores[idx])
+        if memory > self._memory[idx]:
+            raise NodeResourceError(node, "memory", memory, self._memory[idx])
+        self._update_node(idx, -cores, -memory)
+
+    def release_node(self, node, cores, memory):
+        """Give back cores and memory to a physical node."""
+        self._update_node(self._network.index[node], cores, memory)
+
+    def reserve_path(self, path, rate):
+        """Reserve rate on every interface of a path (i, j, device_id), raise LinkCapacityError if not available.
+
+        Either the whole path or nothing is reserved.
+        """
+        edges = self._edges(path)
+        for edge in edges:
+            if rate > self._rate[edge]:
+                raise LinkCapacityError(
+                    f"Capacity exceeded on {self._network.edge_ends[edge]}"
+                )
+        for edge in edges:
+            self._update_rate(edge, -rate)
+
+    def release_path(self, path, rate):
+        """Give back rate to every interface of a path (i, j, device_id)."""
+        for edge in self._edges(path):
+            self._update_rate(edge, rate)
+
+    def savepoint(self):
+        """Return a marker of the current state, to be passed to rollback."""
+        return len(self._log)
+
+    def rollback(self, savepoint=0):
+        """Undo all the reservations and releases done after the savepoint."""
+        log = self._log
+        while len(log) > savepoint:
+            kind, idx, first, second = log.pop()
+            if kind == "node":
+                self._cores[idx] -= first
+                self._memory[idx] -= second
+            else:
+                self._rate[idx] -= first
+
+    def commit(self):
+        """Make the current state permanent, previous savepoints are no longer valid."""
+        self._log.clear()
+
+    def _edges(self, path):
+        slot, iface_edge = self._network.slot, self._network.iface_edge_view
+        return [iface_edge[slot[(i, j, device_id)]] for (i, j, device_id) in path]
+
+    def _update_node(self, idx, cores, memory):
+        self._cores[idx] += cores
+        self._memory[idx] += memory
+        self._log.append(("node", idx, cores, memory))
+
+    def _update_rate(self, edge, rate):
+        self._rate[edge] += rate
+        self._log.append(("rate", edge, rate, None))
@@ -0,0 +1,367 @@
+"""
+Routing of virtual links on the residual physical network.
+
+The functions work on the compiled form of a PhysicalNetwork (see PhysicalNetwork.compile),
+where nodes are identified by their index and each interface of a link i->j by a slot.
+"""
+
+import heapq
+import logging
+import math
+
+from distriopt.constants import NoPathFoundError
+from distriopt.stats import NO_STATS
+
+_log = logging.getLogger(__name__)
+
+
+def hops(rate, residual):
+    """Each link has unit cost, the path with the fewest hops is the shortest."""
+    return 1
+
+
+def inverse_capacity(rate, residual):
+    """OSPF-like cost, links with a higher rate are cheaper."""
+    return 1.0 / rate
+
+
+def utilization(rate, residual):
+    """The cost grows with the rate already used on the link, to spread the traffic."""
+    return 2.0 - residual / rate
+
+
+METRICS = {
+    "hops": hops,
+    "inverse_capacity": inverse_capacity,
+    "utilization": utilization,
+}
+
+
+def residual_from_used_rate(network, used_rate=None):
+    """Return a function giving the residual rate of an interface slot.
+
+    used_rate maps (i, j, device_id) to the rate used on the interface, in either direction.
+    """
+    if used_rate is None:
+        return network.rate_view.__getitem__
+
+    def residual(slot):
+        i, j, device_id = network.slot_view[slot]
+        return (
+            network.rate_view[slot]
+            - used_rate.get((i, j, device_id), 0)
+            - used_rate.get((j, i, device_id), 0)
+        )
+
+    return residual
+
+
+def shortest_path(
+    network, source, target, req_rate=0, residual=None, metric="hops", stats=None
+):
+    """Return the interface slots of the best path from source to target (node indices).
+
+    Paths are compared by cost (the sum of the metric over their links) and, among the paths
+    with the same cost, by the residual rate of their bottleneck (the widest path is preferred).
+    Only the interfaces with a residual rate of at least req_rate are considered.
+
+    residual(slot) returns the rate available on an interface slot, by default its full rate.
+    metric is either a key of METRICS or a function metric(rate, residual) returning a positive cost.
+
+    Return None if no path exists.
+    If given, the calls ("find_path") and the nodes expanded ("expansions") are counted in stats.
+    """
+    if residual is None:
+        residual = network.rate_view.__getitem__
+    if stats is None:
+        stats = NO_STATS
+    stats.count("find_path")
+
+    if source == target:
+        return []
+
+    if metric == "hops":
+        pred, n_expanded = _widest_bfs(network, source, target, req_rate, residual)
+    else:
+        pred, n_expanded = _widest_dijkstra(
+            network, source, target, req_rate, residual, METRICS.get(metric, metric)
+        )
+    stats.count("expansions", n_expanded)
+
+    if target not in pred:
+        return None
+
+    path = []
+    node = target
+    while node != source:
+        slot = pred[node]
+        path.append(slot)
+        node = network.iface_src_view[slot]
+    path.reverse()
+    return path
+
+
+def _widest_bfs(network, source, target, req_rate, residual):
+    """Layered BFS, return the slot used to reach each visited node on a widest path among the shortest ones
+    and the number of nodes expanded.
+
+    Each layer is completed before the next one is expanded, so that every node of a layer
+    keeps the widest of its predecessors in the previous layer.
+    """
+    indptr, indices, iface_ptr = (
+        network.indptr_view,
+        network.indices_view,
+        network.iface_ptr_view,
+    )
+    width = {source: math.inf}
+    pred = {source: None}
+    frontier = [source]
+    n_expanded = 0
+
+    while frontier and target not in pred:
+        n_expanded += len(frontier)
+        next_width = {}
+        next_pred = {}
+        for i in frontier:
+            width_i = width[i]
+            for k in range(indptr[i], indptr[i + 1]):
+                j = indices[k]
+                if j in pred:
+                    continue
+                for slot in range(iface_ptr[k], iface_ptr[k + 1]):
+                    available = residual(slot)
+                    if available >= req_rate:
+                        w = min(width_i, available)
+                        if w > next_width.get(j, -math.inf):
+                            next_width[j] = w
+                            next_pred[j] = slot
+        width.update(next_width)
+        pred.update(next_pred)
+        frontier = list(next_width)
+
+    return pred, n_expanded
+
+
+def _widest_dijkstra(network, source, target, req_rate, residual, metric):
+    """Dijkstra on (cost, -width) labels, return the slot used to reach each settled node and their number.
+
+    Ordering by cost first and by bottleneck width then is isotone, so the label-setting algorithm is exact.
+    """
+    indptr, indices, iface_ptr, rate = (
+        network.indptr_view,
+        network.indices_view,
+        network.iface_ptr_view,
+        network.rate_view,
+    )
+    best = {source: (0, -math.inf)}
+    pred = {source: None}
+    settled = set()
+    heap = [(0, -math.inf, source)]
+
+    while heap:
+        cost, neg_width, i = heapq.heappop(heap)
+        if i in settled:
+            continue
+        settled.add(i)
+        if i == target:
+            break
+        for k in range(indptr[i], indptr[i + 1]):
+            j = indices[k]
+            if j in settled:
+                continue
+            for slot in range(iface_ptr[k], iface_ptr[k + 1]):
+                available = residual(slot)
+                if available < req_rate:
+                    continue
+                label = (
+                    cost + metric(rate[slot], available),
+                    max(neg_width, -available),
+                )
+                if j not in best or label < best[j]:
+                    best[j] = label
+                    pred[j] = slot
+                    heapq.heappush(heap, (label[0], label[1], j))
+
+    return {node: pred[node] for node in settled}, len(settled)
+
+
+class _Tree(object):
+    """Shortest path tree rooted at a source node."""
+
+    def __init__(self, rate, label, pred, order):
+        # requested rate the tree has been computed for
+        self.rate = rate
+        # node -> (cost, -width) of its path from the root
+        self.label = label
+        # node -> slot used to reach it
+        self.pred = pred
+        # nodes of the tree, each one after its parent
+        self.order = order
+
+
+class ShortestPathTrees(object):
+    """Serve the paths from each physical source out of a cached shortest path tree rooted at it.
+
+    A tree is built the first time a source is used, considering the interfaces with enough residual rate
+    for that request. When the path towards a target is no longer feasible (an interface on it has a residual
+    rate lower than the requested one) only the branches of the tree below such interfaces are recomputed.
+
+    Residual rates are read from residual (a ResidualCapacity) or computed from used_rate, both expected
+    to be updated by the caller as virtual links are routed (see PhysicalNetwork.find_path),
+    and are assumed not to increase: call clear() otherwise, e.g., after a rollback.
+    Paths are as short as the ones of find_path as long as the requested rate does not decrease
+    between calls for the same source.
+
+    If given, the calls ("find_path"), the trees built ("trees"), the trees repaired ("tree_repairs") and
+    the nodes expanded ("expansions") are counted in stats (a SolveStats).
+    """
+
+    def __init__(
+        self, physical, used_rate=None, metric="hops", residual=None, stats=None
+    ):
+        self._network = physical.compile()
+        self._residual = (
+            residual_from_used_rate(self._network, used_rate)
+            if residual is None
+            else residual.slot_rate
+        )
+        self._metric = METRICS.get(metric, metric)
+        self._stats = NO_STATS if stats is None else stats
+        self._trees = {}
+        self.n_trees = 0
+        self.n_repairs = 0
+
+    def clear(self):
+        """Drop all the cached trees."""
+        self._trees.clear()
+
+    def find_path(self, source, target, req_rate=0):
+        """Return the path between source and target as a list (i, j, device_id), see PhysicalNetwork.find_path."""
+        network = self._network
+        self._stats.count("find_path")
+        path = self.path(network.index[source], network.index[target], req_rate)
+        if path is None:
+            raise NoPathFoundError
+        return [network.slot_view[slot] for slot in path]
+
+    def path(self, source, target, req_rate=0):
+        """Return the interface slots of the path between the source and the target node indices, None if no path exists."""
+        if source == target:
+            return []
+
+        tree = self._trees.get(source)
+        if tree is None or (target not in tree.pred and req_rate < tree.rate):
+            tree = self._trees[source] = self._build(source, req_rate)
+        elif target in tree.pred and not self._feasible(tree, source, target, req_rate):
+            self._repair(tree, source, req_rate)
+
+        if target not in tree.pred:
+            return None
+
+        path = []
+        node = target
+        while node != source:
+            slot = tree.pred[node]
+            path.append(slot)
+            node = self._network.iface_src_view[slot]
+        path.reverse()
+        return path
+
+    def _feasible(self, tree, source, target, req_rate):
+        """Check that the path in the tree towards target supports the requested rate."""
+        node = target
+        while node != source:
+            slot = tree.pred[node]
+            if self._residual(slot) < req_rate:
+                return False
+            node = self._network.iface_src_view[slot]
+        return True
+
+    def _build(self, source, req_rate):
+        """Compute the full tree rooted at source."""
+        self.n_trees += 1
+        self._stats.count("trees")
+        label = {source: (0, -math.inf)}
+        pred = {source: None}
+        order = self._settle(label, pred, [(0, -math.inf, source)], set(), req_rate)
+        return _Tree(req_rate, label, pred, order)
+
+    def _repair(self, tree, source, req_rate):
+        """Recompute the branches of the tree whose path from the root is no longer feasible for req_rate."""
+        self.n_repairs += 1
+        self._stats.count("tree_repairs")
+        network = self._network
+        residual = self._residual
+
+        # top-down pass: a node stays in the tree if the path from the root is still feasible
+        valid = {source}
+        for node in tree.order[1:]:
+            slot = tree.pred[node]
+            if network.iface_src_view[slot] in valid and residual(slot) >= req_rate:
+                valid.add(node)
+        broken = [node for node in tree.order if node not in valid]
+        for node in broken:
+            del tree.label[node]
+            del tree.pred[node]
+
+        # labels of the valid nodes are still optimal as paths can only get longer:
+        # relax the edges from the valid nodes towards the removed ones and resume the search from them
+        indptr, indices, iface_ptr = (
+            network.indptr_view,
+            network.indices_view,
+            network.iface_ptr_view,
+        )
+        reverse = network.reverse_view
+        heap = []
+        for j in broken:
+            for k in range(indptr[j], indptr[j + 1]):
+                i = indices[k]
+                if i in valid:
+                    k_rev = reverse[k]
+                    for slot in range(iface_ptr[k_rev], iface_ptr[k_rev + 1]):
+                        self._relax(tree.label, tree.pred, heap, i, j, slot, req_rate)
+        kept = [node for node in tree.order if node in valid]
+        order = self._settle(tree.label, tree.pred, heap, valid, req_rate, set(broken))
+        tree.order = kept + order
+        tree.rate = max(tree.rate, req_rate)
+
+    def _relax(self, label, pred, heap, i, j, slot, req_rate):
+        """Relax the interface slot from i to j."""
+        available = self._residual(slot)
+        if available < req_rate:
+            return
+        cost, neg_width = label[i]
+        new_label = (
+            cost + self._metric(self._network.rate_view[slot], available),
+            max(neg_width, -available),
+        )
+        if j not in label or new_label < label[j]:
+            label[j] = new_label
+            pred[j] = slot
+            heapq.heappush(heap, (new_label[0], new_label[1], j))
+
+    def _settle(self, label, pred, heap, settled, req_rate, allowed=None):
+        """Run Dijkstra from the labels in heap, never updating the settled nodes.
+
+        If allowed is given, only those nodes can be reached. Return the nodes in the order they are settled.
+        """
+        indptr, indices, iface_ptr = (
+            self._network.indptr_view,
+            self._network.indices_view,
+            self._network.iface_ptr_view,
+        )
+        order = []
+        while heap:
+            cost, neg_width, i = heapq.heappop(heap)
+            if i in settled or (cost, neg_width) != label[i]:
+                continue
+            settled.add(i)
+            order.append(i)
+            for k in range(indptr[i], indptr[i + 1]):
+                j = indices[k]
+                if j in settled or (allowed is not None and j not in allowed):
+                    continue
+                for slot in range(iface_ptr[k], iface_ptr[k + 1]):
+                    self._relax(label, pred, heap, i, j, slot, req_rate)
+        self._stats.count("expansions", len(order))
+        return order
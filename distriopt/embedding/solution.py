@@ -1,5 +1,6 @@
 import logging
 from collections import defaultdict
+from time import perf_counter
 
 from distriopt.constants import (
     EmptySolutionError,
@@ -7,6 +8,7 @@ from distriopt.constants import (
     NodeResourceError,
     LinkCapacityError,
 )
+from distriopt.stats import NO_STATS
 
 _log = logging.getLogger(__name__)
 
@@ -177,10 +179,15 @@ class Solution(object):
 
     @classmethod
     def build_solution(
-        cls, virtual, physical, node_mapping, link_path, check_solution=True
+        cls, virtual, physical, node_mapping, link_path, check_solution=True, stats=None
     ):
+        """Build the solution from the mapping, the time spent is added to the stats phases if given."""
+        if stats is None:
+            stats = NO_STATS
         if check_solution:
-            Solution.verify_solution(virtual, physical, node_mapping, link_path)
+            with stats.phase("verification"):
+                Solution.verify_solution(virtual, physical, node_mapping, link_path)
+        start = perf_counter()
 
         link_mapping = {}
         paths = {}
@@ -370,6 +377,7 @@ class Solution(object):
                     )
                 ]
 
+        stats.add_time("build", perf_counter() - start)
         return cls(node_mapping, link_mapping, paths)
 
     def __str__(self):
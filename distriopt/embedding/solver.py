@@ -5,10 +5,10 @@ import logging
 import math
 from abc import abstractmethod, ABCMeta
 
-from mininet.topo import Topo
-
 from distriopt import VirtualNetwork
+from distriopt.virtual import is_mininet_topo
 from distriopt.constants import *
+from distriopt.stats import SolveStats
 from distriopt.embedding import PhysicalNetwork
 
 _log = logging.getLogger(__name__)
@@ -19,16 +19,18 @@ class EmbedSolver(object, metaclass=ABCMeta):
         """"""
         self.virtual = (
             VirtualNetwork.from_mininet(virtual)
-            if isinstance(virtual, Topo)
+            if is_mininet_topo(virtual)
             else virtual
         )
         self.physical = (
             PhysicalNetwork.from_mininet(physical)
-            if isinstance(physical, Topo)
+            if is_mininet_topo(physical)
             else physical
         )
         self.solution = None
         self.status = NotSolved
+        # timings and counters of the last solve
+        self.stats = SolveStats()
 
     def lower_bound(self):
         """Return a lower bound on the minimum number of physical machines needed to map all the virtual nodes."""
@@ -59,6 +61,40 @@ class EmbedSolver(object, metaclass=ABCMeta):
             max(tot_req_cores / max_phy_cores, tot_req_memory / max_phy_memory)
         )
 
+    def _max_capacities(self):
+        """Return the maximum number of cores and the maximum memory of a physical machine."""
+        return (
+            max(
+                self.physical.cores(phy_node)
+                for phy_node in self.physical.compute_nodes
+            ),
+            max(
+                self.physical.memory(phy_node)
+                for phy_node in self.physical.compute_nodes
+            ),
+        )
+
+    def resource_weights(self):
+        """Return a dict mapping each virtual node to its dominant share of the biggest physical machine,
+        i.e., the largest between its fraction of the cores and its fraction of the memory.
+        """
+        max_phy_cores, max_phy_memory = self._max_capacities()
+        return {
+            virtual_node: max(
+                self.virtual.req_cores(virtual_node) / max_phy_cores,
+                self.virtual.req_memory(virtual_node) / max_phy_memory,
+            )
+            for virtual_node in self.virtual.nodes()
+        }
+
+    def capacity_weight(self, phy_node):
+        """Return the capacity of a physical machine in the units of resource_weights."""
+        max_phy_cores, max_phy_memory = self._max_capacities()
+        return min(
+            self.physical.cores(phy_node) / max_phy_cores,
+            self.physical.memory(phy_node) / max_phy_memory,
+        )
+
     @abstractmethod
     def solve(self, **kwargs):
         """This method must be implemented."""
@@ -7,6 +7,7 @@ Best Fit Dop Product heuristic from [1]
 
 """
 import logging
+from time import perf_counter
 
 from distriopt.constants import *
 from distriopt.decorators import timeit
@@ -38,6 +39,7 @@ class Bin(object):
 class BestFitDopProduct(PackingSolver):
     @timeit
     def solve(self, **kwargs):
+        start = perf_counter()
         # items sorted in non-increasing order
         sorted_items = sorted(
             self.virtual.nodes(),
@@ -98,10 +100,13 @@ class BestFitDopProduct(PackingSolver):
                 new_bin.add_item(u, req_cores, req_memory)
                 bins.append(new_bin)
 
+        self.stats.add_time("placement", perf_counter() - start)
+        self.stats.count("bins", len(bins))
         self.solution = Solution.build_solution(
             self.virtual,
             self.physical,
             {(bin.vm_type, i): bin.items for i, bin in enumerate(bins)},
+            stats=self.stats,
         )
         self.status = Solved
         return Solved
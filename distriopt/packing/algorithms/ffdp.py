@@ -6,6 +6,7 @@ First Fit Decreasing heuristic from [1]
      2016 16th IEEE/ACM International Symposium on Cluster, Cloud and Grid Computing (CCGrid). IEEE, 2016.
 """
 import logging
+from time import perf_counter
 
 from distriopt.constants import *
 from distriopt.decorators import timeit
@@ -37,6 +38,7 @@ class Bin(object):
 class FirstFitDecreasingPriority(PackingSolver):
     @timeit
     def solve(self, **kwargs):
+        start = perf_counter()
         # items sorted in non-increasing order
         sorted_items = sorted(
             self.virtual.nodes(),
@@ -113,10 +115,13 @@ class FirstFitDecreasingPriority(PackingSolver):
                 new_bin.add_item(u, req_cores, req_memory)
                 bins.append(new_bin)
 
+        self.stats.add_time("placement", perf_counter() - start)
+        self.stats.count("bins", len(bins))
         self.solution = Solution.build_solution(
             self.virtual,
             self.physical,
             {(bin.vm_type, i): bin.items for i, bin in enumerate(bins)},
+            stats=self.stats,
         )
         self.status = Solved
         return Solved
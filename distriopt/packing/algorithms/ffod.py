@@ -6,6 +6,7 @@ First Fit Ordered Deviation heuristic from [2]
     Annals of Operations Research 50.1 (1994): 239-261.
 """
 import logging
+from time import perf_counter
 
 from distriopt.constants import *
 from distriopt.decorators import timeit
@@ -37,6 +38,7 @@ class Bin(object):
 class FirstFitOrderedDeviation(PackingSolver):
     @timeit
     def solve(self, **kwargs):
+        start = perf_counter()
         # items sorted in non-increasing order
         sorted_items = sorted(
             self.virtual.nodes(),
@@ -126,10 +128,13 @@ class FirstFitOrderedDeviation(PackingSolver):
                 new_bin.add_item(u, req_cores, req_memory)
                 bins.append(new_bin)
 
+        self.stats.add_time("placement", perf_counter() - start)
+        self.stats.count("bins", len(bins))
         self.solution = Solution.build_solution(
             self.virtual,
             self.physical,
             {(bin.vm_type, i): bin.items for i, bin in enumerate(bins)},
+            stats=self.stats,
         )
         self.status = Solved
         return Solved
@@ -1,4 +1,5 @@
 import logging
+from time import perf_counter
 
 from distriopt.constants import *
 from distriopt.decorators import timeit
@@ -32,6 +33,7 @@ class PackGreedy(PackingSolver):
     def solve(self, **kwargs):
         """
         """
+        start = perf_counter()
         self.vm_max_cores = max(
             self.physical.vm_options, key=lambda vm: self.physical.cores(vm)
         )
@@ -80,10 +82,13 @@ class PackGreedy(PackingSolver):
                     new_bin.add_item(u, req_cores, req_memory)
                     bins.append(new_bin)
         # print(self._get_cheapest_feasible.cache_info())
+        self.stats.add_time("placement", perf_counter() - start)
+        self.stats.count("bins", len(bins))
         self.solution = Solution.build_solution(
             self.virtual,
             self.physical,
             {(bin.vm_type, i): bin.items for i, bin in enumerate(bins)},
+            stats=self.stats,
         )
         self.status = Solved
         return Solved
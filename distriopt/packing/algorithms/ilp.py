@@ -1,11 +1,11 @@
 import logging
 from collections import defaultdict
-
-import pulp
+from time import perf_counter
 
 from distriopt.constants import *
 from distriopt.decorators import timeit
 from distriopt.packing import PackingSolver
+from distriopt.packing.algorithms.greedy import PackGreedy
 from distriopt.packing.solution import Solution
 
 _log = logging.getLogger(__name__)
@@ -13,26 +13,68 @@ _log = logging.getLogger(__name__)
 
 class PackILP(PackingSolver):
     @staticmethod
-    def _get_solver(solver_name, timelimit):
+    def _get_solver(solver_name, timelimit, warm_start=False):
+        import pulp
+
+        # the initial values of the variables are passed only if set, GLPK and SCIP take none
+        options = {"warmStart": True} if warm_start else {}
         if solver_name == "cplex":
-            return pulp.CPLEX_PY(msg=0, timeLimit=timelimit)
+            return pulp.CPLEX_PY(msg=0, timeLimit=timelimit, **options)
         elif solver_name == "gurobi":
-            return pulp.GUROBI(msg=0, timeLimit=timelimit)
+            return pulp.GUROBI(msg=0, timeLimit=timelimit, **options)
         elif solver_name == "glpk":
-            return pulp.GLPK(msg=0, options=["--tmlim", str(timelimit)])
+            return pulp.GLPK_CMD(msg=0, timeLimit=timelimit)
         elif solver_name == "cbc":
-            return pulp.COIN(msg=0, maxSeconds=timelimit)
+            return pulp.PULP_CBC_CMD(msg=0, timeLimit=timelimit, **options)
         elif solver_name == "scip":
-            return pulp.SCIP(msg=0, options=["-c", f"set limits time {timelimit}"])
+            return pulp.SCIP_CMD(msg=0, timeLimit=timelimit)
         else:
             raise ValueError("Invalid _get_solver name")
 
+    def _initial_solution(self, warm_start):
+        """Return the solution to start from, found by the heuristic warm_start or given."""
+        if isinstance(warm_start, Solution):
+            return warm_start
+        elif warm_start == "greedy":
+            heuristic = PackGreedy(self.virtual, self.physical)
+            heuristic.solve()
+            return heuristic.solution
+        raise ValueError("undefined warm start")
+
+    @staticmethod
+    def _initial_assignment(solution, instances_UB):
+        """Return a dict mapping each virtual node of the solution to a (vm_type, vm_id) of the model, the ids are
+        renumbered from 0 for each type. Return None if a type is used more times than in the model.
+        """
+        # instance of the solution -> id in the model, vm_type -> number of instances
+        vm_ids = {}
+        n_instances = defaultdict(int)
+        assignment = {}
+        for u, instance in solution.nodes_assignment.items():
+            vm_type = instance[0]
+            if instance not in vm_ids:
+                if n_instances[vm_type] == instances_UB[vm_type]:
+                    return None
+                vm_ids[instance] = n_instances[vm_type]
+                n_instances[vm_type] += 1
+            assignment[u] = (vm_type, vm_ids[instance])
+        return assignment
+
     @timeit
     def solve(self, **kwargs):
+        """Solve the packing ILP with solver ("cplex" by default, "glpk", "cbc", "gurobi" or "scip").
+
+        With warm_start="greedy" the solution of PackGreedy (or warm_start itself, if it is a Solution) is the
+        initial solution of the solvers accepting one ("cbc", "cplex" and "gurobi"), and it is returned if
+        the solver finds none within timelimit.
+        """
+        # pulp is imported only when a model is built, it is not needed by the other algorithms
+        import pulp
 
         solver_name = kwargs.get("solver", "cplex").lower()
         timelimit = int(kwargs.get("timelimit", "3600"))
         _log.info(f"called solve with the following parameters: {kwargs}")
+        start = perf_counter()
         # UB on the number of instances of a certain type
         instances_UB = {
             vm_type: self._get_ub(vm_type) for vm_type in self.physical.vm_options
@@ -112,24 +154,47 @@ class PackILP(PackingSolver):
                 f"memory capacity of instance {vm_type, vm_id}",
             )
 
-        solver = self._get_solver(solver_name, timelimit)
+        initial_solution = None
+        if kwargs.get("warm_start") is not None:
+            with self.stats.phase("warm_start"):
+                initial_solution = self._initial_solution(kwargs["warm_start"])
+                assignment = self._initial_assignment(initial_solution, instances_UB)
+            if assignment is None:
+                _log.warning("the initial solution uses more instances than the model")
+                initial_solution = None
+            else:
+                for (u, vm_type, vm_id), variable in node_mapping.items():
+                    variable.setInitialValue(int(assignment[u] == (vm_type, vm_id)))
+                used = set(assignment.values())
+                for instance, variable in vm_used.items():
+                    variable.setInitialValue(int(instance in used))
+
+        solver = self._get_solver(
+            solver_name, timelimit, warm_start=initial_solution is not None
+        )
         mapping_ILP.setSolver(solver)
 
+        self.stats.add_time("model", perf_counter() - start)
+        self.stats.count("variables", mapping_ILP.numVariables())
+        self.stats.count("constraints", mapping_ILP.numConstraints())
+
         # solve the ILP
-        status = pulp.LpStatus[mapping_ILP.solve()]
+        with self.stats.phase("solver"):
+            status = pulp.LpStatus[mapping_ILP.solve()]
         obj_value = pulp.value(mapping_ILP.objective)
 
         if status == "Infeasible":
             self.status = Infeasible
             return Infeasible
-        elif (status == "Not Solved" or status == "Undefined") and (
+        no_solution = (status == "Not Solved" or status == "Undefined") and (
             not obj_value
             or sum(
                 round(node_mapping[(u, vm_type, vm_id)].varValue)
                 for (u, vm_type, vm_id) in node_mapping
             )
             != self.virtual.number_of_nodes()
-        ):
+        )
+        if no_solution and initial_solution is None:
             self.status = NotSolved
             return NotSolved
 
@@ -142,10 +207,15 @@ class PackILP(PackingSolver):
         else:
             self.current_val = 0
 
-        assignment_ec2_instances = self.build_ILP_solution(node_mapping)
-        self.solution = Solution.build_solution(
-            self.virtual, self.physical, assignment_ec2_instances
-        )
+        if no_solution:
+            # the time limit expired before the first solution
+            self.solution = initial_solution
+        else:
+            with self.stats.phase("build"):
+                assignment_ec2_instances = self.build_ILP_solution(node_mapping)
+            self.solution = Solution.build_solution(
+                self.virtual, self.physical, assignment_ec2_instances, stats=self.stats
+            )
         self.status = Solved
         return Solved
 
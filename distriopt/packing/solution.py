@@ -1,8 +1,10 @@
 import itertools
 import logging
 from collections import Counter
+from time import perf_counter
 
 from distriopt.constants import AssignmentError, NodeResourceError
+from distriopt.stats import NO_STATS
 
 _log = logging.getLogger(__name__)
 
@@ -65,10 +67,20 @@ class Solution(object):
 
     @classmethod
     def build_solution(
-        cls, virtual, physical, assignment_ec2_instances, check_solution=True
+        cls,
+        virtual,
+        physical,
+        assignment_ec2_instances,
+        check_solution=True,
+        stats=None,
     ):
+        """Build the solution from the assignment, the time spent is added to the stats phases if given."""
+        if stats is None:
+            stats = NO_STATS
         if check_solution:
-            Solution.verify_solution(virtual, physical, assignment_ec2_instances)
+            with stats.phase("verification"):
+                Solution.verify_solution(virtual, physical, assignment_ec2_instances)
+        start = perf_counter()
 
         nodes_assignment = {
             node: instance_id
@@ -82,6 +94,7 @@ class Solution(object):
             ),
             2,
         )
+        stats.add_time("build", perf_counter() - start)
         return cls(nodes_assignment, vm_used, cost)
 
     def __str__(self):
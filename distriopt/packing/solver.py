@@ -5,10 +5,10 @@ import logging
 from abc import abstractmethod, ABCMeta
 from functools import lru_cache
 
-from mininet.topo import Topo
-
 from distriopt import VirtualNetwork
+from distriopt.virtual import is_mininet_topo
 from distriopt.constants import *
+from distriopt.stats import SolveStats
 
 _log = logging.getLogger(__name__)
 
@@ -18,12 +18,14 @@ class PackingSolver(object, metaclass=ABCMeta):
         """"""
         self.virtual = (
             VirtualNetwork.from_mininet(virtual)
-            if isinstance(virtual, Topo)
+            if is_mininet_topo(virtual)
             else virtual
         )
         self.physical = physical
         self.solution = None
         self.status = NotSolved
+        # timings and counters of the last solve
+        self.stats = SolveStats()
         self.lb = 0
 
     def _get_ub(self, vm_type):
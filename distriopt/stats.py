@@ -0,0 +1,138 @@
+"""
+Statistics collected while solving a problem.
+"""
+import logging
+import time
+from collections import Counter, defaultdict
+
+_log = logging.getLogger(__name__)
+
+# functions called as hook(solver, stats) at the end of each solve
+_hooks = []
+
+
+def add_hook(hook):
+    """Register a function called as hook(solver, stats) each time a solver returns, e.g., to export the stats.
+
+    Return the hook, so that it can be used as a decorator.
+    """
+    _hooks.append(hook)
+    return hook
+
+
+def remove_hook(hook):
+    """Unregister a function previously registered with add_hook."""
+    _hooks.remove(hook)
+
+
+class _Phase(object):
+    """Context manager adding the time spent in its block to a phase."""
+
+    __slots__ = ("_stats", "_name", "_start")
+
+    def __init__(self, stats, name):
+        self._stats = stats
+        self._name = name
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        self._stats.phases[self._name] += time.perf_counter() - self._start
+
+
+class SolveStats(object):
+    """Timings and counters of the last solve of a solver.
+
+    phases maps the name of a phase (e.g., "partitioning", "placement", "routing", "verification", "build")
+    to the seconds spent in it, measured with time.perf_counter.
+    counters maps the name of an event (e.g., "find_path", "expansions", "variables") to the number of occurrences.
+    retries maps the size of each unfeasible try (e.g., the number of partitions or of physical nodes) to the
+    number of times it has been tried.
+    """
+
+    def __init__(self):
+        self.algorithm = None
+        self.status = None
+        self.time = None
+        self.phases = defaultdict(float)
+        self.counters = Counter()
+        self.retries = Counter()
+
+    def reset(self):
+        """Clear the stats collected so far."""
+        self.__init__()
+
+    def phase(self, name):
+        """Return a context manager adding the time spent in its block to phase name.
+
+        >>> with stats.phase("routing"):
+        ...     path = physical.find_path(i, j)
+        """
+        return _Phase(self, name)
+
+    def add_time(self, name, seconds):
+        """Add seconds to phase name, for the code where a context manager is too expensive."""
+        self.phases[name] += seconds
+
+    def count(self, name, n=1):
+        """Increase counter name by n."""
+        self.counters[name] += n
+
+    def retry(self, size):
+        """Record an unfeasible try of the given size."""
+        self.retries[size] += 1
+
+    def notify(self, solver):
+        """Call the registered hooks, their exceptions are logged and not propagated."""
+        for hook in _hooks:
+            try:
+                hook(solver, self)
+            except Exception:
+                _log.exception(f"stats hook {hook} failed")
+
+    def as_dict(self):
+        """Return the stats as a dict of builtin types, e.g., to be serialized as JSON."""
+        return {
+            "algorithm": self.algorithm,
+            "status": self.status,
+            "time": self.time,
+            "phases": dict(self.phases),
+            "counters": dict(self.counters),
+            "retries": dict(self.retries),
+        }
+
+    def __repr__(self):
+        return (
+            f"SolveStats(algorithm={self.algorithm}, status={self.status}, time={self.time}, "
+            f"phases={dict(self.phases)}, counters={dict(self.counters)}, retries={dict(self.retries)})"
+        )
+
+
+class _NoPhase(object):
+    __slots__ = ()
+
+    def __enter__(self):
+        pass
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+class _NoStats(SolveStats):
+    """Stats discarding everything, used when the caller does not collect them."""
+
+    def phase(self, name):
+        return _NoPhase()
+
+    def add_time(self, name, seconds):
+        pass
+
+    def count(self, name, n=1):
+        pass
+
+    def retry(self, size):
+        pass
+
+
+NO_STATS = _NoStats()
@@ -2,9 +2,12 @@
 Model a virtual network based on the networkx module.
 """
 
+import hashlib
 import itertools
+import json
 import logging
 import random
+import sys
 import warnings
 
 import networkx as nx
@@ -14,6 +17,15 @@ from distriopt.decorators import cached
 _log = logging.getLogger(__name__)
 
 
+def is_mininet_topo(obj):
+    """Return True if obj is a mininet Topo, without importing mininet.
+
+    A Topo instance can only exist if mininet.topo has already been imported by the caller.
+    """
+    topo_module = sys.modules.get("mininet.topo")
+    return topo_module is not None and isinstance(obj, topo_module.Topo)
+
+
 class VirtualNetwork(object):
     "Utility class to model the virtual network. Uses networkx.Graph."
 
@@ -43,6 +55,23 @@ class VirtualNetwork(object):
         """Return the edges starting at node i with each edge sorted in lexicographic way."""
         return set((i, j) if i < j else (j, i) for j in self._g[i])
 
+    def fingerprint(self):
+        """Return a digest of the network.
+
+        Networks with the same nodes and links, and the same cores, memory and rate requests,
+        have the same fingerprint whatever the order in which they have been built.
+        It is computed at each call, the graph can be modified in place.
+        """
+        nodes = sorted(
+            (repr(u), float(self.req_cores(u)), float(self.req_memory(u)))
+            for u in self.nodes()
+        )
+        links = sorted(
+            (*sorted((repr(u), repr(v))), float(self.req_rate(u, v)))
+            for (u, v) in self.edges()
+        )
+        return hashlib.sha256(json.dumps([nodes, links]).encode()).hexdigest()
+
     def nodes(self):
         """Return the nodes of the graph."""
         return self._g.nodes()
@@ -4,7 +4,7 @@ import sys
 from setuptools import setup, find_packages
 
 CURRENT_PYTHON = sys.version_info[:2]
-REQUIRED_PYTHON = (3, 6)
+REQUIRED_PYTHON = (3, 9)
 
 # This check and everything above must remain compatible with Python 2.7.
 if CURRENT_PYTHON < REQUIRED_PYTHON:
@@ -31,7 +31,7 @@ setup(
     name='mapping_distrinet',
     version='0.1',
     python_requires='>={}.{}'.format(*REQUIRED_PYTHON),
-    packages=find_packages(exclude=[]),
+    packages=find_packages(exclude=['benchmarks', 'benchmarks.*']),
     url='https://github.com/atomassi/mapping_distrinet',
     download_url='https://github.com/atomassi/mapping_distrinet',
     license='MIT',
@@ -41,19 +41,26 @@ setup(
     long_description=read('README.md'),
     classifiers=[
         "Programming Language :: Python",
-        'Programming Language :: Python :: 3.6',
-        'Programming Language :: Python :: 3.7',
+        'Programming Language :: Python :: 3.9',
+        'Programming Language :: Python :: 3.10',
+        'Programming Language :: Python :: 3.11',
     ],
     dependency_links=['http://github.com/mininet/mininet/tarball/master#egg=mininet'],
     install_requires=[
-        'PuLP',
+        # timeLimit and warmStart of the solvers
+        'PuLP>=2.7',
         'networkx',
-        'mininet',
-        'numpy'
+        'numpy>=1.18.5',
+        # scipy.optimize.milp, used by the HiGHS solver
+        'scipy>=1.9'
     ],
+    # mininet is only needed to convert mininet Topo objects
+    extras_require={
+        'mininet': ['mininet']
+    },
     package_data={
         'distriopt.embedding.instances': ['*.json'],
-        'distriopt.packing.instances': ['*.json']
+        'distriopt.packing.instances': ['ec2/*.json']
     },
     include_package_data=True,
     zip_safe=True
@@ -0,0 +1,95 @@
+import networkx as nx
+import pytest
+
+from distriopt import VirtualNetwork
+from distriopt.constants import Solved
+from distriopt.embedding import PhysicalNetwork
+from distriopt.embedding.algorithms import EmbedBalanced, EmbedPartition
+from distriopt.embedding.assignment import assign_partitions, hop_distances
+
+
+@pytest.fixture(scope="module")
+def physical_nw():
+    """Two switches with two hosts each, h1 is the smallest host.
+
+             s1 ------ s2
+            /  \\      /  \\
+           h1  h2    h3  h4
+    """
+    g = nx.MultiGraph()
+    for u in ("s1", "s2"):
+        g.add_node(u, cores=0, memory=0)
+    g.add_edge("s1", "s2", devices={"s1": "eth0", "s2": "eth0"}, rate=10000)
+    for i, (u, switch) in enumerate(
+        (("h1", "s1"), ("h2", "s1"), ("h3", "s2"), ("h4", "s2"))
+    ):
+        g.add_node(u, cores=2 if u == "h1" else 4, memory=4000)
+        g.add_edge(u, switch, devices={u: "eth0", switch: f"eth{i + 1}"}, rate=10000)
+    yield PhysicalNetwork(nx.freeze(g))
+
+
+@pytest.fixture(scope="module")
+def virtual_nw():
+    """Two pairs of nodes exchanging a lot of traffic, lightly connected to each other."""
+    g = nx.Graph()
+    for u in "abcd":
+        g.add_node(u, cores=1, memory=1000)
+    g.add_edge("a", "b", rate=5000)
+    g.add_edge("c", "d", rate=5000)
+    g.add_edge("a", "c", rate=100)
+    yield VirtualNetwork(g)
+
+
+def test_hop_distances(physical_nw):
+    distances = hop_distances(physical_nw, ["h1"])
+    assert distances["h1"]["h2"] == 2
+    assert distances["h1"]["h4"] == 3
+
+
+def test_by_capacity(physical_nw, virtual_nw):
+    partitions = [{"a"}, {"b", "c", "d"}]
+    pairs = assign_partitions(
+        virtual_nw, physical_nw, partitions, ["h1", "h2"], assignment="capacity"
+    )
+    # the biggest partition does not fit in h1
+    assert sorted(pairs) == [("h1", {"a"}), ("h2", {"b", "c", "d"})]
+
+
+def test_by_traffic(physical_nw, virtual_nw):
+    partitions = [{"a"}, {"c"}, {"b"}, {"d"}]
+    hosts = ["h2", "h3", "h4", "h1"]
+    in_order = assign_partitions(
+        virtual_nw, physical_nw, partitions, hosts, assignment="in_order"
+    )
+    assert in_order == list(zip(hosts, partitions))
+
+    host_of = {
+        next(iter(part)): host
+        for host, part in assign_partitions(virtual_nw, physical_nw, partitions, hosts)
+    }
+    assert sorted(host_of.values()) == sorted(hosts)
+    switch = {"h1": "s1", "h2": "s1", "h3": "s2", "h4": "s2"}
+    assert switch[host_of["a"]] == switch[host_of["b"]]
+    assert switch[host_of["c"]] == switch[host_of["d"]]
+
+
+def test_assignment_function(physical_nw, virtual_nw):
+    def reverse(virtual, physical, partitions, hosts):
+        return list(zip(reversed(hosts), partitions))
+
+    pairs = assign_partitions(
+        virtual_nw, physical_nw, [{"a", "b"}, {"c", "d"}], ["h1", "h2"], reverse
+    )
+    assert pairs == [("h2", {"a", "b"}), ("h1", {"c", "d"})]
+    with pytest.raises(ValueError):
+        assign_partitions(virtual_nw, physical_nw, [], [], assignment="undefined")
+
+
+@pytest.mark.parametrize("algo", [EmbedBalanced, EmbedPartition])
+@pytest.mark.parametrize("assignment", ["in_order", "capacity", "traffic"])
+def test_embed(algo, assignment):
+    virtual = VirtualNetwork.create_random_EC2(n_nodes=100, seed=1)
+    physical = PhysicalNetwork.from_files("grisou", "grele")
+    prob = algo(virtual, physical)
+    _, status = prob.solve(assignment=assignment)
+    assert status == Solved
@@ -0,0 +1,43 @@
+from benchmarks import compare, embedding_cases, packing_cases, partitioning_cases, run
+
+
+def test_run_and_compare():
+    cases = [
+        case
+        for case in embedding_cases() + packing_cases()
+        if case.virtual == "fat_tree(k=4)"
+        and case.physical in ("grisou", "general_purpose")
+    ]
+    results = run(cases)
+    assert len(results) == len(cases)
+    for result in results:
+        assert result["status"] == "Solved"
+        assert result["time"] > 0 and result["peak_memory"] > 0
+        if result["suite"] == "embedding":
+            assert result["n_machines_used"] > 0
+        else:
+            assert result["cost"] > 0
+
+    rows = compare(results, results)
+    assert len(rows) == len(results)
+    assert not any(row["regression"] for row in rows)
+
+    slower = [dict(result, time=2 * result["time"] + 1) for result in results]
+    assert all(row["regression"] for row in compare(results, slower))
+
+
+def test_partitioning():
+    cases = [
+        case
+        for case in partitioning_cases()
+        if case.virtual == "fat_tree(k=16)" and case.physical == "8"
+    ]
+    results = run(cases, memory=False)
+    assert {result["algorithm"] for result in results} == {
+        "kernighan_lin",
+        "swap",
+        "multilevel",
+    }
+    for result in results:
+        assert result["status"] == "Solved"
+        assert result["cost"] > 0
@@ -0,0 +1,103 @@
+import pytest
+
+from distriopt import VirtualNetwork
+from distriopt.cache import Cache, partitions_cache
+from distriopt.embedding import PhysicalNetwork
+from distriopt.embedding.algorithms import EmbedBalanced
+from distriopt.embedding.algorithms import greedy
+from distriopt.embedding.algorithms.greedy import partition
+
+
+@pytest.fixture
+def cache_dir(cache_dir):
+    """The directory of the on-disk cache (see conftest), with the partitions in memory dropped."""
+    partitions_cache.clear()
+    yield cache_dir
+    partitions_cache.clear()
+
+
+def test_fingerprint():
+    """Test that the fingerprint depends only on the nodes, the links and their requests."""
+
+    virtual = VirtualNetwork.create_random_nw(n_nodes=20, seed=1)
+    same = VirtualNetwork.create_random_nw(n_nodes=20, seed=1)
+    assert virtual.fingerprint() == same.fingerprint()
+
+    (u, v) = next(iter(same.edges()))
+    same.g[u][v]["rate"] += 1
+    assert virtual.fingerprint() != same.fingerprint()
+    fingerprint = same.fingerprint()
+    same.g.node[u]["cores"] += 1
+    assert same.fingerprint() != fingerprint
+
+
+def test_partition_cache_modified(cache_dir):
+    """Test that the partitions of a network modified in place are not read from the cache."""
+
+    virtual = VirtualNetwork.create_random_nw(n_nodes=30, seed=1)
+    tree = partition(virtual, algo="bisection")
+    for u in virtual.nodes():
+        virtual.g.node[u]["cores"] *= 2
+    modified = partition(virtual, algo="bisection")
+    assert modified.root.cores == 2 * tree.root.cores
+
+
+def test_cache(cache_dir):
+    """Test the in-memory eviction and the on-disk storage."""
+
+    cache = Cache("test", maxsize=2)
+    for key in ("a", "b", "c"):
+        cache.put(key, key.upper())
+    assert list(cache._values) == ["b", "c"]
+    assert len(list(cache_dir.iterdir())) == 3
+    # evicted from memory, read back from disk
+    assert cache.get("a") == "A"
+    assert cache.get("missing") is None
+    assert Cache("test", persistent=False).get("a") is None
+
+
+def test_cache_in_memory(cache_dir, monkeypatch):
+    """Test that without DISTRIOPT_CACHE_DIR nothing is written to or read from disk."""
+
+    monkeypatch.delenv("DISTRIOPT_CACHE_DIR")
+    monkeypatch.setenv("HOME", str(cache_dir))
+    cache = Cache("test")
+    cache.put("a", "A")
+    assert cache.get("a") == "A"
+    cache.clear()
+    assert cache.get("a") is None
+    partition(VirtualNetwork.create_random_nw(n_nodes=30, seed=1), algo="bisection")
+    assert not list(cache_dir.iterdir())
+
+
+def test_partition_cache(cache_dir, monkeypatch):
+    """Test that the partition tree of a network already seen is not computed again."""
+
+    virtual = VirtualNetwork.create_random_nw(n_nodes=30, seed=1)
+    tree = partition(virtual, algo="bisection")
+    expected = [(n.partition, n.cores, n.memory) for n in tree.bfs_visit()]
+
+    # once cached, the tree is not computed and it is read back from disk
+    partitions_cache.clear()
+    monkeypatch.setattr(greedy, "kernighan_lin_bisection", None)
+    cached = partition(
+        VirtualNetwork.create_random_nw(n_nodes=30, seed=1), algo="bisection"
+    )
+    assert cached is not tree
+    assert [(n.partition, n.cores, n.memory) for n in cached.bfs_visit()] == expected
+
+
+def test_balanced_cache(cache_dir):
+    """Test that EmbedBalanced reuses the partitions of the same network."""
+
+    physical = PhysicalNetwork.from_files("grisou")
+    virtual = VirtualNetwork.create_random_nw(n_nodes=60, seed=1)
+    prob = EmbedBalanced(virtual, physical)
+    prob.solve()
+    n_entries = len(list(cache_dir.glob("partitions-*")))
+    assert n_entries > 0
+
+    again = EmbedBalanced(VirtualNetwork.create_random_nw(n_nodes=60, seed=1), physical)
+    again.solve()
+    assert len(list(cache_dir.glob("partitions-*"))) == n_entries
+    assert again.solution.node_mapping == prob.solution.node_mapping
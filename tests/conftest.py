@@ -0,0 +1,8 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    """Keep the files of the on-disk caches of each test in its own temporary directory."""
+    monkeypatch.setenv("DISTRIOPT_CACHE_DIR", str(tmp_path))
+    return tmp_path
@@ -0,0 +1,51 @@
+import gc
+
+from distriopt.decorators import cached, cachedproperty
+
+
+class Counted(object):
+    calls = 0
+
+    @cached(maxsize=2)
+    def square(self, x):
+        Counted.calls += 1
+        return x * x
+
+    @cachedproperty
+    def value(self):
+        Counted.calls += 1
+        return object()
+
+
+def test_cached_per_instance():
+    a, b = Counted(), Counted()
+    Counted.calls = 0
+    assert a.square(2) == b.square(2) == 4
+    assert a.square(2) == 4
+    assert Counted.calls == 2
+    info = Counted.square.cache_info()
+    assert (info.hits, info.misses, info.currsize) == (1, 2, 2)
+
+    # least recently used results are evicted
+    a.square(3)
+    a.square(4)
+    a.square(2)
+    assert Counted.calls == 5
+
+    # results are dropped with the instance and can be invalidated
+    del b
+    gc.collect()
+    assert Counted.square.cache_info().currsize == 2
+    Counted.square.cache_clear(a)
+    assert Counted.square.cache_info().currsize == 0
+
+
+def test_cachedproperty():
+    a = Counted()
+    Counted.calls = 0
+    assert a.value is a.value
+    assert Counted.calls == 1
+    del a.value
+    a.value
+    assert Counted.calls == 2
+    assert Counted.value.cache_info().currsize == 1
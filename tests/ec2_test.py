@@ -1 +1,47 @@
-# TODO
+import pytest
+
+from distriopt import VirtualNetwork
+from distriopt.constants import Solved
+from distriopt.packing import CloudInstance
+from distriopt.packing.algorithms import PackGreedy, PackILP
+
+
+def test_initial_assignment():
+    virtual = VirtualNetwork.create_random_EC2(n_nodes=30, seed=1)
+    physical = CloudInstance.read_ec2_instances(vm_type="general_purpose")
+    greedy = PackGreedy(virtual, physical)
+    greedy.solve()
+    instances = set(greedy.solution.nodes_assignment.values())
+    n_instances = {vm_type: n for vm_type, n in greedy.solution.vm_used.items()}
+
+    upper_bounds = {
+        vm_type: n_instances.get(vm_type, 0) for vm_type in physical.vm_options
+    }
+    assignment = PackILP._initial_assignment(greedy.solution, upper_bounds)
+    # the instances of each type are numbered from 0
+    assert set(assignment.values()) == {
+        (vm_type, vm_id) for vm_type, n in n_instances.items() for vm_id in range(n)
+    }
+    # each instance of the solution is a single instance of the model
+    renumbering = {greedy.solution.node_info(u): assignment[u] for u in virtual.nodes()}
+    assert len(renumbering) == len(set(renumbering.values())) == len(instances)
+    assert all(vm_type == renumbering[(vm_type, _)][0] for vm_type, _ in instances)
+
+    # the model has less instances than the solution
+    vm_type = next(iter(n_instances))
+    upper_bounds[vm_type] -= 1
+    assert PackILP._initial_assignment(greedy.solution, upper_bounds) is None
+
+
+def test_warm_start():
+    pulp = pytest.importorskip("pulp")
+    if not pulp.PULP_CBC_CMD(msg=0).available():
+        pytest.skip("CBC not installed")
+    virtual = VirtualNetwork.create_random_EC2(n_nodes=10, seed=1)
+    physical = CloudInstance.read_ec2_instances(vm_type="general_purpose")
+    greedy = PackGreedy(virtual, physical)
+    greedy.solve()
+    prob = PackILP(virtual, physical)
+    _, status = prob.solve(solver="cbc", timelimit=60, warm_start=greedy.solution)
+    assert status == Solved
+    assert prob.solution.cost <= greedy.solution.cost + 1e-6
@@ -0,0 +1,152 @@
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import networkx as nx
+import pytest
+
+from distriopt import VirtualNetwork
+from distriopt.constants import Solved
+from distriopt.embedding import PhysicalNetwork
+from distriopt.embedding.algorithms import EmbedGreedy
+from distriopt.embedding.algorithms import greedy
+from distriopt.embedding.algorithms.greedy import min_cut, partition
+
+
+def _outcome(steps, mapping):
+    return [
+        (step.node, step.host, step.paths, step.cut_rate) for step in steps
+    ], mapping
+
+
+@pytest.fixture(scope="module")
+def prob():
+    virtual = VirtualNetwork.create_random_nw(n_nodes=120, seed=1)
+    physical = PhysicalNetwork.from_files("grisou", "grele")
+    yield EmbedGreedy(virtual, physical)
+
+
+def test_replay(prob):
+    """Placements replayed from the tries with a different number of physical nodes are the same as new ones."""
+    tree = partition(prob.virtual, algo="bisection")
+    hosts = sorted(prob.physical.compute_nodes)
+    tries = {n: prob._place(tree, hosts[:n]) for n in (6, 10, 14)}
+    for n_tried, (steps, _) in tries.items():
+        for n in (4, 8, 12, 16):
+            prefix = steps[: EmbedGreedy._valid_prefix(steps, n_tried, n)]
+            assert _outcome(*prob._place(tree, hosts[:n], prefix)) == _outcome(
+                *prob._place(tree, hosts[:n])
+            )
+
+
+def test_search(prob):
+    for search in ("linear", "galloping"):
+        _, status = prob.solve(search=search)
+        assert status == Solved
+        # the number of machines is the smallest one found feasible
+        assert all(n < prob.solution.n_machines_used for n in prob.stats.retries)
+    with pytest.raises(ValueError):
+        prob.solve(search="unknown")
+
+
+def test_min_cut():
+    g = VirtualNetwork.create_random_nw(n_nodes=60, p=0.1, seed=3).g
+    cut_value, _ = nx.stoer_wagner(g, weight="rate")
+    p1, p2 = min_cut(g, n_trials=128, seed=0)
+    assert p1 and p2 and p1 | p2 == set(g.nodes())
+    assert nx.cut_size(g, p1, p2, weight="rate") == cut_value
+    # same result for the same seed, also when the trials are run in parallel
+    with ProcessPoolExecutor(2) as executor:
+        assert min_cut(g, n_trials=40, seed=1, executor=executor) == min_cut(
+            g, n_trials=40, seed=1
+        )
+
+
+def test_partition_executor(monkeypatch):
+    """A pool given by the caller is shared by the calls and left running, with the same trees."""
+    monkeypatch.setattr(greedy, "_MIN_PARALLEL_EDGES", 100)
+    virtual = VirtualNetwork.create_random_nw(n_nodes=60, p=0.1, seed=3)
+    expected = [
+        n.partition for n in partition(virtual, seed=1, cache=False).bfs_visit()
+    ]
+    with ProcessPoolExecutor(2) as executor:
+        for _ in range(2):
+            tree = partition(virtual, seed=1, cache=False, executor=executor)
+            assert [n.partition for n in tree.bfs_visit()] == expected
+
+
+def test_min_cut_disconnected():
+    g = nx.Graph()
+    g.add_edge(0, 1, rate=10)
+    g.add_edge(2, 3, rate=10)
+    g.add_node(4)
+    p1, p2 = min_cut(g, seed=0)
+    assert nx.cut_size(g, p1, p2, weight="rate") == 0
+
+
+def test_bfs_visit_skips_placed():
+    tree = partition(VirtualNetwork.create_fat_tree(k=4), algo="bisection")
+    visit = tree.bfs_visit()
+    assert next(visit) is tree.root
+    left = next(visit)
+    tree.place(left)
+    assert tree.root.n_placed == len(left.partition)
+
+    visited = list(visit)
+    assert visited[0] is tree.root.r
+    # nothing below the placed partition is visited
+    assert all(not node.partition & left.partition for node in visited)
+    assert sum(len(node.partition) == 1 for node in visited) == len(
+        tree.root.r.partition
+    )
+
+    # a new visit starts with nothing placed
+    assert len(list(tree.bfs_visit())) == 2 * len(tree.root.partition) - 1
+
+
+def test_default_starts():
+    starts = EmbedGreedy.default_starts(6, seed=0)
+    assert len(starts) == 6
+    assert starts[0] == {"algo": "bisection"}
+    assert len({tuple(sorted(start.items())) for start in starts}) == 6
+    assert starts == EmbedGreedy.default_starts(6, seed=0)
+
+
+def test_solve_parallel():
+    """The best start is at least as good as the default one."""
+    virtual = VirtualNetwork.create_random_nw(n_nodes=60, seed=1)
+    physical = PhysicalNetwork.from_files("grisou")
+    prob = EmbedGreedy(virtual, physical)
+    prob.solve()
+    n_machines_used = prob.solution.n_machines_used
+
+    _, status = prob.solve_parallel(n_starts=4, seed=0, n_jobs=2)
+    assert status == Solved
+    assert prob.solution.n_machines_used <= n_machines_used
+    assert 1 <= prob.stats.counters["starts"] <= 4
+
+
+def test_solve_parallel_cancel():
+    """Once a start reaches the lower bound, the other ones are cancelled, including the running ones."""
+    virtual = VirtualNetwork.create_random_nw(n_nodes=60, seed=1)
+    physical = PhysicalNetwork.from_files("grisou")
+    prob = EmbedGreedy(virtual, physical)
+    _, status = prob.solve_parallel(n_starts=8, seed=0, n_jobs=2)
+    assert status == Solved
+    assert prob.solution.n_machines_used == prob.lower_bound()
+    assert prob.stats.counters["cancelled_starts"] > 0
+    # the workers stop without being waited for
+    deadline = time.monotonic() + 10
+    while multiprocessing.active_children() and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert not multiprocessing.active_children()
+
+
+def test_run_start_cancelled(monkeypatch):
+    stop_event = multiprocessing.Event()
+    stop_event.set()
+    monkeypatch.setattr(greedy, "_stop_event", stop_event)
+    virtual = VirtualNetwork.create_random_nw(n_nodes=20, seed=1)
+    physical = PhysicalNetwork.from_files("grisou")
+    mapping, _ = greedy._run_start(virtual, physical, {"cache": False})
+    assert mapping is None
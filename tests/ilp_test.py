@@ -0,0 +1,255 @@
+import networkx as nx
+import numpy as np
+import pytest
+
+from distriopt import VirtualNetwork
+from distriopt.constants import Infeasible, NotSolved, Solved
+from distriopt.embedding import PhysicalNetwork
+from distriopt.embedding.algorithms import EmbedGreedy, EmbedILP
+from distriopt.embedding.algorithms.arcflow import ArcFlowModel, host_classes
+from distriopt.embedding.algorithms.pathflow import PathFlowModel
+
+
+@pytest.fixture(scope="module")
+def virtual_nw():
+    g = nx.Graph()
+    g.add_node("Node_0", cores=3, memory=3000)
+    g.add_node("Node_1", cores=3, memory=3000)
+    g.add_edge("Node_0", "Node_1", rate=20000)
+    yield VirtualNetwork(g)
+
+
+def test_model_size():
+    virtual = VirtualNetwork.create_fat_tree(k=4)
+    physical = PhysicalNetwork.from_files("grisou")
+    n_links, n_nodes = len(virtual.sorted_edges()), virtual.number_of_nodes()
+    n_phy = physical.number_of_nodes()
+    n_ifaces = len(list(physical.edges(keys=True)))
+
+    model = ArcFlowModel(virtual, physical, names=True, presolve=False, symmetry=False)
+    assert model.n_variables == 2 * n_links * n_ifaces + n_nodes * n_phy + n_phy
+    assert (
+        model.n_constraints
+        == (n_nodes + 2 * n_phy + 3 * n_links * n_phy + n_ifaces)
+        + n_links * n_ifaces
+        + n_nodes * n_phy
+    )
+    assert model.A.shape == (model.n_constraints, model.n_variables)
+    assert len(set(model.variable_names)) == model.n_variables
+    assert len(set(model.constraint_names)) == model.n_constraints
+
+
+def test_presolve():
+    virtual = VirtualNetwork.create_random_nw(
+        n_nodes=6, req_cores=28, req_memory=64000, seed=1
+    )
+    physical = PhysicalNetwork.from_files("graphique", "grisou")
+    model = ArcFlowModel(virtual, physical, names=True, symmetry=False)
+    # only the grisou nodes fit the virtual nodes, the switch hosts none
+    fits = {
+        name.split("_")[-1] for name in model.variable_names if "node_mapping" in name
+    }
+    assert fits == {i for i in physical.compute_nodes if physical.cores(i) >= 28}
+    assert "usage_gw-nancy" not in model.variable_names
+    # a link leaves or reaches a graphique node only in a cycle
+    assert not any(
+        name.startswith("link_mapping") and "graphique" in name
+        for name in model.variable_names
+    )
+    full = ArcFlowModel(virtual, physical, presolve=False, symmetry=False)
+    assert model.n_variables < full.n_variables
+    assert model.n_constraints < full.n_constraints
+    assert model.solve_highs(60).fun == full.solve_highs(60).fun
+
+
+def test_presolve_hops():
+    physical = PhysicalNetwork.create_test_nw(cores=1, memory=1000)
+    g = nx.Graph()
+    g.add_node("Node_0", cores=1, memory=1000)
+    g.add_node("Node_1", cores=1, memory=1000)
+    g.add_edge("Node_0", "Node_1", rate=200)
+    virtual = VirtualNetwork(g)
+    assert ArcFlowModel(virtual, physical, max_hops=2).solve_highs(60).status == 0
+    # h1 and h2 are 2 hops away
+    model = ArcFlowModel(virtual, physical, max_hops=1, symmetry=False)
+    # only the node mapping and the usage are left
+    assert model.n_variables == 2 * 2 + 2
+    assert model.solve_highs(60).status == 2
+
+    # no physical node fits Node_0
+    g.nodes["Node_0"]["cores"] = 2
+    model = ArcFlowModel(VirtualNetwork(g), physical)
+    assert model.infeasible
+    _, status = EmbedILP(VirtualNetwork(g), physical).solve(_get_solver="highs")
+    assert status == Infeasible
+
+
+def test_host_classes():
+    physical = PhysicalNetwork.from_files("graphique", "grimoire")
+    network = physical.compile()
+    classes = [{network.node_ids[i] for i in hosts} for hosts in host_classes(network)]
+    assert sorted(classes, key=len) == [
+        {f"graphique-{n}" for n in range(1, 7)},
+        {f"grimoire-{n}" for n in range(1, 9)},
+    ]
+    # the switch is in no class
+    assert host_classes(PhysicalNetwork.create_test_nw().compile()) == [[0, 1]]
+
+
+def test_symmetry():
+    virtual = VirtualNetwork.create_random_nw(n_nodes=8, req_cores=8, seed=2)
+    physical = PhysicalNetwork.from_files("grimoire")
+    model = ArcFlowModel(virtual, physical, names=True)
+    hosts = sorted(physical.compute_nodes, key=lambda i: physical.compile().index[i])
+    # the k-th virtual node is on one of the first k hosts
+    for k, u in enumerate(virtual.nodes()):
+        mapped = [i for i in hosts if f"node_mapping_{u}_{i}" in model.variable_names]
+        assert mapped == hosts[: k + 1]
+    assert sum(name.startswith("symmetry") for name in model.constraint_names) == 7
+
+    full = ArcFlowModel(virtual, physical, symmetry=False)
+    assert model.n_variables < full.n_variables
+    assert model.solve_highs(60).fun == full.solve_highs(60).fun
+
+
+@pytest.mark.parametrize("group_interfaces", [False, True])
+def test_initial_values(group_interfaces):
+    virtual = VirtualNetwork.create_random_nw(
+        n_nodes=20, req_cores=4, req_memory=8000, req_rate=100, seed=1
+    )
+    physical = PhysicalNetwork.from_files("grisou", group_interfaces=group_interfaces)
+    greedy = EmbedGreedy(virtual, physical)
+    greedy.solve()
+    for symmetry in (False, True):
+        model = ArcFlowModel(virtual, physical, symmetry=symmetry)
+        x = model.initial_values(greedy.solution)
+        # a solution of the model, with the hosts relabelled if needed by the symmetry breaking
+        assert np.all(model.A @ x >= model.row_lower - 1e-6)
+        assert np.all(model.A @ x <= model.row_upper + 1e-6)
+        node_mapping = model.node_mapping(x)
+        assert len(set(node_mapping.values())) == greedy.solution.n_machines_used
+        if not symmetry:
+            assert node_mapping == greedy.solution.node_mapping
+
+
+def test_warm_start():
+    virtual = VirtualNetwork.create_random_nw(
+        n_nodes=30, p=0.1, req_cores=8, req_memory=16000
+    )
+    physical = PhysicalNetwork.from_files("grisou")
+    prob = EmbedILP(virtual, physical)
+    # no solution found within the time limit
+    assert prob.solve(_get_solver="highs", timelimit=0)[1] == NotSolved
+    # the solution of the heuristic is kept
+    _, status = prob.solve(_get_solver="highs", timelimit=0, warm_start="greedy")
+    assert status == Solved
+    assert prob.solution.n_machines_used == 8
+    with pytest.raises(ValueError):
+        prob.solve(_get_solver="highs", warm_start="undefined")
+
+
+@pytest.mark.parametrize("solver", ["cbc", "scip"])
+def test_warm_start_pulp(solver):
+    """The initial values are passed to CBC, SCIP takes none but its solution is still checked."""
+    pulp = pytest.importorskip("pulp")
+    if not {"cbc": pulp.PULP_CBC_CMD, "scip": pulp.SCIP_CMD}[solver](msg=0).available():
+        pytest.skip(f"{solver} not installed")
+    virtual = VirtualNetwork.create_random_nw(
+        n_nodes=10, req_cores=4, req_memory=8000, req_rate=100, seed=1
+    )
+    physical = PhysicalNetwork.from_files("grisou")
+    prob = EmbedILP(virtual, physical)
+    _, status = prob.solve(_get_solver=solver, timelimit=60, warm_start="greedy")
+    assert status == Solved
+    assert prob.solution.n_machines_used == 2
+
+
+@pytest.mark.parametrize("group_interfaces", [False, True])
+def test_highs(virtual_nw, group_interfaces):
+    # feasible only splitting the rate on the two grouped interfaces
+    physical = PhysicalNetwork.create_test_nw(
+        cores=4, memory=4000, rate=10000, group_interfaces=group_interfaces
+    )
+    prob = EmbedILP(virtual_nw, physical)
+    time_solution, status = prob.solve(_get_solver="highs")
+    assert time_solution > 0
+    if group_interfaces:
+        assert status == Solved
+        assert prob.solution.n_machines_used == 2
+    else:
+        assert status == Infeasible
+
+
+@pytest.mark.parametrize("obj", ["min_n_machines", "min_bw"])
+def test_pulp(obj, tmp_path):
+    """The model converted to pulp and the MPS file have the same optimum found by HiGHS."""
+    pulp = pytest.importorskip("pulp")
+    cbc = pulp.PULP_CBC_CMD(msg=0)
+    if not cbc.available():
+        pytest.skip("CBC not installed")
+    virtual = VirtualNetwork.create_random_nw(
+        n_nodes=6, req_cores=1, req_memory=1000, seed=1
+    )
+    physical = PhysicalNetwork.create_test_nw(cores=4, memory=4000)
+    model = ArcFlowModel(virtual, physical, obj=obj)
+    optimum = model.solve_highs(timelimit=60).fun
+
+    problem, variables = model.to_pulp()
+    problem.solve(cbc)
+    assert pulp.value(problem.objective) == pytest.approx(optimum)
+
+    if hasattr(pulp.LpProblem, "fromMPS"):
+        model.write_mps(tmp_path / "model.mps")
+        _, problem = pulp.LpProblem.fromMPS(tmp_path / "model.mps")
+        problem.solve(cbc)
+        assert pulp.value(problem.objective) == pytest.approx(optimum)
+
+    prob = EmbedILP(virtual, physical)
+    _, status = prob.solve(_get_solver="highs", obj=obj)
+    assert status == Solved
+    assert set(prob.solution.node_mapping) == set(virtual.nodes())
+
+
+@pytest.mark.parametrize("obj", ["min_n_machines", "min_bw"])
+def test_path_formulation(obj):
+    """The column generation finds the optimum of the arc formulation with fewer variables."""
+    virtual = VirtualNetwork.create_random_nw(
+        n_nodes=12, req_cores=4, req_memory=8000, req_rate=100, seed=1
+    )
+    physical = PhysicalNetwork.from_files("grisou")
+    arcs = ArcFlowModel(virtual, physical, obj=obj)
+    optimum = arcs.solve_highs(timelimit=60).fun
+    model = PathFlowModel(virtual, physical, obj=obj)
+    model.generate(timelimit=60)
+    assert model.lower_bound <= optimum + 1e-6
+    assert model.solve_highs(timelimit=60).fun == pytest.approx(optimum)
+    assert model.n_variables < arcs.n_variables / 10
+
+    prob = EmbedILP(virtual, physical)
+    _, status = prob.solve(_get_solver="highs", obj=obj, formulation="paths")
+    assert status == Solved
+    assert set(prob.solution.node_mapping) == set(virtual.nodes())
+    if obj == "min_n_machines":
+        assert prob.solution.n_machines_used == optimum
+    with pytest.raises(ValueError):
+        prob.solve(_get_solver="highs", formulation="paths", max_hops=2)
+    with pytest.raises(ValueError):
+        prob.solve(_get_solver="highs", formulation="undefined")
+
+
+@pytest.mark.parametrize("group_interfaces", [False, True])
+def test_path_initial_values(group_interfaces):
+    virtual = VirtualNetwork.create_random_nw(
+        n_nodes=20, req_cores=4, req_memory=8000, req_rate=100, seed=1
+    )
+    physical = PhysicalNetwork.from_files("grisou", group_interfaces=group_interfaces)
+    greedy = EmbedGreedy(virtual, physical)
+    greedy.solve()
+    model = PathFlowModel(virtual, physical, symmetry=False)
+    # the paths of the solution are not among the candidates yet
+    assert model.initial_values(greedy.solution) is None
+    model.add_solution(greedy.solution)
+    x = model.initial_values(greedy.solution)
+    assert np.all(model.A @ x >= model.row_lower - 1e-6)
+    assert np.all(model.A @ x <= model.row_upper + 1e-6)
+    assert model.node_mapping(x) == greedy.solution.node_mapping
@@ -0,0 +1,38 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+# cold-start budget (seconds) for importing the algorithms in a fresh interpreter
+IMPORT_BUDGET = 3.0
+
+
+@pytest.mark.parametrize(
+    "module", ["distriopt.embedding.algorithms", "distriopt.packing.algorithms"]
+)
+def test_import(module):
+    """Test that mininet and pulp are not imported eagerly and that the import time stays within budget."""
+
+    code = (
+        "import sys, time\n"
+        "start = time.perf_counter()\n"
+        f"import {module}\n"
+        "print(time.perf_counter() - start)\n"
+        "print(' '.join(sys.modules))\n"
+    )
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [root, env.get("PYTHONPATH")]))
+    output = subprocess.run(
+        [sys.executable, "-c", code],
+        env=env,
+        check=True,
+        stdout=subprocess.PIPE,
+        universal_newlines=True,
+    ).stdout.splitlines()
+
+    elapsed, modules = float(output[0]), output[1].split()
+    assert "mininet" not in modules
+    assert "pulp" not in modules
+    assert elapsed < IMPORT_BUDGET
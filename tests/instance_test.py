@@ -34,6 +34,32 @@ def test_file_multiple():
         assert physical.rate(i, j, device) == 1000
 
 
+def test_compiled():
+    """Test the array-backed form of a physical network."""
+
+    from distriopt.embedding import PhysicalNetwork
+
+    physical = PhysicalNetwork.create_test_nw(cores=4, memory=4000, rate=10000)
+    compiled = physical.compile()
+    assert compiled is physical.compile()
+    assert compiled.n_nodes == physical.number_of_nodes()
+    # 4 physical interfaces, each one seen from both its endpoints
+    assert len(compiled.edge_ends) == 4
+    assert len(compiled.iface_rate) == 8
+    for i, j, device_id in physical.edges(keys=True):
+        assert physical.rate(i, j, device_id) == physical.g[i][j][device_id]["rate"]
+        assert (
+            compiled.iface_edge[compiled.slot[(i, j, device_id)]]
+            == compiled.iface_edge[compiled.slot[(j, i, device_id)]]
+        )
+    assert set(physical.neighbors("s1")) == {"h1", "h2"}
+    assert physical.interfaces_ids("h1", "s1") == (0, 1)
+    assert physical.interface_name("s1", "h2", 1) == "eth3"
+    assert physical.rate_out("h1") == 20000
+    assert physical.rate_out("s1") == 40000
+    assert physical.compute_nodes == {"h1", "h2"}
+
+
 def test_ec2():
     """Test reading a physical network EC2 from a file."""
 
@@ -149,3 +175,34 @@ def test_mininet_conversion_to_physical():
         assert phy_topo.memory(node) == 1000
     for i, j, device in phy_topo.edges(keys=True):
         assert phy_topo.rate(i, j, device) == 1000
+
+
+def test_file_cache(tmp_path, monkeypatch):
+    """Test the on-disk cache of the physical networks read from files."""
+
+    from distriopt.embedding import PhysicalNetwork
+
+    monkeypatch.setenv("DISTRIOPT_CACHE_DIR", str(tmp_path))
+
+    physical = PhysicalNetwork.from_files("example1", "example2")
+    assert len(list(tmp_path.iterdir())) == 1
+    cached = PhysicalNetwork.from_files("example1", "example2")
+    assert cached is not physical
+    assert sorted(cached.edges(keys=True)) == sorted(physical.edges(keys=True))
+    assert cached.compute_nodes == physical.compute_nodes
+    assert cached.compile().n_nodes == physical.number_of_nodes()
+
+    # a different parameter gives a different entry
+    PhysicalNetwork.from_files("example1", "example2", group_interfaces=True)
+    assert len(list(tmp_path.iterdir())) == 2
+
+
+def test_file_cache_disabled(tmp_path, monkeypatch):
+    """Test that nothing is written to disk without a cache directory."""
+
+    from distriopt.embedding import PhysicalNetwork
+
+    monkeypatch.delenv("DISTRIOPT_CACHE_DIR")
+    monkeypatch.setenv("HOME", str(tmp_path))
+    PhysicalNetwork.from_files("example1", "example2")
+    assert not list(tmp_path.iterdir())
@@ -0,0 +1,34 @@
+from networkx.algorithms.community.kernighan_lin import kernighan_lin_bisection
+
+from distriopt import VirtualNetwork
+from distriopt.embedding.algorithms import kbalanced
+from distriopt.embedding.algorithms.kbalanced import GetPartitions
+
+
+def test_partitions_sweep(monkeypatch):
+    """Test that the sweep over the number of partitions bisects each part only once."""
+
+    bisected = []
+
+    def counting_bisection(g, **kwargs):
+        bisected.append(frozenset(g.nodes()))
+        return kernighan_lin_bisection(g, **kwargs)
+
+    monkeypatch.setattr(kbalanced, "kernighan_lin_bisection", counting_bisection)
+
+    virtual = VirtualNetwork.create_random_nw(n_nodes=40, seed=1)
+    get_partitions = GetPartitions()
+    for n_partitions in range(1, virtual.number_of_nodes() + 1):
+        partitions = get_partitions(virtual.g, n_partitions)
+        assert len(partitions) == n_partitions
+        assert set().union(*partitions) == set(virtual.nodes())
+        assert sum(len(p) for p in partitions) == virtual.number_of_nodes()
+        assert [len(p) for p in partitions] == sorted(
+            (len(p) for p in partitions), reverse=True
+        )
+
+    assert len(bisected) == len(set(bisected)) == virtual.number_of_nodes() - 1
+
+    # a different graph does not reuse the previous results
+    other = VirtualNetwork.create_random_nw(n_nodes=10, seed=2)
+    assert set().union(*get_partitions(other.g, 3)) == set(other.nodes())
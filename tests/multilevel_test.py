@@ -0,0 +1,98 @@
+import networkx as nx
+import pytest
+
+from distriopt import VirtualNetwork
+from distriopt.constants import Solved
+from distriopt.embedding import PhysicalNetwork
+from distriopt.embedding.algorithms import EmbedBalanced, EmbedGreedy, EmbedPartition
+from distriopt.embedding.algorithms.multilevel import (
+    Bisector,
+    multilevel_bisection,
+    multilevel_partition,
+)
+
+
+def _cut(g, partitions):
+    partition_of = {u: i for i, part in enumerate(partitions) for u in part}
+    return sum(
+        rate
+        for (u, v, rate) in g.edges(data="rate")
+        if partition_of[u] != partition_of[v]
+    )
+
+
+def test_bisection():
+    """Two cliques joined by a light link are separated."""
+    g = nx.disjoint_union(nx.complete_graph(60), nx.complete_graph(60))
+    nx.set_edge_attributes(g, 10, "rate")
+    g.add_edge(0, 60, rate=1)
+
+    left, right = multilevel_bisection(g, seed=0)
+    assert sorted(map(len, (left, right))) == [60, 60]
+    assert _cut(g, (left, right)) == 1
+
+
+def test_recursive_bisection():
+    """Bisecting the parts until single nodes covers all of them once."""
+    g = VirtualNetwork.create_random_nw(n_nodes=200, p=0.05, seed=1).g
+    bisect = Bisector(g, seed=0)
+    to_be_processed, leaves = [set(g.nodes())], []
+    while to_be_processed:
+        part = to_be_processed.pop()
+        if len(part) == 1:
+            leaves.append(part)
+            continue
+        left, right = bisect(part)
+        assert left and right and left | right == part
+        assert abs(len(left) - len(right)) <= max(1, 0.02 * len(part))
+        to_be_processed.extend((left, right))
+    assert len(leaves) == g.number_of_nodes()
+
+
+@pytest.mark.parametrize("n_partitions", [2, 7, 16])
+def test_partition(n_partitions):
+    g = VirtualNetwork.create_fat_tree(k=8).g
+    partitions = multilevel_partition(g, n_partitions, seed=0)
+    assert len(partitions) == n_partitions
+    assert set().union(*partitions) == set(g.nodes())
+    assert sum(map(len, partitions)) == g.number_of_nodes()
+    size = g.number_of_nodes() / n_partitions
+    assert all(abs(len(part) - size) <= 0.05 * size + 1 for part in partitions)
+
+
+@pytest.mark.parametrize("algo", [EmbedGreedy, EmbedBalanced, EmbedPartition])
+def test_embed(algo):
+    virtual = VirtualNetwork.create_random_nw(n_nodes=60, seed=1)
+    physical = PhysicalNetwork.from_files("grisou")
+    prob = algo(virtual, physical)
+    _, status = prob.solve(algo="multilevel", seed=0, cache=False)
+    assert status == Solved
+    assert set(prob.solution.node_mapping) == set(virtual.nodes())
+
+
+def test_weighted_partition():
+    """Parts follow the capacities, measured by the total weight of their nodes."""
+    virtual = VirtualNetwork.create_random_EC2(n_nodes=200, seed=1)
+    weights = {u: virtual.req_cores(u) for u in virtual.nodes()}
+    capacities = [2, 1, 1]
+    partitions = multilevel_partition(
+        virtual.g, 3, seed=0, node_weights=weights, capacities=capacities
+    )
+    total = sum(weights.values())
+    for part, capacity in zip(partitions, capacities):
+        size = total * capacity / sum(capacities)
+        assert abs(sum(weights[u] for u in part) - size) <= 0.02 * size + 8
+
+
+@pytest.mark.parametrize("algo", [EmbedBalanced, EmbedPartition])
+def test_balance_resources(algo):
+    """Balancing the resources of heterogeneous virtual nodes needs fewer unfeasible tries."""
+    virtual = VirtualNetwork.create_random_EC2(n_nodes=150, seed=1)
+    physical = PhysicalNetwork.from_files("grisou", "grele")
+    retries = {}
+    for balance in ("nodes", "resources"):
+        prob = algo(virtual, physical)
+        _, status = prob.solve(balance=balance, seed=0, cache=False)
+        assert status == Solved
+        retries[balance] = sum(prob.stats.retries.values())
+    assert retries["resources"] < retries["nodes"]
@@ -0,0 +1,57 @@
+import random
+
+import pytest
+
+from distriopt import VirtualNetwork
+from distriopt.embedding.algorithms.partition import get_partitions
+
+
+def _cut(virtual, partitions):
+    partition_of = {u: i for i, part in enumerate(partitions) for u in part}
+    return sum(
+        virtual.req_rate(u, v)
+        for (u, v) in virtual.edges()
+        if partition_of[u] != partition_of[v]
+    )
+
+
+@pytest.mark.parametrize("n_partitions", [4, 9, 16])
+def test_moves(n_partitions):
+    """Moves reduce the cut weight of the initial bins and keep their sizes balanced."""
+    virtual = VirtualNetwork.create_fat_tree(k=8)
+    random.seed(0)
+    initial = list(get_partitions(virtual, n_partitions, max_moves=0))
+    random.seed(0)
+    partitions = list(get_partitions(virtual, n_partitions))
+
+    assert len(partitions) == n_partitions
+    assert sorted(u for part in partitions for u in part) == sorted(virtual.nodes())
+    assert max(map(len, partitions)) - min(map(len, partitions)) <= 1
+    assert _cut(virtual, partitions) < 0.8 * _cut(virtual, initial)
+
+
+def test_max_moves():
+    virtual = VirtualNetwork.create_random_nw(n_nodes=100, seed=1)
+    random.seed(0)
+    initial = list(get_partitions(virtual, 4, max_moves=0))
+    assert sorted(map(len, initial)) == [25, 25, 25, 25]
+    random.seed(0)
+    partitions = list(get_partitions(virtual, 4, max_moves=10))
+    # nodes not in the initial bin they overlap the most with
+    moved = sum(
+        len(part) - max(len(set(part) & set(initial_part)) for initial_part in initial)
+        for part in partitions
+    )
+    assert 0 < moved <= 11
+
+
+def test_n_swaps():
+    """n_swaps is a deprecated alias of max_moves."""
+    virtual = VirtualNetwork.create_random_nw(n_nodes=100, seed=1)
+    random.seed(0)
+    expected = list(get_partitions(virtual, 4, max_moves=10))
+    random.seed(0)
+    with pytest.deprecated_call():
+        assert list(get_partitions(virtual, 4, n_swaps=10)) == expected
+    with pytest.raises(TypeError):
+        get_partitions(virtual, 4, max_moves=10, n_swaps=10)
@@ -0,0 +1,47 @@
+import pytest
+
+from distriopt.constants import LinkCapacityError, NodeResourceError
+from distriopt.embedding import PhysicalNetwork
+from distriopt.embedding.residual import ResidualCapacity
+
+
+@pytest.fixture
+def residual():
+    physical = PhysicalNetwork.create_test_nw(cores=4, memory=4000, rate=10000)
+    yield ResidualCapacity(physical)
+
+
+def test_reserve_release(residual):
+    residual.reserve_node("h1", 3, 1000)
+    assert residual.cores("h1") == 1
+    assert residual.memory("h1") == 3000
+    with pytest.raises(NodeResourceError):
+        residual.reserve_node("h1", 2, 1000)
+    # a failed reservation does not change the state
+    assert residual.cores("h1") == 1
+
+    path = [("h1", "s1", 0), ("s1", "h2", 0)]
+    residual.reserve_path(path, 6000)
+    # both directions of an interface share its rate
+    assert residual.rate("s1", "h1", 0) == 4000
+    assert residual.rate("h1", "s1", 1) == 10000
+    with pytest.raises(LinkCapacityError):
+        residual.reserve_path(path, 6000)
+    residual.release_path(path, 6000)
+    assert residual.rate("h2", "s1", 0) == 10000
+
+
+def test_savepoint_rollback(residual):
+    residual.reserve_node("h1", 1, 1000)
+    savepoint = residual.savepoint()
+    residual.reserve_node("h1", 2, 1000)
+    residual.reserve_path([("h1", "s1", 1)], 500)
+    residual.release_node("h2", 1, 0)
+    residual.rollback(savepoint)
+    assert (residual.cores("h1"), residual.memory("h1")) == (3, 3000)
+    assert residual.rate("h1", "s1", 1) == 10000
+    assert residual.cores("h2") == 4
+
+    residual.commit()
+    residual.rollback()
+    assert residual.cores("h1") == 3
@@ -0,0 +1,68 @@
+import networkx as nx
+import pytest
+
+from distriopt.constants import NoPathFoundError
+from distriopt.embedding import PhysicalNetwork
+
+
+@pytest.fixture(scope="module")
+def physical_nw():
+    """A ring with a detour and two parallel interfaces on the direct link.
+
+             h1 ====== h2
+             |          |
+             s1 ------ s2
+    """
+    g = nx.MultiGraph()
+    for u in ("h1", "h2"):
+        g.add_node(u, cores=4, memory=4000)
+    for u in ("s1", "s2"):
+        g.add_node(u, cores=0, memory=0)
+    g.add_edge("h1", "h2", devices={"h1": "eth0", "h2": "eth0"}, rate=1000)
+    g.add_edge("h1", "h2", devices={"h1": "eth1", "h2": "eth1"}, rate=2000)
+    g.add_edge("h1", "s1", devices={"h1": "eth2", "s1": "eth0"}, rate=5000)
+    g.add_edge("s1", "s2", devices={"s1": "eth1", "s2": "eth0"}, rate=5000)
+    g.add_edge("s2", "h2", devices={"s2": "eth1", "h2": "eth2"}, rate=5000)
+    yield PhysicalNetwork(nx.freeze(g))
+
+
+@pytest.mark.parametrize("metric", ["hops", "utilization"])
+def test_shortest_widest(physical_nw, metric):
+    # the direct link is preferred and the widest of its interfaces is used
+    assert physical_nw.find_path("h1", "h2", req_rate=500, metric=metric) == [
+        ("h1", "h2", 1)
+    ]
+
+
+def test_residual(physical_nw):
+    # the direct link does not have enough residual rate, the detour is used
+    path = physical_nw.find_path(
+        "h1", "h2", req_rate=1500, used_rate={("h2", "h1", 1): 1000}
+    )
+    assert [(i, j) for (i, j, _) in path] == [("h1", "s1"), ("s1", "s2"), ("s2", "h2")]
+
+
+def test_no_path(physical_nw):
+    with pytest.raises(NoPathFoundError):
+        physical_nw.find_path("h1", "h2", req_rate=6000)
+
+
+def test_shortest_path_trees(physical_nw):
+    from distriopt.embedding.routing import ShortestPathTrees
+
+    used_rate = {}
+    paths = ShortestPathTrees(physical_nw, used_rate=used_rate)
+
+    first = paths.find_path("h1", "h2", req_rate=1500)
+    assert first == [("h1", "h2", 1)]
+    used_rate[("h1", "h2", 1)] = 1500
+
+    # the direct link is saturated, only the branch below it is recomputed
+    second = paths.find_path("h1", "h2", req_rate=1500)
+    assert second == physical_nw.find_path(
+        "h1", "h2", req_rate=1500, used_rate=used_rate
+    )
+    assert len(second) == 3
+    assert paths.find_path("h1", "s2", req_rate=1500) == second[:2]
+    assert paths.n_trees == 1
+    assert paths.n_repairs == 1
@@ -0,0 +1,50 @@
+import pytest
+
+from distriopt import VirtualNetwork
+from distriopt.constants import Solved
+from distriopt.embedding import PhysicalNetwork
+from distriopt.embedding.algorithms import EmbedBalanced, EmbedGreedy, EmbedPartition
+from distriopt.packing import CloudInstance
+from distriopt.packing.algorithms import PackGreedy
+from distriopt.stats import add_hook, remove_hook
+
+
+@pytest.mark.parametrize("algo", [EmbedGreedy, EmbedBalanced, EmbedPartition])
+def test_embedding_stats(algo):
+    virtual = VirtualNetwork.create_fat_tree(k=4)
+    physical = PhysicalNetwork.from_files("grisou")
+    prob = algo(virtual, physical)
+
+    calls = []
+    hook = add_hook(lambda solver, stats: calls.append((solver, stats.as_dict())))
+    try:
+        time_solution, status = prob.solve()
+    finally:
+        remove_hook(hook)
+
+    assert status == Solved
+    stats = prob.stats
+    assert stats.algorithm == algo.__name__
+    assert stats.status == Solved and stats.time == time_solution
+    for phase in ("partitioning", "routing", "build"):
+        assert stats.phases[phase] > 0
+    assert sum(stats.phases.values()) <= stats.time
+    assert stats.counters["find_path"] > 0
+    assert stats.counters["expansions"] >= stats.counters["find_path"]
+    # a try for each number of machines before the one of the solution
+    assert sum(stats.retries.values()) == len(stats.retries)
+    assert all(n < prob.solution.n_machines_used for n in stats.retries)
+    assert calls == [(prob, stats.as_dict())]
+
+    # stats are reset by each solve
+    prob.solve()
+    assert prob.stats.counters["find_path"] == stats.counters["find_path"]
+
+
+def test_packing_stats():
+    virtual = VirtualNetwork.create_random_EC2(n_nodes=20)
+    prob = PackGreedy(virtual, CloudInstance.read_ec2_instances())
+    prob.solve()
+    assert prob.stats.phases["placement"] > 0
+    assert prob.stats.phases["verification"] > 0
+    assert prob.stats.counters["bins"] == sum(prob.solution.vm_used.values())